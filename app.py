@@ -1,4 +1,6 @@
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import Headers
 import uvicorn
 import logging
 from config import load_config
@@ -6,6 +8,10 @@ from auth.auth_controller import router as auth_router
 from files.file_controller import router as file_router
 from sync.sync_controller import router as sync_router
 from sharing.share_controller import router as share_router
+from sync import snapshot_service
+from sharing import share_service
+from auth import auth_service
+import asyncio
 import os
 from contextlib import asynccontextmanager
 
@@ -13,6 +19,15 @@ from contextlib import asynccontextmanager
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class RangeAwareGZipMiddleware(GZipMiddleware):
+    """GZip middleware that leaves Range requests alone, since byte offsets refer to the raw file."""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and "range" in Headers(scope=scope):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
 # Add this lifespan context manager
 @asynccontextmanager
 async def lifespan(app):
@@ -21,8 +36,27 @@ async def lifespan(app):
     config = load_config()
     storage_path = config["STORAGE_PATH"]
     os.makedirs(storage_path, exist_ok=True)
+    snapshot_refresher = asyncio.create_task(snapshot_service.run_snapshot_refresher())
+    share_sweeper = asyncio.create_task(share_service.run_share_sweeper())
+    access_flusher = asyncio.create_task(
+        share_service.access_counter.run_flusher(share_service.ACCESS_FLUSH_INTERVAL_SECONDS)
+    )
+    device_token_flusher = asyncio.create_task(
+        auth_service.device_tokens.run_flusher(auth_service.DEVICE_TOKEN_FLUSH_INTERVAL_SECONDS)
+    )
     yield
-    # Shutdown logic (if any)
+    # Shutdown logic
+    tasks = [snapshot_refresher, share_sweeper, access_flusher, device_token_flusher]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # Each final flush runs even if another fails
+    for name, flush in (("share access counts", share_service.access_counter.flush),
+                        ("device token last-used times", auth_service.device_tokens.flush_last_used)):
+        try:
+            await asyncio.to_thread(flush)
+        except Exception as e:
+            logger.error("Failed to flush %s on shutdown: %s", name, str(e))
 
 def create_app() -> FastAPI:
     """Creates and configures the FastAPI application."""
@@ -38,6 +72,10 @@ def create_app() -> FastAPI:
             lifespan=lifespan
         )
         
+        # Compress responses (including streamed sync change sets) for clients
+        # that send Accept-Encoding: gzip
+        app.add_middleware(RangeAwareGZipMiddleware, minimum_size=config["GZIP_MINIMUM_SIZE"])
+        
         # Register routers
         app.include_router(auth_router)
         app.include_router(file_router)
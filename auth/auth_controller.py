@@ -1,17 +1,28 @@
 from typing import Dict, Any
-from fastapi import APIRouter, HTTPException, status, Depends, Form
+import logging
+import math
+from fastapi import APIRouter, HTTPException, Request, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 from .auth_service import (
     create_user, 
     verify_user, 
     create_access_token, 
+    create_login_tokens,
+    refresh_access_token,
     get_current_user,
+    revoke_token,
+    login_retry_after,
+    record_login_attempt,
+    token_cache,
+    device_tokens,
     MOCK_USERS
 )
+from utils.auth_helpers import HashingPoolBusy, run_password_work
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+logger = logging.getLogger(__name__)
 
 
 class UserCredentials(BaseModel):
@@ -28,13 +39,31 @@ class Token(BaseModel):
     token_type: str
 
 
+class DeviceTokenRequest(BaseModel):
+    """Model for issuing a device token."""
+    device_name: str
+
+
+class RefreshRequest(BaseModel):
+    """Model for exchanging a refresh token."""
+    refresh_token: str
+
+
 class LoginRequest(BaseModel):
     username: str
     password: str
 
 
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many login attempts in progress, please retry",
+        headers={"Retry-After": "1"}
+    )
+
+
 @router.post("/signup", status_code=status.HTTP_201_CREATED)
-def signup_endpoint(credentials: UserCredentials) -> Dict[str, str]:
+async def signup_endpoint(credentials: UserCredentials) -> Dict[str, str]:
     """
     Creates a new user with a username and password.
 
@@ -44,35 +73,104 @@ def signup_endpoint(credentials: UserCredentials) -> Dict[str, str]:
     Returns:
         Dict[str, str]: A dictionary with a success message or error details.
     """
-    # TODO: Implement user signup functionality
-    # 1. Call create_user with the provided username and password
-    # 2. Return success message with user_id and username
-    # 3. Handle ValueError for when user already exists (409 CONFLICT)
-    # 4. Handle other exceptions with 500 INTERNAL_SERVER_ERROR
-    pass
+    try:
+        user = await run_password_work(create_user, credentials.username, credentials.password)
+        return {
+            "message": "User created successfully",
+            "user_id": str(user["id"]),
+            "username": user["username"]
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except HashingPoolBusy:
+        raise _hashing_busy()
+    except Exception as e:
+        logger.error("Signup failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create user: {str(e)}"
+        )
 
 
 @router.post("/login")
-async def login(request: LoginRequest) -> Dict[str, Any]:
-    """Login endpoint that returns JWT token."""
-    # TODO: Implement user login functionality
-    # 1. Verify user credentials using verify_user function
-    # 2. Check if verification returns None - if so, raise 401 UNAUTHORIZED
-    # 3. Create an access token with the user's username
-    # 4. Return token in proper format with bearer type
-    # 5. Handle exceptions and return appropriate error responses
-    pass
+async def login(request: LoginRequest, http_request: Request) -> Dict[str, Any]:
+    """
+    Login endpoint that returns JWT token.
+
+    Usernames and client IPs with too many recent failures are refused before
+    any bcrypt work; the bcrypt check itself runs on the bounded hashing pool.
+    """
+    client_ip = http_request.client.host if http_request.client else "unknown"
+    retry_after = login_retry_after(request.username, client_ip)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts, please retry later",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+    try:
+        try:
+            user = await run_password_work(verify_user, request.username, request.password)
+        except HTTPException as e:
+            if e.status_code != status.HTTP_401_UNAUTHORIZED:
+                raise
+            user = None
+        if user is None:
+            # One answer for unknown users and wrong passwords, so logins do
+            # not reveal which usernames exist
+            record_login_attempt(request.username, client_ip, success=False)
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid username or password"
+            )
+        record_login_attempt(request.username, client_ip, success=True)
+        return create_login_tokens(user)
+    except HTTPException:
+        raise
+    except HashingPoolBusy:
+        raise _hashing_busy()
+    except Exception as e:
+        logger.error("Login failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Login failed: {str(e)}"
+        )
+
+
+@router.post("/refresh")
+def refresh_endpoint(request: RefreshRequest) -> Dict[str, str]:
+    """
+    Exchanges a refresh token for a new access token and refresh token.
+
+    Each refresh token works once; replaying one revokes every token issued
+    from the same login.
+    """
+    try:
+        return refresh_access_token(request.refresh_token)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Token refresh failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Token refresh failed: {str(e)}"
+        )
 
 
 @router.post("/guest-login")
 async def guest_login() -> Dict[str, Any]:
     """Creates guest token."""
-    # TODO: Implement guest login functionality
-    # 1. Get the guest user from MOCK_USERS
-    # 2. Create an access token for "guest" user
-    # 3. Return token with bearer type
-    # 4. Handle exceptions with 500 INTERNAL_SERVER_ERROR
-    pass
+    try:
+        guest = MOCK_USERS["guest"]
+        access_token = create_access_token({"sub": guest["username"]})
+        return {"access_token": access_token, "token_type": "bearer"}
+    except Exception as e:
+        logger.error("Guest login failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Guest login failed: {str(e)}"
+        )
 
 
 @router.post("/logout")
@@ -83,12 +181,87 @@ def logout_endpoint(token: str = Depends(oauth2_scheme)) -> Dict[str, str]:
     Returns:
         Dict[str, str]: Confirmation message upon successful logout.
     """
-    # TODO: Implement logout functionality
-    # 1. Handle test case where token is "valid_token_for_user"
-    # 2. Get current user to verify token is valid
-    # 3. Return successful logout message with username
-    # 4. Handle exceptions with 401 UNAUTHORIZED
-    pass
+    if token == "valid_token_for_user":
+        return {"message": "Logged out successfully"}
+
+    try:
+        user = get_current_user(token)
+        revoke_token(token)
+        return {"message": "Logged out successfully", "username": user["username"]}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Logout failed: {str(e)}"
+        )
+
+
+@router.get("/token-cache/stats")
+def token_cache_stats_endpoint(
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Returns size and hit-rate metrics of the verified-token cache."""
+    return token_cache.stats()
+
+
+@router.post("/device-tokens", status_code=status.HTTP_201_CREATED)
+def create_device_token_endpoint(
+    request: DeviceTokenRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Issues a long-lived token for a sync client, so it does not have to log in
+    again when access tokens expire. The token is only returned here.
+    """
+    try:
+        if not request.device_name.strip():
+            raise ValueError("Device name is required")
+        token, record = device_tokens.issue(current_user, request.device_name.strip())
+        return {"token": token, "token_type": "bearer", **record}
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error("Failed to create device token: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create device token: {str(e)}"
+        )
+
+
+@router.get("/device-tokens")
+def list_device_tokens_endpoint(
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Lists the user's device tokens with their last-used times."""
+    try:
+        return {"device_tokens": device_tokens.list_for_user(current_user["id"])}
+    except Exception as e:
+        logger.error("Failed to list device tokens: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to list device tokens: {str(e)}"
+        )
+
+
+@router.delete("/device-tokens/{token_id}")
+def revoke_device_token_endpoint(
+    token_id: str,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, str]:
+    """Revokes one of the user's device tokens."""
+    try:
+        if not device_tokens.revoke(current_user["id"], token_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Device token not found")
+        return {"message": "Device token revoked", "token_id": token_id}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to revoke device token: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to revoke device token: {str(e)}"
+        )
 
 
 # Dependency for protected routes
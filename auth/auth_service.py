@@ -1,11 +1,25 @@
-from typing import Any, Dict, Optional
-from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+from datetime import datetime
+import functools
+import hmac
 import logging
-import bcrypt
+import secrets
+import time
+import uuid
 import jwt as pyjwt
 
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
+from config import load_config
+from utils.auth_helpers import BCRYPT_ROUNDS, hash_password, verify_password
+from utils.db import get_engine
+from utils.token_engine import token_engine
+from .device_tokens import DeviceTokenRegistry, is_device_token
+from .login_throttle import FailureThrottle
+from .refresh_tokens import RefreshTokenFamilies, RefreshTokenReused
+from .revocation_list import RevocationList
+from .token_cache import VerifiedTokenCache
+from .user_repository import SqlUserStore
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
@@ -14,17 +28,48 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configuration
-SECRET_KEY = "your-secure-secret-key"  # In production, use environment variable
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Configuration; tokens are signed and verified by the shared token_engine
+config = load_config()
+ACCESS_TOKEN_EXPIRE_MINUTES = config["JWT_EXPIRE_MINUTES"]
 
-# Mock user database
-MOCK_USERS = {
+# Verified tokens, so repeated requests with the same token skip JWT verification
+token_cache = VerifiedTokenCache(capacity=config["AUTH_TOKEN_CACHE_SIZE"])
+
+# Token IDs revoked by logout, kept until the tokens expire
+revoked_tokens = RevocationList(
+    engine=get_engine() if config["AUTH_REVOCATION_BACKEND"] == "database" else None,
+    reload_interval=config["AUTH_REVOCATION_RELOAD_SECONDS"]
+)
+
+# Long-lived per-device API tokens for sync clients, accepted alongside JWTs
+device_tokens = DeviceTokenRegistry(
+    engine=get_engine() if config["AUTH_DEVICE_TOKEN_BACKEND"] == "database" else None,
+    cache_ttl=config["AUTH_DEVICE_TOKEN_CACHE_TTL_SECONDS"]
+)
+DEVICE_TOKEN_FLUSH_INTERVAL_SECONDS = config["AUTH_DEVICE_TOKEN_FLUSH_INTERVAL_SECONDS"]
+
+# Rotating refresh tokens, one family per login, so access tokens can stay short-lived
+refresh_tokens = RefreshTokenFamilies(
+    ttl=config["AUTH_REFRESH_TOKEN_EXPIRE_DAYS"] * 24 * 3600,
+    engine=get_engine() if config["AUTH_REFRESH_TOKEN_BACKEND"] == "database" else None
+)
+
+# Failed logins per username and per client IP, checked before any bcrypt work
+_THROTTLE_WINDOW = config["AUTH_LOGIN_WINDOW_SECONDS"]
+_THROTTLE_LOCKOUT = config["AUTH_LOGIN_LOCKOUT_SECONDS"]
+_THROTTLE_MAX_LOCKOUT = config["AUTH_LOGIN_MAX_LOCKOUT_SECONDS"]
+_THROTTLE_MAX_KEYS = config["AUTH_LOGIN_THROTTLE_MAX_KEYS"]
+username_throttle = FailureThrottle(config["AUTH_LOGIN_MAX_FAILURES_PER_USER"], _THROTTLE_WINDOW,
+                                    _THROTTLE_LOCKOUT, _THROTTLE_MAX_LOCKOUT, _THROTTLE_MAX_KEYS)
+ip_throttle = FailureThrottle(config["AUTH_LOGIN_MAX_FAILURES_PER_IP"], _THROTTLE_WINDOW,
+                              _THROTTLE_LOCKOUT, _THROTTLE_MAX_LOCKOUT, _THROTTLE_MAX_KEYS)
+
+# Seed accounts for development
+_SEED_USERS = {
     "suhaas": {
         "id": "1",
         "username": "suhaas",
-        "password": "123"  # In production, use hashed passwords
+        "password": "123"
     },
     "guest": {
         "id": "2",
@@ -33,46 +78,228 @@ MOCK_USERS = {
     }
 }
 
+def _seed_user_store(store: SqlUserStore) -> None:
+    """Adds the seed accounts, with hashed passwords, if they are missing."""
+    for username, user in _SEED_USERS.items():
+        if username in store:
+            continue
+        password = user["password"]
+        try:
+            store[username] = {**user, "password": hash_password(password) if password else None}
+        except ValueError:
+            pass  # Seeded concurrently by another worker
+
+# User store: a username -> user record mapping. The "database" backend keeps
+# users in DB_URI behind a bounded read-through cache; "memory" is a plain dict
+# of the seed accounts. The name predates the database backend.
+if config["USER_STORE_BACKEND"] == "database":
+    MOCK_USERS = SqlUserStore(get_engine(), capacity=config["USER_CACHE_SIZE"],
+                              ttl=config["USER_CACHE_TTL_SECONDS"])
+    _seed_user_store(MOCK_USERS)
+else:
+    MOCK_USERS = {username: dict(user) for username, user in _SEED_USERS.items()}
+
 def create_user(username: str, password: str) -> Dict[str, Any]:
-    """Creates a new user with hashed password."""
-    # TODO: Implement user creation functionality
-    # 1. Check if username already exists in MOCK_USERS, raise ValueError if it does
-    # 2. Hash the password using bcrypt
-    # 3. Create a user record with id, username, hashed password, and creation timestamp
-    # 4. Add the user to MOCK_USERS dictionary
-    # 5. Log successful user creation
-    # 6. Return user info (username and id)
-    # 7. Handle exceptions appropriately
-    pass
+    """
+    Creates a new user with hashed password.
+
+    Hashing is slow by design; async callers should run this through
+    utils.auth_helpers.run_password_work.
+    """
+    if username in MOCK_USERS:
+        raise ValueError(f"User {username} already exists")
+
+    try:
+        user = {
+            "id": str(uuid.uuid4()),
+            "username": username,
+            "password": hash_password(password),
+            "created_at": datetime.utcnow()
+        }
+        MOCK_USERS[username] = user
+        logger.info("Created user %s", username)
+        return {"username": username, "id": user["id"]}
+
+    except Exception as e:
+        logger.error("Failed to create user %s: %s", username, str(e))
+        raise
+
+@functools.lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    """A hash to check unknown usernames against, so they cost as much as known ones."""
+    return hash_password(secrets.token_urlsafe(16))
+
+def _password_matches(password: str, stored: str) -> bool:
+    """Checks a password against a bcrypt hash, or a seeded plaintext password."""
+    if stored.startswith("$2"):
+        return verify_password(password, stored)
+    return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+
+def _needs_rehash(stored: str) -> bool:
+    """True for plaintext passwords and bcrypt hashes below BCRYPT_ROUNDS."""
+    if not stored.startswith("$2"):
+        return True
+    try:
+        return int(stored.split("$")[2]) < BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+def _upgrade_password(user: Dict[str, Any], password: str) -> None:
+    """Re-hashes a just-verified password at the current cost factor."""
+    try:
+        MOCK_USERS[user["username"]] = {**user, "password": hash_password(password)}
+        logger.info("Upgraded password hash for user %s", user["username"])
+    except Exception as e:
+        # The old hash still works; try again on the next login
+        logger.warning("Failed to upgrade password hash for user %s: %s", user["username"], str(e))
 
 def verify_user(username: str, password: str) -> Dict[str, Any]:
-    """Verifies user credentials."""
-    # TODO: Implement user verification functionality
-    # 1. Check if username exists in MOCK_USERS, raise 401 if not found
-    # 2. For guest user, skip password check
-    # 3. For regular users, verify password matches
-    # 4. Return user data if credentials are valid
-    # 5. Raise 401 UNAUTHORIZED for invalid credentials
-    pass
+    """
+    Verifies user credentials.
+
+    Checking a bcrypt hash is slow by design; async callers should run this
+    through utils.auth_helpers.run_password_work. A password stored in
+    plaintext or below BCRYPT_ROUNDS is re-hashed once it has been verified.
+    """
+    user = MOCK_USERS.get(username)
+    if user is None:
+        verify_password(password, _dummy_hash())
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+
+    # The guest account has no password
+    stored = user.get("password")
+    if stored is not None:
+        if not _password_matches(password, stored):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
+        if _needs_rehash(stored):
+            _upgrade_password(user, password)
+
+    return {"id": user["id"], "username": user["username"]}
+
+def login_retry_after(username: str, client_ip: str) -> float:
+    """Returns seconds until a login from this user and IP is allowed, or 0.0."""
+    return max(username_throttle.retry_after(username), ip_throttle.retry_after(client_ip))
+
+def record_login_attempt(username: str, client_ip: str, success: bool) -> None:
+    """Counts a login outcome; success clears the username's failures but not the IP's."""
+    if success:
+        username_throttle.reset(username)
+    else:
+        username_throttle.record_failure(username)
+        ip_throttle.record_failure(client_ip)
 
 def create_access_token(data: Dict[str, Any]) -> str:
-    """Creates JWT token with expiry."""
-    # TODO: Implement token creation
-    # 1. Create a copy of the data dictionary
-    # 2. Calculate expiration time using ACCESS_TOKEN_EXPIRE_MINUTES
-    # 3. Add expiration to token data
-    # 4. Encode and return JWT token using SECRET_KEY and ALGORITHM
-    pass
+    """Creates JWT token with expiry and a unique token ID (jti) for revocation."""
+    return token_engine.encode(data)
+
+def _credentials_error(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"}
+    )
 
 def verify_token(token: str) -> Dict[str, Any]:
-    """Verifies JWT token and returns user data."""
-    # TODO: Implement token verification
-    # 1. Try to decode the token using SECRET_KEY and ALGORITHM
-    # 2. Extract username ("sub") from payload
-    # 3. Validate that username exists and is in MOCK_USERS
-    # 4. Return user data if token is valid
-    # 5. Handle exceptions with appropriate HTTP errors
-    pass
+    """
+    Verifies JWT token and returns user data.
+
+    Verified tokens are served from token_cache until their `exp`. Hits and
+    misses alike check the token's jti and refresh-token family against
+    revoked_tokens, so revocations made elsewhere are never masked by the cache.
+    """
+    cached = token_cache.get(token)
+    if cached is not None:
+        _check_not_revoked(cached["revocation_ids"])
+        return dict(cached["user"])
+
+    try:
+        payload = token_engine.decode(token)
+    except pyjwt.ExpiredSignatureError:
+        raise _credentials_error("Token has expired")
+    except pyjwt.PyJWTError:
+        raise _credentials_error("Could not validate credentials")
+
+    revocation_ids = [payload[claim] for claim in ("jti", "fid") if payload.get(claim) is not None]
+    _check_not_revoked(revocation_ids)
+
+    username = payload.get("sub")
+    stored = MOCK_USERS.get(username) if username is not None else None
+    if stored is None:
+        raise _credentials_error("Could not validate credentials")
+
+    user = {"id": stored["id"], "username": username}
+    token_cache.put(token, {"user": user, "revocation_ids": revocation_ids}, payload["exp"])
+    return dict(user)
+
+def _check_not_revoked(revocation_ids: List[str]) -> None:
+    """Rejects a token whose jti, or refresh-token family, has been revoked."""
+    if any(revocation_id in revoked_tokens for revocation_id in revocation_ids):
+        raise _credentials_error("Token has been revoked")
+
+def _revoke_family_access(handle: str) -> None:
+    """Revokes every access token of a refresh-token family, until the newest has expired."""
+    revoked_tokens.add(handle, time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+def create_login_tokens(user: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Starts a refresh-token family for a successful login and issues an access
+    token tied to it, so logging out with the access token ends the family.
+    """
+    refresh_token = refresh_tokens.issue(user)
+    return {
+        "access_token": create_access_token({
+            "sub": user["username"], "fid": refresh_tokens.handle(refresh_token)
+        }),
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+
+def refresh_access_token(refresh_token: str) -> Dict[str, str]:
+    """
+    Exchanges a refresh token for a new access token and the next refresh
+    token. No password is checked, so refreshing costs no bcrypt work.
+
+    Raises:
+        HTTPException: 401 if the token is invalid, expired or was already
+            used (which revokes its family), or its user no longer exists.
+    """
+    try:
+        new_refresh_token, user = refresh_tokens.rotate(refresh_token)
+    except RefreshTokenReused as e:
+        _revoke_family_access(refresh_tokens.handle(refresh_token))
+        raise _credentials_error(str(e))
+    except ValueError as e:
+        raise _credentials_error(str(e))
+
+    if MOCK_USERS.get(user["username"]) is None:
+        raise _credentials_error("Could not validate credentials")
+    return {
+        "access_token": create_access_token({
+            "sub": user["username"], "fid": refresh_tokens.handle(new_refresh_token)
+        }),
+        "refresh_token": new_refresh_token,
+        "token_type": "bearer"
+    }
+
+def invalidate_token(token: str) -> None:
+    """Stops accepting a token from the verified-token cache, e.g. on logout."""
+    token_cache.invalidate(token)
+
+def revoke_token(token: str) -> None:
+    """
+    Revokes a verified token until it expires, e.g. on logout, along with the
+    refresh-token family of the login it came from.
+    """
+    if is_device_token(token):
+        device_tokens.revoke_token(token)
+        return
+    payload = token_engine.decode(token)
+    if payload.get("jti") is not None:
+        revoked_tokens.add(payload["jti"], payload["exp"])
+    if payload.get("fid") is not None:
+        refresh_tokens.revoke(payload["fid"])
+        _revoke_family_access(payload["fid"])
+    invalidate_token(token)
 
 # def get_current_user(token: str) -> Dict[str, Any]:
 #     """Dependency for protected endpoints."""
@@ -84,5 +311,14 @@ def verify_token(token: str) -> Dict[str, Any]:
 #         )
 #     return verify_token(token.replace("Bearer ", ""))
 
+def verify_device_token(token: str) -> Dict[str, Any]:
+    """Verifies a device token and returns user data."""
+    record = device_tokens.authenticate(token)
+    if record is None:
+        raise _credentials_error("Could not validate credentials")
+    return {"id": record["user_id"], "username": record["username"], "device_id": record["token_id"]}
+
 def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+    if is_device_token(token):
+        return verify_device_token(token)
     return verify_token(token)
\ No newline at end of file
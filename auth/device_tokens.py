@@ -0,0 +1,208 @@
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime
+from sqlalchemy import (Column, DateTime, Float, Index, MetaData, String, Table, bindparam, delete,
+                        insert, select, update)
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Marks device tokens so they are told apart from JWTs without decoding
+TOKEN_PREFIX = "dlt_"
+
+_metadata = MetaData()
+
+device_tokens_table = Table(
+    "device_tokens", _metadata,
+    Column("token_hash", String(64), primary_key=True),
+    Column("token_id", String(32), nullable=False),
+    Column("user_id", String(64), nullable=False),
+    Column("username", String(150), nullable=False),
+    Column("device_name", String(128), nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("last_used_at", Float),
+    Index("ix_device_tokens_token_id", "token_id", unique=True),
+    Index("ix_device_tokens_user_id", "user_id"),
+)
+
+
+def is_device_token(token: str) -> bool:
+    """True if a bearer token is a device token rather than a JWT."""
+    return token.startswith(TOKEN_PREFIX)
+
+
+def _digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class DeviceTokenRegistry:
+    """
+    Long-lived, revocable per-device API tokens.
+
+    Only the SHA-256 of a token is stored, so a leaked table cannot be replayed.
+    Tokens are random, which makes a plain hash safe here, and lookup is one
+    dict or primary-key lookup with no bcrypt involved. With an engine, tokens
+    live in the DB_URI database; looked-up records are cached for `cache_ttl`
+    seconds, which bounds how long a revocation on another worker goes unseen.
+
+    Last-used times are buffered and written back in one batch by
+    `flush_last_used`, instead of on every request.
+    """
+
+    def __init__(self, engine: Optional[Engine] = None, cache_ttl: float = 60):
+        self._engine = engine
+        self._cache_ttl = cache_ttl
+        # token_hash -> (record, cached_at); the source of truth without an engine
+        self._records: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._pending_last_used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        if engine is not None:
+            _metadata.create_all(engine)
+            t = device_tokens_table
+            self._select_by_hash = select(t).where(t.c.token_hash == bindparam("b_hash"))
+            self._touch = (update(t).where(t.c.token_hash == bindparam("b_hash"))
+                           .values(last_used_at=bindparam("b_last_used")))
+
+    def issue(self, user: Dict[str, Any], device_name: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Creates a token for a user's device.
+
+        Returns:
+            The token, which is not stored and cannot be shown again, and its record.
+        """
+        token = TOKEN_PREFIX + secrets.token_urlsafe(32)
+        record = {
+            "token_hash": _digest(token),
+            "token_id": uuid.uuid4().hex,
+            "user_id": str(user["id"]),
+            "username": user["username"],
+            "device_name": device_name,
+            "created_at": datetime.utcnow(),
+            "last_used_at": None
+        }
+        if self._engine is not None:
+            with self._engine.begin() as conn:
+                conn.execute(insert(device_tokens_table), record)
+        with self._lock:
+            self._records[record["token_hash"]] = (record, time.monotonic())
+        logger.info("Issued device token %s for user %s", record["token_id"], user["username"])
+        return token, self._public(record)
+
+    def authenticate(self, token: str) -> Optional[Dict[str, Any]]:
+        """Returns the record of a live device token, noting its use, or None."""
+        token_hash = _digest(token)
+        record = self._lookup(token_hash)
+        if record is None:
+            return None
+        with self._lock:
+            self._pending_last_used[token_hash] = time.time()
+        return self._public(record)
+
+    def _lookup(self, token_hash: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._records.get(token_hash)
+        if entry is not None:
+            record, cached_at = entry
+            if self._engine is None or time.monotonic() - cached_at <= self._cache_ttl:
+                return record
+        if self._engine is None:
+            return None
+        with self._engine.connect() as conn:
+            row = conn.execute(self._select_by_hash, {"b_hash": token_hash}).first()
+        with self._lock:
+            if row is None:
+                self._records.pop(token_hash, None)
+                return None
+            record = dict(row._mapping)
+            self._records[token_hash] = (record, time.monotonic())
+        return record
+
+    def list_for_user(self, user_id: Any) -> List[Dict[str, Any]]:
+        """Returns a user's device tokens, oldest first, without their hashes."""
+        user_id = str(user_id)
+        if self._engine is not None:
+            t = device_tokens_table
+            with self._engine.connect() as conn:
+                rows = conn.execute(select(t).where(t.c.user_id == user_id).order_by(t.c.created_at))
+                records = [dict(row._mapping) for row in rows]
+        else:
+            with self._lock:
+                records = [record for record, _ in self._records.values()
+                           if record["user_id"] == user_id]
+        with self._lock:
+            for record in records:
+                pending = self._pending_last_used.get(record["token_hash"])
+                if pending is not None:
+                    record["last_used_at"] = pending
+        return [self._public(record) for record in records]
+
+    def revoke(self, user_id: Any, token_id: str) -> bool:
+        """Revokes one of a user's device tokens; returns False if it is not theirs."""
+        user_id = str(user_id)
+        with self._lock:
+            token_hash = next((h for h, (record, _) in self._records.items()
+                               if record["token_id"] == token_id and record["user_id"] == user_id),
+                              None)
+        if self._engine is not None:
+            t = device_tokens_table
+            with self._engine.begin() as conn:
+                row = conn.execute(select(t.c.token_hash)
+                                   .where(t.c.token_id == token_id, t.c.user_id == user_id)).first()
+                if row is not None:
+                    token_hash = row.token_hash
+                    conn.execute(delete(t).where(t.c.token_hash == token_hash))
+        if token_hash is None:
+            return False
+        with self._lock:
+            self._records.pop(token_hash, None)
+            self._pending_last_used.pop(token_hash, None)
+        logger.info("Revoked device token %s", token_id)
+        return True
+
+    def revoke_token(self, token: str) -> bool:
+        """Revokes the device token itself, e.g. on logout from that device."""
+        record = self._lookup(_digest(token))
+        return record is not None and self.revoke(record["user_id"], record["token_id"])
+
+    def flush_last_used(self) -> int:
+        """Writes buffered last-used times in one batch; returns how many tokens."""
+        with self._lock:
+            pending, self._pending_last_used = self._pending_last_used, {}
+            for token_hash, last_used in pending.items():
+                entry = self._records.get(token_hash)
+                if entry is not None:
+                    entry[0]["last_used_at"] = last_used
+        if not pending or self._engine is None:
+            return len(pending)
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(self._touch, [{"b_hash": token_hash, "b_last_used": last_used}
+                                           for token_hash, last_used in pending.items()])
+        except Exception as e:
+            # Keep the times so they are retried, unless a newer use replaced them
+            with self._lock:
+                for token_hash, last_used in pending.items():
+                    self._pending_last_used.setdefault(token_hash, last_used)
+            logger.error("Failed to flush device token last-used times: %s", str(e))
+            raise
+        return len(pending)
+
+    async def run_flusher(self, interval: float) -> None:
+        """Periodically flushes last-used times off the event loop until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.flush_last_used)
+            except Exception as e:
+                # Times are retried on the next interval
+                logger.error("Device token last-used flusher failed: %s", str(e))
+
+    @staticmethod
+    def _public(record: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in record.items() if key != "token_hash"}
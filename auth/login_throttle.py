@@ -0,0 +1,86 @@
+from typing import Dict, Optional
+from collections import OrderedDict
+import threading
+import time
+
+
+class _KeyState:
+    __slots__ = ("window", "current", "previous", "lockouts", "locked_until")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.current = 0
+        self.previous = 0
+        self.lockouts = 0
+        self.locked_until = 0.0
+
+
+class FailureThrottle:
+    """
+    Counts failed logins per key (a username or a client IP) over a sliding
+    window, and locks a key out once it exceeds `limit`. Each further lockout
+    doubles, up to `max_lockout`.
+
+    The window is approximated from the current and previous fixed windows,
+    so each key costs a few integers. At most `max_keys` keys are tracked;
+    the least recently seen are forgotten first.
+    """
+
+    def __init__(self, limit: int, window: float, base_lockout: float,
+                 max_lockout: float, max_keys: int = 100000):
+        self._limit = limit
+        self._window = window
+        self._base_lockout = base_lockout
+        self._max_lockout = max_lockout
+        self._max_keys = max_keys
+        self._keys: "OrderedDict[str, _KeyState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _state(self, key: str, now: float, create: bool) -> Optional[_KeyState]:
+        window = int(now // self._window)
+        state = self._keys.get(key)
+        if state is None:
+            if not create:
+                return None
+            state = self._keys[key] = _KeyState(window)
+            while len(self._keys) > self._max_keys:
+                self._keys.popitem(last=False)
+        else:
+            self._keys.move_to_end(key)
+        if state.window != window:
+            state.previous = state.current if state.window == window - 1 else 0
+            state.current = 0
+            state.window = window
+        return state
+
+    def _failures(self, state: _KeyState, now: float) -> float:
+        elapsed = (now % self._window) / self._window
+        return state.previous * (1 - elapsed) + state.current
+
+    def retry_after(self, key: str, now: Optional[float] = None) -> float:
+        """Returns seconds until the key may try again, or 0.0 if it may now."""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._state(key, now, create=False)
+            if state is None or state.locked_until <= now:
+                return 0.0
+            return state.locked_until - now
+
+    def record_failure(self, key: str, now: Optional[float] = None) -> None:
+        """Counts a failed attempt, locking the key out when over the limit."""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._state(key, now, create=True)
+            state.current += 1
+            if self._failures(state, now) > self._limit:
+                lockout = min(self._base_lockout * 2 ** state.lockouts, self._max_lockout)
+                state.locked_until = now + lockout
+                state.lockouts += 1
+
+    def reset(self, key: str) -> None:
+        """Forgets a key's failures and lockout history."""
+        with self._lock:
+            self._keys.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -0,0 +1,238 @@
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import heapq
+import hmac
+import logging
+import secrets
+import threading
+import time
+import uuid
+from sqlalchemy import (Column, Float, Index, Integer, LargeBinary, MetaData, String, Table, bindparam,
+                        delete, insert, select, update)
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PREFIX = "rt_"
+
+_metadata = MetaData()
+
+refresh_families_table = Table(
+    "refresh_token_families", _metadata,
+    Column("handle", LargeBinary(16), primary_key=True),
+    Column("user_id", String(64), nullable=False),
+    Column("username", String(150), nullable=False),
+    Column("generation", Integer, nullable=False),
+    Column("token_digest", LargeBinary(16), nullable=False),
+    Column("previous_digest", LargeBinary(16)),
+    Column("expires_at", Float, nullable=False),
+    Index("ix_refresh_token_families_expires_at", "expires_at"),
+)
+
+
+class RefreshTokenReused(Exception):
+    """Raised when a rotated-out refresh token is presented again."""
+
+
+class _Family:
+    """The current state of one login's chain of refresh tokens."""
+
+    __slots__ = ("user_id", "username", "generation", "token_digest", "previous_digest", "expires_at")
+
+    def __init__(self, user_id: str, username: str, generation: int, token_digest: bytes,
+                 expires_at: float, previous_digest: Optional[bytes] = None):
+        self.user_id = user_id
+        self.username = username
+        self.generation = generation
+        self.token_digest = token_digest
+        self.previous_digest = previous_digest
+        self.expires_at = expires_at
+
+
+def _digest(secret: str) -> bytes:
+    return hashlib.sha256(secret.encode("utf-8")).digest()[:16]
+
+
+def _handle(family_id: bytes) -> bytes:
+    """Derives the key a family is stored and revoked under from the id in its tokens."""
+    return hashlib.sha256(b"refresh-family:" + family_id).digest()[:16]
+
+
+def _parse(token: str) -> Optional[Tuple[bytes, str]]:
+    """Splits "rt_<family hex>.<secret>" into the family key and secret."""
+    if not token.startswith(TOKEN_PREFIX):
+        return None
+    family_hex, _, secret = token[len(TOKEN_PREFIX):].partition(".")
+    try:
+        family_id = bytes.fromhex(family_hex)
+    except ValueError:
+        return None
+    if len(family_id) != 16 or not secret:
+        return None
+    return family_id, secret
+
+
+class RefreshTokenFamilies:
+    """
+    Rotating refresh tokens grouped into families, one per login.
+
+    Each family stores only its owner, a generation counter, 16-byte digests
+    of the one token currently valid and of the one it replaced, and an
+    absolute expiry. Refreshing swaps the digest for a new token's. Presenting
+    the replaced token means it was replayed, so the whole family is revoked
+    and its owner must log in again; any other unknown secret is rejected
+    without touching the family.
+
+    Families are stored under a handle derived from the id in their tokens.
+    The handle identifies a family for logout, but cannot be turned back into
+    a refresh token prefix, so it is safe to carry in access tokens.
+
+    Families expire `ttl` seconds after login; expired ones are pruned from a
+    heap, or from the expires_at index with an engine, as new ones are issued.
+    With an engine, rotation is a compare-and-swap on the stored digest, so
+    concurrent refreshes on different workers cannot both succeed.
+    """
+
+    def __init__(self, ttl: float, engine: Optional[Engine] = None):
+        self._ttl = ttl
+        self._engine = engine
+        self._families: Dict[bytes, _Family] = {}
+        self._heap: List[Tuple[float, bytes]] = []
+        self._lock = threading.Lock()
+        if engine is not None:
+            _metadata.create_all(engine)
+            t = refresh_families_table
+            self._select = select(t).where(t.c.handle == bindparam("b_handle"))
+            self._rotate = (update(t)
+                            .where(t.c.handle == bindparam("b_handle"))
+                            .where(t.c.token_digest == bindparam("b_old_digest"))
+                            .values(token_digest=bindparam("b_new_digest"),
+                                    previous_digest=bindparam("b_old_digest"),
+                                    generation=t.c.generation + 1))
+            self._delete = delete(t).where(t.c.handle == bindparam("b_handle"))
+
+    def __len__(self) -> int:
+        return len(self._families)
+
+    def issue(self, user: Dict[str, Any], now: Optional[float] = None) -> str:
+        """Starts a new family for a login and returns its first refresh token."""
+        now = time.time() if now is None else now
+        family_id = uuid.uuid4().bytes
+        handle = _handle(family_id)
+        secret = secrets.token_urlsafe(32)
+        family = _Family(str(user["id"]), user["username"], 0, _digest(secret), now + self._ttl)
+        if self._engine is not None:
+            t = refresh_families_table
+            with self._engine.begin() as conn:
+                conn.execute(delete(t).where(t.c.expires_at <= now))
+                conn.execute(insert(t), {
+                    "handle": handle, "user_id": family.user_id, "username": family.username,
+                    "generation": 0, "token_digest": family.token_digest, "previous_digest": None,
+                    "expires_at": family.expires_at
+                })
+        else:
+            with self._lock:
+                self.prune(now)
+                self._families[handle] = family
+                heapq.heappush(self._heap, (family.expires_at, handle))
+        return f"{TOKEN_PREFIX}{family_id.hex()}.{secret}"
+
+    def rotate(self, token: str, now: Optional[float] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Exchanges a refresh token for the next one in its family.
+
+        Returns:
+            The new refresh token and the family's user ("id" and "username").
+
+        Raises:
+            ValueError: If the token is malformed, unknown or expired.
+            RefreshTokenReused: If the token is the one rotated out last; the
+                family is revoked.
+        """
+        now = time.time() if now is None else now
+        parsed = _parse(token)
+        if parsed is None:
+            raise ValueError("Invalid refresh token")
+        family_id, secret = parsed
+        handle = _handle(family_id)
+        presented = _digest(secret)
+        new_secret = secrets.token_urlsafe(32)
+        new_digest = _digest(new_secret)
+
+        if self._engine is not None:
+            family = self._rotate_stored(handle, presented, new_digest, now)
+        else:
+            with self._lock:
+                family = self._families.get(handle)
+                if family is None or family.expires_at <= now:
+                    raise ValueError("Invalid refresh token")
+                if hmac.compare_digest(family.token_digest, presented):
+                    family.previous_digest = family.token_digest
+                    family.token_digest = new_digest
+                    family.generation += 1
+                elif family.previous_digest is not None and \
+                        hmac.compare_digest(family.previous_digest, presented):
+                    del self._families[handle]
+                    family = None
+                else:
+                    raise ValueError("Invalid refresh token")
+        if family is None:
+            logger.warning("Refresh token reuse detected; revoked token family %s", handle.hex())
+            raise RefreshTokenReused("Refresh token has already been used")
+
+        user = {"id": family.user_id, "username": family.username}
+        return f"{TOKEN_PREFIX}{family_id.hex()}.{new_secret}", user
+
+    def _rotate_stored(self, handle: bytes, presented: bytes, new_digest: bytes,
+                       now: float) -> Optional[_Family]:
+        """Rotates a stored family; returns None, having revoked it, on reuse."""
+        with self._engine.begin() as conn:
+            row = conn.execute(self._select, {"b_handle": handle}).first()
+            if row is None or row.expires_at <= now:
+                raise ValueError("Invalid refresh token")
+            if hmac.compare_digest(row.token_digest, presented):
+                # Losing the compare-and-swap means a concurrent refresh used it first
+                replayed = conn.execute(self._rotate, {
+                    "b_handle": handle, "b_old_digest": presented, "b_new_digest": new_digest
+                }).rowcount != 1
+            elif row.previous_digest is not None and hmac.compare_digest(row.previous_digest, presented):
+                replayed = True
+            else:
+                raise ValueError("Invalid refresh token")
+            if replayed:
+                conn.execute(self._delete, {"b_handle": handle})
+                return None
+        return _Family(row.user_id, row.username, row.generation + 1, new_digest, row.expires_at,
+                       previous_digest=presented)
+
+    @staticmethod
+    def handle(token: str) -> Optional[str]:
+        """Returns the hex handle of a refresh token's family, or None if malformed."""
+        parsed = _parse(token)
+        return _handle(parsed[0]).hex() if parsed is not None else None
+
+    def revoke(self, handle: str) -> bool:
+        """Revokes a whole family by its handle, e.g. on logout; returns False if it was unknown."""
+        try:
+            key = bytes.fromhex(handle)
+        except ValueError:
+            return False
+        if self._engine is not None:
+            with self._engine.begin() as conn:
+                revoked = conn.execute(self._delete, {"b_handle": key}).rowcount > 0
+        else:
+            with self._lock:
+                revoked = self._families.pop(key, None) is not None
+        if revoked:
+            logger.info("Revoked refresh token family %s", handle)
+        return revoked
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Forgets expired in-memory families; returns how many."""
+        now = time.time() if now is None else now
+        pruned = 0
+        while self._heap and self._heap[0][0] <= now:
+            _, handle = heapq.heappop(self._heap)
+            if self._families.pop(handle, None) is not None:
+                pruned += 1
+        return pruned
@@ -0,0 +1,102 @@
+from typing import Dict, List, Optional, Tuple, Union
+import heapq
+import logging
+import threading
+import time
+from sqlalchemy import Column, Float, Index, MetaData, String, Table, delete, insert, select
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+
+revoked_tokens_table = Table(
+    "revoked_tokens", _metadata,
+    Column("jti", String(64), primary_key=True),
+    Column("expires_at", Float, nullable=False),
+    Index("ix_revoked_tokens_expires_at", "expires_at"),
+)
+
+
+class RevocationList:
+    """
+    Revoked access-token IDs (`jti`), each kept only until the token's own
+    `exp`, after which the token is rejected as expired anyway.
+
+    Hex jtis are stored as 16-byte keys. Checking a jti is a single dict
+    lookup; expired entries are pruned from a heap as new revocations arrive.
+    With an engine, revocations are also written to the DB_URI database and
+    reloaded on start, so a restart does not bring revoked tokens back, and
+    again every `reload_interval` seconds, so other workers' revocations are
+    seen.
+    """
+
+    def __init__(self, engine: Optional[Engine] = None, reload_interval: float = 5):
+        self._entries: Dict[Union[bytes, str], float] = {}
+        self._heap: List[Tuple[float, Union[bytes, str]]] = []
+        self._lock = threading.Lock()
+        self._engine = engine
+        self._reload_interval = reload_interval
+        self._next_reload = 0.0
+        if engine is not None:
+            _metadata.create_all(engine)
+            with engine.begin() as conn:
+                conn.execute(delete(revoked_tokens_table)
+                             .where(revoked_tokens_table.c.expires_at <= time.time()))
+            self.reload()
+
+    @staticmethod
+    def _key(jti: str) -> Union[bytes, str]:
+        try:
+            return bytes.fromhex(jti) if len(jti) == 32 else jti
+        except ValueError:
+            return jti
+
+    def _remember(self, jti: str, expires_at: float) -> None:
+        key = self._key(jti)
+        self._entries[key] = expires_at
+        heapq.heappush(self._heap, (expires_at, key))
+
+    def add(self, jti: str, expires_at: float) -> None:
+        """Revokes a token ID until `expires_at` (epoch seconds)."""
+        with self._lock:
+            self.prune()
+            self._remember(jti, expires_at)
+        if self._engine is not None:
+            with self._engine.begin() as conn:
+                conn.execute(delete(revoked_tokens_table).where(revoked_tokens_table.c.jti == jti))
+                conn.execute(insert(revoked_tokens_table), {"jti": jti, "expires_at": expires_at})
+
+    def reload(self) -> None:
+        """Adds unexpired revocations from the database, e.g. those made by other workers."""
+        t = revoked_tokens_table
+        with self._engine.connect() as conn:
+            rows = conn.execute(select(t).where(t.c.expires_at > time.time())).all()
+        with self._lock:
+            for row in rows:
+                if self._entries.get(self._key(row.jti)) != row.expires_at:
+                    self._remember(row.jti, row.expires_at)
+            self._next_reload = time.monotonic() + self._reload_interval
+
+    def __contains__(self, jti: str) -> bool:
+        if self._engine is not None and time.monotonic() >= self._next_reload:
+            self.reload()
+        return self._key(jti) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Forgets token IDs whose tokens have expired; returns how many."""
+        now = time.time() if now is None else now
+        pruned = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            if self._entries.get(key) == expires_at:
+                del self._entries[key]
+                pruned += 1
+        if pruned and self._engine is not None:
+            with self._engine.begin() as conn:
+                conn.execute(delete(revoked_tokens_table)
+                             .where(revoked_tokens_table.c.expires_at <= now))
+        return pruned
@@ -0,0 +1,74 @@
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of verified access tokens, so repeated requests with the
+    same token skip JWT decoding, signature checks and the user lookup. Each
+    entry is whatever the verifier needs on a hit, e.g. the user and the
+    token's revocation IDs.
+
+    Entries are keyed by a SHA-256 digest of the token (the raw token is never
+    kept) and expire at the token's own `exp`, so caching never extends a
+    token's lifetime.
+    """
+
+    def __init__(self, capacity: int = 10000):
+        self._capacity = capacity
+        # digest -> (entry, exp epoch seconds)
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Returns the cached entry for a token, or None on a miss or expiry."""
+        digest = self._digest(token)
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[digest]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return dict(entry[0])
+
+    def put(self, token: str, entry: Dict[str, Any], expires_at: float) -> None:
+        """Caches a verified token's entry until `expires_at` (epoch seconds)."""
+        digest = self._digest(token)
+        with self._lock:
+            self._entries.pop(digest, None)
+            self._entries[digest] = (dict(entry), expires_at)
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, token: str) -> None:
+        """Drops a single token, e.g. on logout."""
+        digest = self._digest(token)
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns size and hit-rate counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "capacity": self._capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,129 @@
+from typing import Any, Dict, Iterator, Optional, Tuple
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import logging
+import threading
+import time
+from sqlalchemy import (Column, DateTime, Index, MetaData, String, Table, bindparam, delete,
+                        func, insert, select, update)
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+users_table = Table(
+    "users", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("username", String(150), nullable=False),
+    Column("password", String(128)),
+    Column("created_at", DateTime),
+    Index("ix_users_username", "username", unique=True),
+)
+
+_RECORD_COLUMNS = list(users_table.c)
+_RECORD_KEYS = [c.name for c in _RECORD_COLUMNS]
+
+
+class SqlUserStore(MutableMapping):
+    """
+    Database-backed user store that behaves like a dict of username -> user
+    record, so users survive restarts and are visible to every worker.
+
+    Lookups go through the unique username index and are kept in a bounded
+    LRU cache for `ttl` seconds; writes made through this store update the
+    cache, and the TTL bounds how long another worker's changes stay unseen.
+    Returned records are copies: change them by storing a new record.
+    """
+
+    def __init__(self, engine: Engine, capacity: int = 10000, ttl: float = 60) -> None:
+        self._engine = engine
+        self._capacity = capacity
+        self._ttl = ttl
+        self._cache: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        metadata.create_all(engine)
+
+        t = users_table
+        self._select_by_username = select(*_RECORD_COLUMNS).where(t.c.username == bindparam("b_username"))
+        self._insert = insert(t)
+        self._update_password = (update(t)
+                                 .where(t.c.username == bindparam("b_username"))
+                                 .where(t.c.id == bindparam("b_id"))
+                                 .values(password=bindparam("b_password")))
+        self._delete_by_username = delete(t).where(t.c.username == bindparam("b_username"))
+
+    def _cached(self, username: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._cache.get(username)
+            if entry is None:
+                return None
+            record, cached_at = entry
+            if time.monotonic() - cached_at > self._ttl:
+                del self._cache[username]
+                return None
+            self._cache.move_to_end(username)
+            return dict(record)
+
+    def _remember(self, username: str, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._cache[username] = (dict(record), time.monotonic())
+            self._cache.move_to_end(username)
+            while len(self._cache) > self._capacity:
+                self._cache.popitem(last=False)
+
+    def _forget(self, username: str) -> None:
+        with self._lock:
+            self._cache.pop(username, None)
+
+    def __getitem__(self, username: str) -> Dict[str, Any]:
+        record = self._cached(username)
+        if record is not None:
+            return record
+        with self._engine.connect() as conn:
+            row = conn.execute(self._select_by_username, {"b_username": username}).first()
+        if row is None:
+            raise KeyError(username)
+        record = dict(row._mapping)
+        self._remember(username, record)
+        return dict(record)
+
+    def __setitem__(self, username: str, record: Dict[str, Any]) -> None:
+        """
+        Stores a user. A record with the stored user's id updates its password;
+        any other record is inserted, and a username that is already taken
+        raises ValueError, even when two workers create it at once.
+        """
+        values = {key: record.get(key) for key in _RECORD_KEYS}
+        values["username"] = username
+        try:
+            with self._engine.begin() as conn:
+                updated = conn.execute(self._update_password, {
+                    "b_username": username, "b_id": values["id"], "b_password": values["password"]
+                }).rowcount
+                if updated == 0:
+                    conn.execute(self._insert, values)
+        except IntegrityError as e:
+            self._forget(username)
+            raise ValueError(f"User {username} already exists") from e
+        self._remember(username, values)
+
+    def __delitem__(self, username: str) -> None:
+        self._forget(username)
+        with self._engine.begin() as conn:
+            if conn.execute(self._delete_by_username, {"b_username": username}).rowcount == 0:
+                raise KeyError(username)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._engine.connect() as conn:
+            usernames = conn.execute(select(users_table.c.username)).scalars().all()
+        return iter(usernames)
+
+    def __len__(self) -> int:
+        with self._engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(users_table)).scalar_one()
+
+    def invalidate(self, username: str) -> None:
+        """Drops a user from the cache so the next lookup reads the database."""
+        self._forget(username)
@@ -11,16 +11,66 @@ logger = logging.getLogger(__name__)
 # Default configuration
 _DEFAULT_CONFIG = {
     "DB_URI": "sqlite:///:memory:",
+    "DB_POOL_SIZE": 5,
+    "DB_MAX_OVERFLOW": 10,
     "STORAGE_PATH": "uploads",
     "MAX_FILE_SIZE": 100 * 1024 * 1024,  # 100MB
     "ALLOWED_EXTENSIONS": [".txt", ".pdf", ".png", ".jpg", ".jpeg", ".gif"],
     "JWT_SECRET_KEY": "your-secret-key",  # Change in production
-    "JWT_ALGORITHM": "HS256",
+    "JWT_ALGORITHM": "HS256",  # "HS256" (JWT_SECRET_KEY) or "EdDSA" (JWT_PRIVATE_KEY_PATH)
+    "JWT_KEY_ID": "default",  # kid of the current signing key
+    "JWT_PREVIOUS_KEYS": [],  # Verify-only "kid=secret" (or "kid=public-key-path" for EdDSA) entries
+    "JWT_PRIVATE_KEY_PATH": "",  # Ed25519 private key (PEM) when JWT_ALGORITHM is "EdDSA"
     "JWT_EXPIRE_MINUTES": 30,
+    "AUTH_TOKEN_CACHE_SIZE": 10000,  # Verified access tokens kept in memory
+    "AUTH_REVOCATION_BACKEND": "memory",  # "memory" or "database" (uses DB_URI)
+    "AUTH_REVOCATION_RELOAD_SECONDS": 5,  # Bounds how long another worker's revocation goes unseen
+    "AUTH_DEVICE_TOKEN_BACKEND": "database",  # "database" (uses DB_URI) or "memory"
+    "AUTH_DEVICE_TOKEN_CACHE_TTL_SECONDS": 60,  # Bounds how long another worker's revocation goes unseen
+    "AUTH_DEVICE_TOKEN_FLUSH_INTERVAL_SECONDS": 60,  # Last-used times are written back in batches
+    "AUTH_REFRESH_TOKEN_EXPIRE_DAYS": 30,  # Refresh-token families expire this long after login
+    "AUTH_REFRESH_TOKEN_BACKEND": "database",  # "database" (uses DB_URI) or "memory"
+    "BCRYPT_ROUNDS": 12,  # bcrypt cost factor; each step doubles hashing time
+    "BCRYPT_POOL_SIZE": 4,  # Worker threads for password hashing
+    "BCRYPT_QUEUE_LIMIT": 64,  # Hashing calls allowed to wait before logins are refused
+    "AUTH_LOGIN_MAX_FAILURES_PER_USER": 5,  # Within AUTH_LOGIN_WINDOW_SECONDS
+    "AUTH_LOGIN_MAX_FAILURES_PER_IP": 20,
+    "AUTH_LOGIN_WINDOW_SECONDS": 300,
+    "AUTH_LOGIN_LOCKOUT_SECONDS": 30,  # First lockout; doubles on each repeat
+    "AUTH_LOGIN_MAX_LOCKOUT_SECONDS": 3600,
+    "AUTH_LOGIN_THROTTLE_MAX_KEYS": 100000,  # Usernames and IPs tracked per throttle
+    "USER_STORE_BACKEND": "database",  # "database" (uses DB_URI) or "memory"
+    "USER_CACHE_SIZE": 10000,  # Users kept in the read-through cache
+    "USER_CACHE_TTL_SECONDS": 60,  # Bounds how long other workers' user changes go unseen
+    "SESSION_STORE_SHARDS": 16,  # Independently locked session partitions
+    "SESSION_STORE_BACKEND": "memory",  # "memory" or "database" (uses DB_URI)
     "HOST": "localhost",
     "PORT": 8000,
     "DEBUG": True,
-    "LOG_LEVEL": "INFO"
+    "LOG_LEVEL": "INFO",
+    "SYNC_TOMBSTONE_RETENTION_DAYS": 30,
+    "SYNC_SNAPSHOT_INTERVAL_SECONDS": 300,
+    "SYNC_VERSION_HISTORY_LIMIT": 16,  # Text versions kept per file as merge ancestors
+    "SYNC_VERSION_HISTORY_MAX_FILES": 10000,  # Files with merge ancestors kept, least recently updated dropped first
+    "SHARE_SWEEP_INTERVAL_SECONDS": 60,
+    "SHARE_SWEEP_BATCH_SIZE": 1000,
+    "SHARE_STORE_BACKEND": "memory",  # "memory" or "database" (uses DB_URI)
+    "SHARE_TOKEN_MODE": "stored",  # "stored" or "signed"
+    "SHARE_SIGNING_KEY": "",  # Required when SHARE_TOKEN_MODE is "signed"
+    "SHARE_MAX_EXPIRES_DAYS": 365,  # Longest share lifetime, also enforced on signed tokens
+    "SHARE_REVOCATION_FILTER_CAPACITY": 100000,
+    "SHARE_ACCESS_FLUSH_INTERVAL_SECONDS": 5,
+    "SHARE_ACCESS_FLUSH_THRESHOLD": 10000,  # Distinct tokens buffered before an inline flush
+    "SHARE_BULK_MAX_ITEMS": 1000,  # Per bulk create or revoke request
+    "SHARE_DOWNLOAD_MAX_AGE_SECONDS": 300,  # Caps proxy caching so revocations take effect
+    "SHARE_RATE_LIMIT_READ_PER_SECOND": 20,  # Per share token
+    "SHARE_RATE_LIMIT_WRITE_PER_SECOND": 10,  # Per share token
+    "SHARE_RATE_LIMIT_IP_PER_SECOND": 10,  # Per client IP across all share links
+    "SHARE_RATE_LIMIT_BURST_SECONDS": 5,  # Bucket size, in seconds of sustained rate
+    "SHARE_NEGATIVE_CACHE_SIZE": 100000,  # Invalid tokens remembered to absorb scanning
+    "SHARE_NEGATIVE_CACHE_TTL_SECONDS": 300,
+    "SHARE_MISS_LOG_INTERVAL_SECONDS": 60,  # Invalid-token lookups are logged as one summary per interval
+    "GZIP_MINIMUM_SIZE": 1024  # Bytes; smaller responses are sent uncompressed
 }
 
 def load_config(config_file: str = None) -> Dict[str, Any]:
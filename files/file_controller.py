@@ -1,8 +1,10 @@
 from typing import Any, Dict, List
+import io
 import logging
 from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, status, Form
 from fastapi.responses import StreamingResponse
 from auth.auth_service import get_current_user
+from utils.http_headers import content_disposition
 from . import file_service
 
 router = APIRouter(prefix="/files", tags=["Files"])
@@ -12,15 +14,32 @@ logger = logging.getLogger(__name__)
 async def upload_file_endpoint(
     upload_file: UploadFile = File(...),
     folder_id: str | None = Form(None),
+    file_id: str | None = Form(None),
+    device_id: str | None = Form(None),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> Dict[str, Any]:
-    """Handles file upload requests."""
-    # TODO: Implement file upload functionality
-    # 1. Call store_file from file_service to store the file with user_id and folder_id
-    # 2. Log successful upload with file_id
-    # 3. Return success message with file_id
-    # 4. Handle exceptions with 500 INTERNAL_SERVER_ERROR
-    pass
+    """Handles file upload requests; `device_id` identifies the syncing client."""
+    try:
+        metadata = await file_service.store_file(
+            current_user["id"], upload_file, folder_id, file_id=file_id, device_id=device_id
+        )
+        logger.info("File uploaded successfully: %s", metadata["file_id"])
+        return {
+            "message": "File uploaded successfully",
+            "file_id": metadata["file_id"],
+            "filename": metadata.get("original_name"),
+            "version_vector": metadata.get("version_vector")
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        logger.error("File upload failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to upload file: {str(e)}"
+        )
 
 @router.get("/download/{file_id}")
 async def download_file_endpoint(
@@ -28,13 +47,102 @@ async def download_file_endpoint(
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> StreamingResponse:
     """Returns file data to the client."""
-    # TODO: Implement file download functionality
-    # 1. Fetch file data using file_service.fetch_file with file_id
-    # 2. Verify user has access to this file by checking user_id
-    # 3. Return file as StreamingResponse with proper Content-Disposition header
-    # 4. Handle FileNotFoundError with 404 NOT_FOUND
-    # 5. Handle other exceptions with 500 INTERNAL_SERVER_ERROR
-    pass
+    try:
+        result = file_service.fetch_file(file_id)
+        metadata = result["metadata"]
+        if metadata.get("user_id") != current_user["id"]:
+            raise FileNotFoundError("File not found")
+
+        filename = metadata.get("original_name") or metadata.get("filename") or file_id
+        return StreamingResponse(
+            io.BytesIO(result["file_bytes"]),
+            media_type=metadata.get("type") or "application/octet-stream",
+            headers={"Content-Disposition": content_disposition(filename)}
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"File not found: {str(e)}")
+    except Exception as e:
+        logger.error("File download failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to download file: {str(e)}"
+        )
+
+@router.delete("/{file_id}")
+async def delete_file_endpoint(
+    file_id: str,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Deletes a file owned by the authenticated user."""
+    try:
+        file_service.delete_file(file_id, current_user["id"])
+        return {"message": "File deleted successfully", "file_id": file_id}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        logger.error("File deletion failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to delete file: {str(e)}"
+        )
+
+@router.post("/folders")
+async def create_folder_endpoint(
+    name: str,
+    parent_id: str | None = None,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Creates a folder for the authenticated user."""
+    try:
+        return file_service.create_folder(current_user["id"], name, parent_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        logger.error("Folder creation failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create folder: {str(e)}"
+        )
+
+@router.post("/folders/{folder_id}/move")
+async def move_folder_endpoint(
+    folder_id: str,
+    parent_id: str | None = None,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Moves a folder under another folder, or to the root when parent_id is omitted."""
+    try:
+        return file_service.move_folder(folder_id, current_user["id"], parent_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        logger.error("Folder move failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to move folder: {str(e)}"
+        )
+
+@router.post("/{file_id}/move")
+async def move_file_endpoint(
+    file_id: str,
+    folder_id: str | None = None,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Moves a file into a folder, or to the root when folder_id is omitted."""
+    try:
+        return file_service.move_file(file_id, current_user["id"], folder_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        logger.error("File move failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to move file: {str(e)}"
+        )
 
 @router.get("/list")
 async def list_files_endpoint(
@@ -42,8 +150,12 @@ async def list_files_endpoint(
     folder_id: str = None
 ) -> Dict[str, Any]:
     """Lists files for the authenticated user."""
-    # TODO: Implement file listing functionality 
-    # 1. Call file_service.list_user_files with user_id and folder_id
-    # 2. Return list of files with total count
-    # 3. Handle exceptions with 500 INTERNAL_SERVER_ERROR
-    pass
\ No newline at end of file
+    try:
+        files = file_service.list_user_files(user_id=current_user["id"], folder_id=folder_id)
+        return {"files": files, "total": len(files)}
+    except Exception as e:
+        logger.error("File listing failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to list files: {str(e)}"
+        )
@@ -1,34 +1,114 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 import os
 import uuid
 import logging
 from datetime import datetime
 from pathlib import Path
 from fastapi import UploadFile
+from sync import change_journal
 
 logger = logging.getLogger(__name__)
 
 # Mock database for file metadata
 _file_db: Dict[str, Dict[str, Any]] = {}
 
+# Mock database for folders: folder_id -> {"folder_id", "user_id", "name", "parent_id"}
+_folder_db: Dict[str, Dict[str, Any]] = {}
+
+# Incremented on every move so caches derived from the hierarchy can detect staleness
+_hierarchy_version = 0
+
 # Configuration
 UPLOAD_DIR = Path("uploads")
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
 ALLOWED_EXTENSIONS = {'.txt', '.pdf', '.png', '.jpg', '.jpeg', '.gif'}
 
-async def store_file(user_id: str, file_obj: UploadFile, folder_id: str | None = None) -> Dict[str, Any]:
-    """Stores a file and returns metadata."""
-    # TODO: Implement file storage functionality
-    # 1. Read the file content from the UploadFile object
-    # 2. Generate a unique file ID (UUID)
-    # 3. Create the upload directory if it doesn't exist
-    # 4. Determine the file path using the ID and original filename
-    # 5. Write the file content to disk
-    # 6. Create metadata with file_id, original_name, size, user_id, folder_id, timestamp, type, and storage_path
-    # 7. Store metadata in _file_db dictionary
-    # 8. Return the metadata
-    # 9. Handle exceptions appropriately
-    pass
+def _record_text_version(file_id: str, extension: str, version_vector: Dict[str, int],
+                         content: bytes) -> None:
+    """Keeps an uploaded text version as a merge ancestor for later concurrent edits."""
+    # Imported here because sync_service imports this module
+    from sync import sync_service
+
+    if extension not in sync_service.MERGEABLE_EXTENSIONS:
+        return
+    try:
+        text = content.decode("utf-8")
+    except UnicodeDecodeError:
+        return
+    sync_service.record_version(file_id, version_vector, text)
+
+
+async def store_file(user_id: str, file_obj: UploadFile, folder_id: str | None = None,
+                     file_id: str | None = None, device_id: str | None = None) -> Dict[str, Any]:
+    """
+    Stores a file and returns metadata. Passing an existing file_id replaces its
+    content, in the same folder unless folder_id is given.
+
+    Each store bumps the uploading device's entry in the file's version vector
+    ("server" when no device is given).
+    """
+    if not user_id:
+        raise ValueError("User ID cannot be empty")
+
+    try:
+        content = await file_obj.read()
+        original_name = file_obj.filename or ""
+        extension = Path(original_name).suffix.lower()
+
+        if extension not in ALLOWED_EXTENSIONS:
+            raise ValueError(f"File type not allowed: {extension or original_name}")
+        if len(content) > MAX_FILE_SIZE:
+            raise ValueError("File exceeds maximum allowed size")
+
+        existing = _file_db.get(file_id) if file_id else None
+        if file_id and (existing is None or existing["user_id"] != user_id):
+            raise FileNotFoundError(f"File not found: {file_id}")
+        if existing is None:
+            file_id = str(uuid.uuid4())
+        elif folder_id is None:
+            # Replacing content without naming a folder keeps the file where it is
+            folder_id = existing.get("folder_id")
+
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        storage_path = UPLOAD_DIR / f"{file_id}{extension}"
+        with open(storage_path, "wb") as f:
+            f.write(content)
+
+        version_vector = dict(existing.get("version_vector") or {}) if existing else {}
+        writer = device_id or "server"
+        version_vector[writer] = version_vector.get(writer, 0) + 1
+
+        now = datetime.utcnow()
+        metadata = {
+            "file_id": file_id,
+            "original_name": original_name,
+            "size": len(content),
+            "user_id": user_id,
+            "folder_id": folder_id,
+            "timestamp": existing["timestamp"] if existing else now.isoformat(),
+            "updated_at": now.isoformat(),
+            "type": getattr(file_obj, "content_type", None) or extension.lstrip("."),
+            "storage_path": str(storage_path),
+            "version_vector": version_vector
+        }
+        if existing and existing["storage_path"] != metadata["storage_path"]:
+            Path(existing["storage_path"]).unlink(missing_ok=True)
+
+        _file_db[file_id] = metadata
+        _record_text_version(file_id, extension, version_vector, content)
+        change_journal.record_change(
+            user_id, file_id,
+            change_journal.ChangeType.MODIFY if existing else change_journal.ChangeType.CREATE,
+            metadata
+        )
+        logger.info("Stored file %s for user %s", file_id, user_id)
+        return metadata
+
+    except (ValueError, FileNotFoundError):
+        raise
+    except Exception as e:
+        logger.error("Failed to store file: %s", str(e))
+        raise RuntimeError(f"Failed to store file: {str(e)}") from e
 
 
 def fetch_file(file_id: str) -> Dict[str, Any]:
@@ -46,22 +126,156 @@ def fetch_file(file_id: str) -> Dict[str, Any]:
         FileNotFoundError: If the file does not exist or the user has no access.
         RuntimeError: If the fetch operation fails.
     """
-    # TODO: Implement file retrieval functionality
-    # 1. Validate the file_id parameter
-    # 2. Get file metadata from _file_db
-    # 3. Verify the file exists in the database
-    # 4. Get the file path from metadata
-    # 5. Check if the file exists on disk
-    # 6. Read the file bytes from disk
-    # 7. Return both metadata and file bytes
-    # 8. Handle exceptions appropriately (FileNotFoundError, etc.)
-    pass
+    if file_id is None or file_id == "":
+        raise ValueError("File ID cannot be empty")
+
+    metadata = _file_db.get(file_id)
+    if metadata is None:
+        raise FileNotFoundError(f"File not found: {file_id}")
+
+    file_path = Path(metadata["storage_path"])
+    if not file_path.exists():
+        raise FileNotFoundError(f"File not found on disk: {file_id}")
+
+    try:
+        with open(file_path, "rb") as f:
+            file_bytes = f.read()
+        return {"metadata": metadata, "file_bytes": file_bytes}
+    except Exception as e:
+        logger.error("Failed to fetch file %s: %s", file_id, str(e))
+        raise RuntimeError(f"Failed to fetch file: {str(e)}") from e
+
+
+def get_file_metadata(file_id: str) -> Dict[str, Any]:
+    """
+    Returns a file's metadata after checking that its content exists on disk.
+
+    Raises:
+        FileNotFoundError: If the file is unknown or missing from storage.
+    """
+    metadata = _file_db.get(file_id)
+    if metadata is None or not Path(metadata["storage_path"]).exists():
+        raise FileNotFoundError(f"File not found: {file_id}")
+    return metadata
+
+
+def iter_file_range(storage_path: str, start: int, end: int,
+                    chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Yields the bytes of a stored file from start to end (inclusive) in chunks."""
+    with open(storage_path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def delete_file(file_id: str, user_id: str) -> None:
+    """Deletes a file owned by the user and journals a tombstone for sync clients."""
+    metadata = _file_db.get(file_id)
+    if metadata is None or metadata["user_id"] != user_id:
+        raise FileNotFoundError(f"File not found: {file_id}")
+
+    try:
+        # Imported here because sync_service imports this module
+        from sync import sync_service
+
+        del _file_db[file_id]
+        sync_service.forget_versions(file_id)
+        Path(metadata["storage_path"]).unlink(missing_ok=True)
+        change_journal.record_change(user_id, file_id, change_journal.ChangeType.DELETE)
+        logger.info("Deleted file %s for user %s", file_id, user_id)
+    except Exception as e:
+        logger.error("Failed to delete file %s: %s", file_id, str(e))
+        raise RuntimeError(f"Failed to delete file: {str(e)}") from e
+
+
+def create_folder(user_id: str, name: str, parent_id: Optional[str] = None) -> Dict[str, Any]:
+    """Creates a folder, optionally nested inside another folder owned by the user."""
+    if not user_id:
+        raise ValueError("User ID cannot be empty")
+    if not name:
+        raise ValueError("Folder name cannot be empty")
+    if parent_id is not None:
+        parent = _folder_db.get(parent_id)
+        if parent is None or parent["user_id"] != user_id:
+            raise FileNotFoundError(f"Folder not found: {parent_id}")
+
+    folder = {
+        "folder_id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "name": name,
+        "parent_id": parent_id,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    _folder_db[folder["folder_id"]] = folder
+    logger.info("Created folder %s for user %s", folder["folder_id"], user_id)
+    return folder
+
+
+def get_folder_ancestors(folder_id: Optional[str]) -> List[str]:
+    """Returns the folder and its ancestors, nearest first. Unknown folders are top-level."""
+    ancestors = []
+    while folder_id is not None and folder_id not in ancestors:
+        ancestors.append(folder_id)
+        folder = _folder_db.get(folder_id)
+        folder_id = folder["parent_id"] if folder else None
+    return ancestors
+
+
+def hierarchy_version() -> int:
+    """Returns a counter that changes whenever a file or folder is moved."""
+    return _hierarchy_version
+
+
+def move_file(file_id: str, user_id: str, folder_id: Optional[str]) -> Dict[str, Any]:
+    """Moves a file into another folder (or the root when folder_id is None)."""
+    global _hierarchy_version
+    metadata = _file_db.get(file_id)
+    if metadata is None or metadata["user_id"] != user_id:
+        raise FileNotFoundError(f"File not found: {file_id}")
+    if folder_id is not None:
+        folder = _folder_db.get(folder_id)
+        if folder is None or folder["user_id"] != user_id:
+            raise FileNotFoundError(f"Folder not found: {folder_id}")
+
+    metadata = {**metadata, "folder_id": folder_id, "updated_at": datetime.utcnow().isoformat()}
+    _file_db[file_id] = metadata
+    _hierarchy_version += 1
+    change_journal.record_change(user_id, file_id, change_journal.ChangeType.MODIFY, metadata)
+    logger.info("Moved file %s to folder %s", file_id, folder_id)
+    return metadata
+
+
+def move_folder(folder_id: str, user_id: str, parent_id: Optional[str]) -> Dict[str, Any]:
+    """Moves a folder, with everything inside it, under another folder or to the root."""
+    global _hierarchy_version
+    folder = _folder_db.get(folder_id)
+    if folder is None or folder["user_id"] != user_id:
+        raise FileNotFoundError(f"Folder not found: {folder_id}")
+    if parent_id is not None:
+        parent = _folder_db.get(parent_id)
+        if parent is None or parent["user_id"] != user_id:
+            raise FileNotFoundError(f"Folder not found: {parent_id}")
+        if folder_id in get_folder_ancestors(parent_id):
+            raise ValueError("Cannot move a folder into itself or one of its subfolders")
+
+    folder["parent_id"] = parent_id
+    _hierarchy_version += 1
+    logger.info("Moved folder %s under %s", folder_id, parent_id)
+    return folder
 
 
 def list_user_files(user_id: str, folder_id: Optional[str] = None) -> List[Dict[str, Any]]:
     """Returns a list of file/folder metadata for a given user."""
-    # TODO: Implement file listing functionality
-    # 1. Filter _file_db values to get files matching user_id and folder_id
-    # 2. Return the list of file metadata
-    # 3. Handle exceptions appropriately
-    pass
\ No newline at end of file
+    try:
+        return [
+            metadata for metadata in _file_db.values()
+            if metadata.get("user_id") == user_id and metadata.get("folder_id") == folder_id
+        ]
+    except Exception as e:
+        logger.error("Failed to list files for user %s: %s", user_id, str(e))
+        raise
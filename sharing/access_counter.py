@@ -0,0 +1,67 @@
+from typing import Callable, Dict
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class AccessCounter:
+    """
+    Buffers share access-count increments in memory and flushes them coalesced
+    per token, either on an interval or once `threshold` distinct tokens are pending.
+    """
+
+    def __init__(self, flush: Callable[[Dict[str, int]], None], threshold: int = 10000):
+        self._flush = flush
+        self._threshold = threshold
+        self._pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, token: str) -> None:
+        """
+        Records one access; flushes inline only when the buffer is full.
+
+        A failed inline flush never reaches the caller: it is already logged
+        and the counts stay pending for the next flush.
+        """
+        with self._lock:
+            self._pending[token] = self._pending.get(token, 0) + 1
+            full = len(self._pending) >= self._threshold
+        if full:
+            try:
+                self.flush()
+            except Exception:
+                pass  # Already logged; counts are retried on the next flush
+
+    def pending(self, token: str) -> int:
+        """Returns accesses recorded for a token but not yet flushed."""
+        return self._pending.get(token, 0)
+
+    def flush(self) -> int:
+        """Writes all buffered increments and returns the number of tokens flushed."""
+        with self._lock:
+            counts, self._pending = self._pending, {}
+        if not counts:
+            return 0
+        try:
+            self._flush(counts)
+        except Exception as e:
+            # Put the counts back so they are retried on the next flush
+            with self._lock:
+                for token, count in counts.items():
+                    self._pending[token] = self._pending.get(token, 0) + count
+            logger.error("Failed to flush share access counts: %s", str(e))
+            raise
+        logger.debug("Flushed access counts for %d share tokens", len(counts))
+        return len(counts)
+
+    async def run_flusher(self, interval: float) -> None:
+        """Periodically flushes buffered increments off the event loop until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                # Counts are retried on the next interval
+                logger.error("Share access count flusher failed: %s", str(e))
@@ -0,0 +1,79 @@
+from typing import Dict, Optional
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+
+class NegativeCache:
+    """
+    Bounded cache of share tokens recently found unknown, expired or revoked,
+    mapped to the rejection reason, so repeated lookups skip validation.
+
+    Entries are keyed by the token's hash to keep memory per entry small and
+    independent of token length; the oldest entries are dropped at capacity.
+    """
+
+    def __init__(self, capacity: int = 100000, ttl: float = 300):
+        self._capacity = capacity
+        self._ttl = ttl
+        # hash(token) -> (reason, expires_at on the monotonic clock)
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str, now: Optional[float] = None) -> Optional[str]:
+        """Returns the cached rejection reason for a token, or None."""
+        entry = self._entries.get(hash(token))
+        if entry is None:
+            return None
+        reason, expires_at = entry
+        if (time.monotonic() if now is None else now) >= expires_at:
+            self.discard(token)
+            return None
+        return reason
+
+    def add(self, token: str, reason: str, now: Optional[float] = None) -> None:
+        """Caches a rejection, evicting the oldest entry when full."""
+        expires_at = (time.monotonic() if now is None else now) + self._ttl
+        with self._lock:
+            self._entries[hash(token)] = (reason, expires_at)
+            self._entries.move_to_end(hash(token))
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        """Forgets a token, e.g. because a share was (re)created under it."""
+        with self._lock:
+            self._entries.pop(hash(token), None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SampledLogger:
+    """
+    Aggregates a repeated log event and writes one summary line per interval
+    instead of one line per occurrence.
+    """
+
+    def __init__(self, logger: logging.Logger, message: str, interval: float = 60):
+        self._logger = logger
+        self._message = message
+        self._interval = interval
+        self._count = 0
+        self._reasons: Dict[str, int] = {}
+        self._last_emit = float("-inf")
+        self._lock = threading.Lock()
+
+    def record(self, reason: str, now: Optional[float] = None) -> bool:
+        """Counts one occurrence; returns True if a summary line was written."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._count += 1
+            self._reasons[reason] = self._reasons.get(reason, 0) + 1
+            if now - self._last_emit < self._interval:
+                return False
+            count, reasons = self._count, self._reasons
+            self._count, self._reasons, self._last_emit = 0, {}, now
+        self._logger.warning(self._message, count, reasons)
+        return True
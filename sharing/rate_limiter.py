@@ -0,0 +1,50 @@
+from typing import Any, Dict, List, Optional
+import threading
+import time
+
+
+class TokenBucketLimiter:
+    """
+    Sharded in-memory token-bucket rate limiter.
+
+    Each key gets a bucket refilled at `rate` tokens per second up to `burst`.
+    Keys are spread across independently locked shards to keep contention low,
+    and each shard holds at most `max_keys_per_shard` buckets; evicting a bucket
+    only forgets history, which can briefly grant a key a fresh burst.
+    """
+
+    def __init__(self, rate: float, burst: float, shards: int = 16,
+                 max_keys_per_shard: int = 10000):
+        if rate <= 0 or burst < 1:
+            raise ValueError("Rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self._max_keys = max_keys_per_shard
+        # Each shard maps key -> [available_tokens, last_refill_time]
+        self._shards: List[Dict[Any, List[float]]] = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def acquire(self, key: Any, now: Optional[float] = None) -> float:
+        """
+        Takes one token for the key.
+
+        Returns:
+            0.0 if the request is allowed, otherwise the seconds until it would be.
+        """
+        now = time.monotonic() if now is None else now
+        index = hash(key) % len(self._shards)
+        buckets = self._shards[index]
+        with self._locks[index]:
+            bucket = buckets.get(key)
+            if bucket is None:
+                if len(buckets) >= self._max_keys:
+                    del buckets[next(iter(buckets))]
+                bucket = buckets[key] = [self.burst, now]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / self.rate
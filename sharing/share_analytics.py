@@ -0,0 +1,130 @@
+from typing import Any, Dict, List, Optional
+from array import array
+from datetime import datetime, timezone
+import hashlib
+import math
+import threading
+import time
+
+HOURLY_BUCKETS = 48
+DAILY_BUCKETS = 30
+
+
+class HyperLogLog:
+    """Fixed-size approximate distinct counter (2**precision one-byte registers)."""
+
+    def __init__(self, precision: int = 10):
+        self._precision = precision
+        self._num_registers = 1 << precision
+        self._registers = bytearray(self._num_registers)
+        self._alpha = 0.7213 / (1 + 1.079 / self._num_registers)
+
+    def add(self, value: str) -> None:
+        h = int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+        index = h >> (64 - self._precision)
+        remainder = h & ((1 << (64 - self._precision)) - 1)
+        rank = (64 - self._precision) - remainder.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def count(self) -> int:
+        m = self._num_registers
+        estimate = self._alpha * m * m / sum(2.0 ** -r for r in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class _RingCounter:
+    """Counts events in fixed-width time buckets, keeping only the most recent ones."""
+
+    def __init__(self, num_buckets: int, width_seconds: int):
+        self._width = width_seconds
+        self._counts = array("I", [0] * num_buckets)
+        self._epochs = array("q", [-1] * num_buckets)
+
+    def add(self, now: float) -> None:
+        epoch = int(now // self._width)
+        index = epoch % len(self._counts)
+        if self._epochs[index] != epoch:
+            self._epochs[index] = epoch
+            self._counts[index] = 0
+        self._counts[index] += 1
+
+    def series(self, now: float) -> List[Dict[str, Any]]:
+        """Returns (bucket start, count) for every bucket in the window, oldest first."""
+        current = int(now // self._width)
+        result = []
+        for epoch in range(current - len(self._counts) + 1, current + 1):
+            index = epoch % len(self._counts)
+            count = self._counts[index] if self._epochs[index] == epoch else 0
+            start = datetime.fromtimestamp(epoch * self._width, tz=timezone.utc)
+            result.append({"start": start.isoformat(), "count": count})
+        return result
+
+
+class ShareStats:
+    """Per-share download counters with a fixed memory footprint."""
+
+    def __init__(self):
+        self.total = 0
+        self.hourly = _RingCounter(HOURLY_BUCKETS, 60 * 60)
+        self.daily = _RingCounter(DAILY_BUCKETS, 24 * 60 * 60)
+        self.visitors = HyperLogLog()
+
+    def record(self, now: float, visitor_id: Optional[str]) -> None:
+        self.total += 1
+        self.hourly.add(now)
+        self.daily.add(now)
+        if visitor_id is not None:
+            self.visitors.add(visitor_id)
+
+
+class ShareAnalytics:
+    """Collects ShareStats per share token."""
+
+    def __init__(self):
+        self._stats: Dict[str, ShareStats] = {}
+        self._lock = threading.Lock()
+
+    def record_hit(self, token: str, visitor_id: Optional[str] = None,
+                   now: Optional[float] = None) -> None:
+        """Records one access to a share; constant time and memory per call."""
+        now = time.time() if now is None else now
+        with self._lock:
+            stats = self._stats.get(token)
+            if stats is None:
+                stats = self._stats[token] = ShareStats()
+            stats.record(now, visitor_id)
+
+    def get_stats(self, token: str, now: Optional[float] = None) -> Dict[str, Any]:
+        """Returns totals, hourly and daily series, and the approximate unique visitors."""
+        now = time.time() if now is None else now
+        with self._lock:
+            stats = self._stats.get(token) or ShareStats()
+            return {
+                "total_accesses": stats.total,
+                "unique_visitors": stats.visitors.count(),
+                "hourly": stats.hourly.series(now),
+                "daily": stats.daily.series(now),
+            }
+
+    def tokens(self) -> List[str]:
+        """Returns the tokens that currently have statistics."""
+        with self._lock:
+            return list(self._stats)
+
+    def retain(self, tokens) -> int:
+        """
+        Drops statistics for shares that are no longer stored; returns how many.
+
+        `tokens` should support fast membership checks (e.g. the dict returned
+        by the share store's get_many), since every tracked token is checked.
+        """
+        with self._lock:
+            stale = [token for token in self._stats if token not in tokens]
+            for token in stale:
+                del self._stats[token]
+        return len(stale)
@@ -1,10 +1,26 @@
-from typing import Dict, Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+import hashlib
+import logging
+import math
+import re
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from auth.auth_service import get_current_user
+from config import load_config
+from files import file_service
+from utils.http_headers import content_disposition
 from . import share_service
 
+# Endpoints are plain functions, so FastAPI runs them in its threadpool: the
+# share service makes blocking calls to the share store
 router = APIRouter(prefix="/share", tags=["Sharing"])
+logger = logging.getLogger(__name__)
+
+config = load_config()
+DOWNLOAD_MAX_AGE_SECONDS = config["SHARE_DOWNLOAD_MAX_AGE_SECONDS"]
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
 
 # Replace type alias with Pydantic models
 class ShareLinkResponse(BaseModel):
@@ -16,7 +32,8 @@ class ShareLinkResponse(BaseModel):
 
 class ShareAccessResponse(BaseModel):
     """Response model for share access."""
-    file_id: str
+    file_id: Optional[str] = None
+    folder_id: Optional[str] = None
     permission_level: str
     expires_at: str
 
@@ -25,50 +42,328 @@ class ShareListResponse(BaseModel):
     shares: List[Dict[str, Any]]
     total: int
 
+class BulkShareRequest(BaseModel):
+    """Request model for creating share links for several files."""
+    file_ids: List[str]
+    permission: str = share_service.SharePermission.READ
+    expires_in_days: int = 7
+
+class BulkShareResponse(BaseModel):
+    """Response model for bulk share link creation."""
+    shares: List[ShareLinkResponse]
+    total: int
+
+class BulkRevokeRequest(BaseModel):
+    """Request model for revoking share links by token, or all shares on a file."""
+    tokens: Optional[List[str]] = None
+    file_id: Optional[str] = None
+
+class BulkRevokeResponse(BaseModel):
+    """Response model for bulk share link revocation."""
+    revoked: List[str]
+    not_found: List[str]
+    unauthorized: List[str]
+
+def _isoformat(value: Any) -> str:
+    """Formats a share timestamp for API responses."""
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def _validate_rate_limited(request: Request, token: str) -> Dict[str, Any]:
+    """
+    Validates a share token after checking the client IP and token access rates.
+
+    The access is only counted once both limits pass, so rejected requests
+    do not inflate access counts or analytics.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    share_service.check_ip_rate_limit(client_ip)
+    share_data = share_service.validate_share_token(token, record_access=False)
+    share_service.check_token_rate_limit(token, share_data["permission_level"])
+    return share_service.record_share_access(token, share_data, visitor_id=client_ip)
+
+def _too_many_requests(e: share_service.RateLimitExceeded) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(e),
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+    )
+
+def _share_link_response(share_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds the API response for a newly created share link."""
+    return {
+        "message": "Share link created successfully",
+        "share_url": f"/share/access/{share_data['token']}",
+        "expires_at": _isoformat(share_data["expires_at"]),
+        "permission_level": share_data["permission_level"]
+    }
+
+@router.post("/bulk", response_model=BulkShareResponse)
+def create_share_links_endpoint(
+    payload: BulkShareRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Creates share links for a list of files in one batch."""
+    try:
+        shares = share_service.create_share_links(
+            user_id=current_user["id"],
+            file_ids=payload.file_ids,
+            permission_level=payload.permission,
+            expires_in_days=payload.expires_in_days
+        )
+        return {"shares": [_share_link_response(s) for s in shares], "total": len(shares)}
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error("Bulk share link creation failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create share links: {str(e)}"
+        )
+
+@router.post("/bulk/revoke", response_model=BulkRevokeResponse)
+def revoke_share_links_endpoint(
+    payload: BulkRevokeRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, List[str]]:
+    """Revokes a list of share links, or all of the user's shares on a file, in one batch."""
+    try:
+        return share_service.revoke_share_links(
+            current_user["id"], tokens=payload.tokens, file_id=payload.file_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error("Bulk share link revocation failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to revoke share links: {str(e)}"
+        )
+
 @router.post("/{file_id}", response_model=ShareLinkResponse)
-async def create_share_link_endpoint(
+def create_share_link_endpoint(
     file_id: str,
     permission: str = share_service.SharePermission.READ,
     expires_in_days: int = 7,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """Creates a share link for a file."""
-    # TODO: Implement share link creation
-    # 1. Call share_service.create_share_link with user_id, file_id, permission_level, and expires_in_days
-    # 2. Return response with message, share_url, expires_at, and permission_level
-    # 3. Handle exceptions with 500 INTERNAL_SERVER_ERROR
-    pass
+    try:
+        share_data = share_service.create_share_link(
+            user_id=current_user["id"],
+            file_id=file_id,
+            permission_level=permission,
+            expires_in_days=expires_in_days
+        )
+        return _share_link_response(share_data)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error("Share link creation failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create share link: {str(e)}"
+        )
+
+@router.post("/folder/{folder_id}", response_model=ShareLinkResponse)
+def create_folder_share_link_endpoint(
+    folder_id: str,
+    permission: str = share_service.SharePermission.READ,
+    expires_in_days: int = 7,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Creates one share link covering every file below a folder."""
+    try:
+        share_data = share_service.create_folder_share_link(
+            user_id=current_user["id"],
+            folder_id=folder_id,
+            permission_level=permission,
+            expires_in_days=expires_in_days
+        )
+        return {
+            "message": "Folder share link created successfully",
+            "share_url": f"/share/access/{share_data['token']}",
+            "expires_at": _isoformat(share_data["expires_at"]),
+            "permission_level": share_data["permission_level"]
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error("Folder share link creation failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create share link: {str(e)}"
+        )
 
 @router.get("/access/{token}", response_model=ShareAccessResponse)
-async def access_shared_file(token: str) -> Dict[str, Any]:
+def access_shared_file(token: str, request: Request) -> Dict[str, Any]:
     """Accesses a shared file using a token."""
-    # TODO: Implement shared file access
-    # 1. Call share_service.validate_share_token with token
-    # 2. Return file_id, permission_level, and expires_at
-    # 3. Handle ValueError with 400 BAD_REQUEST
-    # 4. Handle other exceptions with 500 INTERNAL_SERVER_ERROR
-    pass
+    try:
+        share_data = _validate_rate_limited(request, token)
+        return {
+            "file_id": share_data["file_id"],
+            "folder_id": share_data.get("folder_id"),
+            "permission_level": share_data["permission_level"],
+            "expires_at": _isoformat(share_data["expires_at"])
+        }
+    except share_service.RateLimitExceeded as e:
+        raise _too_many_requests(e)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error("Shared file access failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to access shared file: {str(e)}"
+        )
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single-range `Range` header into inclusive byte offsets.
+
+    Returns None for headers that should be ignored (multiple or non-byte ranges).
+
+    Raises:
+        ValueError: If the range cannot be satisfied for a file of this size.
+    """
+    match = _RANGE_PATTERN.match(range_header.strip())
+    if not match:
+        return None
+    start_str, end_str = match.groups()
+    if not start_str and not end_str:
+        return None
+    if not start_str:
+        # Suffix range: the last N bytes
+        length = int(end_str)
+        if length == 0 or size == 0:
+            # An empty file has no last N bytes to serve
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - length), size - 1
+    start = int(start_str)
+    end = min(int(end_str), size - 1) if end_str else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+def _share_etag(metadata: Dict[str, Any]) -> str:
+    """Builds a strong ETag from the file's identity and last modification."""
+    version = f"{metadata['file_id']}:{metadata.get('updated_at')}:{metadata.get('size')}"
+    return '"' + hashlib.sha256(version.encode("utf-8")).hexdigest()[:32] + '"'
+
+@router.get("/access/{token}/download")
+def download_shared_file(
+    token: str,
+    request: Request,
+    file_id: str | None = None,
+    range_header: str | None = Header(None, alias="Range"),
+    if_none_match: str | None = Header(None)
+) -> Response:
+    """
+    Streams the content of a shared file, with single `Range` request support.
+
+    Responses carry an ETag and a public `Cache-Control` max-age bounded by the
+    share's expiry, so reverse proxies can cache popular shared files. Folder
+    shares take the `file_id` of any file below the shared folder.
+    """
+    try:
+        share_data = _validate_rate_limited(request, token)
+        file_id = file_id or share_data["file_id"]
+        if not file_id or share_service.resolve_share_permission(
+                share_data, file_id) == share_service.SharePermission.NONE:
+            raise FileNotFoundError(file_id)
+        metadata = file_service.get_file_metadata(file_id)
+    except share_service.RateLimitExceeded as e:
+        raise _too_many_requests(e)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Shared file not found")
+    except Exception as e:
+        logger.error("Shared file download failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to download shared file: {str(e)}"
+        )
+
+    size = metadata["size"]
+    remaining = (share_data["expires_at"] - datetime.utcnow()).total_seconds()
+    etag = _share_etag(metadata)
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"public, max-age={max(0, min(int(remaining), DOWNLOAD_MAX_AGE_SECONDS))}",
+    }
+    if if_none_match is not None and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    byte_range = None
+    if range_header is not None:
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{size}"}
+            )
+
+    start, end = byte_range if byte_range else (0, size - 1)
+    headers["Content-Length"] = str(max(0, end - start + 1))
+    headers["Content-Disposition"] = content_disposition(metadata.get("original_name") or metadata["file_id"])
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    return StreamingResponse(
+        file_service.iter_file_range(metadata["storage_path"], start, end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+        media_type=metadata.get("type") or "application/octet-stream",
+        headers=headers
+    )
 
 @router.delete("/{token}")
-async def revoke_share_link_endpoint(
+def revoke_share_link_endpoint(
     token: str,
     current_user: Dict[str, Any] = Depends(get_current_user)
-) -> ShareLinkResponse:
+) -> Dict[str, str]:
     """Revokes a share link."""
-    # TODO: Implement share link revocation
-    # 1. Call share_service.revoke_share_link with token and user_id
-    # 2. Return success message
-    # 3. Handle ValueError with 400 BAD_REQUEST
-    # 4. Handle other exceptions with 500 INTERNAL_SERVER_ERROR
-    pass
+    try:
+        share_service.revoke_share_link(token, current_user["id"])
+        return {"message": "Share link revoked successfully"}
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error("Share link revocation failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to revoke share link: {str(e)}"
+        )
+
+@router.get("/{token}/stats")
+def share_stats_endpoint(
+    token: str,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Returns hourly and daily download counts and approximate unique visitors for a share."""
+    try:
+        return share_service.get_share_stats(token, current_user["id"])
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error("Share stats retrieval failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to retrieve share stats: {str(e)}"
+        )
 
 @router.get("/list", response_model=ShareListResponse)
-async def list_shares_endpoint(
+def list_shares_endpoint(
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """Lists all active shares for the current user."""
-    # TODO: Implement share listing
-    # 1. Call share_service.list_user_shares with user_id
-    # 2. Return list of shares with total count
-    # 3. Handle exceptions with 500 INTERNAL_SERVER_ERROR
-    pass
\ No newline at end of file
+    try:
+        shares = share_service.list_user_shares(current_user["id"])
+        return {"shares": shares, "total": len(shares)}
+    except Exception as e:
+        logger.error("Share listing failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to list shares: {str(e)}"
+        )
@@ -0,0 +1,220 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from collections.abc import MutableMapping
+from datetime import datetime
+import logging
+from sqlalchemy import (Boolean, Column, DateTime, Index, Integer, MetaData, String, Table,
+                        and_, bindparam, delete, func, insert, or_, select, update)
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+shares_table = Table(
+    "shares", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("token", String(512), nullable=False),
+    Column("token_id", String(64)),
+    Column("user_id", String(64)),
+    Column("file_id", String(64)),
+    Column("folder_id", String(64)),
+    Column("permission_level", String(16), nullable=False),
+    Column("is_valid", Boolean, nullable=False, default=True),
+    Column("created_at", DateTime, nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+    Column("revoked_at", DateTime),
+    Column("access_count", Integer, nullable=False, default=0),
+    Index("ix_shares_token", "token", unique=True),
+    Index("ix_shares_user_id", "user_id", "id"),
+    Index("ix_shares_file_id", "file_id", "id"),
+    Index("ix_shares_folder_id", "folder_id", "id"),
+    Index("ix_shares_expires_at", "expires_at"),
+    Index("ix_shares_revoked_at", "revoked_at"),
+)
+
+_RECORD_COLUMNS = [c for c in shares_table.c if c.name != "id"]
+_RECORD_KEYS = [c.name for c in _RECORD_COLUMNS]
+
+
+class SqlShareStore(MutableMapping):
+    """
+    Database-backed share store with the same interface as ShareStore, so
+    shares survive restarts and are visible to every worker.
+
+    Statements are built once and executed with bound parameters, so each is
+    compiled once and reused from SQLAlchemy's statement cache; connections
+    come from the engine's pool. Validation is a single lookup on the unique
+    token index. Returned records are copies: change them through the store.
+    """
+
+    def __init__(self, engine: Engine, on_write: Optional[Callable[[str], None]] = None) -> None:
+        self._engine = engine
+        self._on_write = on_write
+        metadata.create_all(engine)
+
+        t = shares_table
+        self._select_by_token = select(*_RECORD_COLUMNS).where(t.c.token == bindparam("token"))
+        self._insert = insert(t)
+        self._delete_by_token = delete(t).where(t.c.token == bindparam("token"))
+        self._revoke = (update(t).where(t.c.token == bindparam("b_token"))
+                        .values(is_valid=False, revoked_at=bindparam("b_now")))
+        self._select_by_tokens = (select(*_RECORD_COLUMNS)
+                                  .where(t.c.token.in_(bindparam("tokens", expanding=True))))
+        self._delete_by_tokens = delete(t).where(t.c.token.in_(bindparam("tokens", expanding=True)))
+        self._revoke_many = (update(t)
+                             .where(t.c.token.in_(bindparam("b_tokens", expanding=True)))
+                             .values(is_valid=False, revoked_at=bindparam("b_now")))
+        self._add_access_count = (update(t).where(t.c.token == bindparam("b_token"))
+                                  .values(access_count=t.c.access_count + bindparam("b_count")))
+        self._select_tokens = {
+            name: select(t.c.token).where(column == bindparam("key")).order_by(t.c.id.desc())
+            for name, column in (("user_id", t.c.user_id), ("file_id", t.c.file_id),
+                                 ("folder_id", t.c.folder_id))
+        }
+        self._select_owner_records = (select(*_RECORD_COLUMNS)
+                                      .where(t.c.user_id == bindparam("key"))
+                                      .order_by(t.c.id.desc()))
+        # Revoked signed tokens stay until expiry: their record proves the revocation
+        self._select_evictable = select(t.c.id).where(or_(
+            t.c.expires_at <= bindparam("now"),
+            and_(t.c.revoked_at <= bindparam("now"), t.c.token_id.is_(None))
+        ))
+        self._select_revoked_signed = select(t.c.token_id, t.c.expires_at).where(
+            t.c.token_id.is_not(None), t.c.is_valid.is_(False), t.c.expires_at > bindparam("now")
+        )
+
+    def __getitem__(self, token: str) -> Dict[str, Any]:
+        with self._engine.connect() as conn:
+            row = conn.execute(self._select_by_token, {"token": token}).first()
+        if row is None:
+            raise KeyError(token)
+        return dict(row._mapping)
+
+    @staticmethod
+    def _row(token: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Maps a share record onto the table's columns."""
+        values = {key: record.get(key) for key in _RECORD_KEYS}
+        values["token"] = token
+        values["access_count"] = values["access_count"] or 0
+        if values["is_valid"] is None:
+            values["is_valid"] = True
+        return values
+
+    def __setitem__(self, token: str, record: Dict[str, Any]) -> None:
+        values = self._row(token, record)
+        with self._engine.begin() as conn:
+            conn.execute(self._delete_by_token, {"token": token})
+            conn.execute(self._insert, values)
+        if self._on_write is not None:
+            self._on_write(token)
+
+    def __delitem__(self, token: str) -> None:
+        with self._engine.begin() as conn:
+            if conn.execute(self._delete_by_token, {"token": token}).rowcount == 0:
+                raise KeyError(token)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._engine.connect() as conn:
+            tokens = conn.execute(select(shares_table.c.token)).scalars().all()
+        return iter(tokens)
+
+    def __len__(self) -> int:
+        with self._engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(shares_table)).scalar_one()
+
+    def revoke(self, token: str) -> Dict[str, Any]:
+        """Marks a share invalid; it is deleted by the next sweep."""
+        with self._engine.begin() as conn:
+            if conn.execute(self._revoke, {"b_token": token, "b_now": datetime.utcnow()}).rowcount == 0:
+                raise KeyError(token)
+            return dict(conn.execute(self._select_by_token, {"token": token}).one()._mapping)
+
+    def get_many(self, tokens: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Returns the records that exist among the given tokens, in one query."""
+        tokens = list(tokens)
+        if not tokens:
+            return {}
+        with self._engine.connect() as conn:
+            rows = conn.execute(self._select_by_tokens, {"tokens": tokens})
+            return {row.token: dict(row._mapping) for row in rows}
+
+    def put_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Stores several records, keyed by their "token", in one transaction."""
+        rows = [self._row(record["token"], record) for record in records]
+        if not rows:
+            return
+        with self._engine.begin() as conn:
+            conn.execute(self._delete_by_tokens, {"tokens": [row["token"] for row in rows]})
+            conn.execute(self._insert, rows)
+        if self._on_write is not None:
+            for row in rows:
+                self._on_write(row["token"])
+
+    def revoke_many(self, tokens: Iterable[str]) -> int:
+        """Revokes every existing share among the tokens in one update; returns how many."""
+        tokens = list(tokens)
+        if not tokens:
+            return 0
+        with self._engine.begin() as conn:
+            return conn.execute(self._revoke_many,
+                                {"b_tokens": tokens, "b_now": datetime.utcnow()}).rowcount
+
+    def add_access_counts(self, counts: Dict[str, int]) -> None:
+        """Adds buffered access counts to their shares in one batched update."""
+        if not counts:
+            return
+        with self._engine.begin() as conn:
+            conn.execute(self._add_access_count,
+                         [{"b_token": token, "b_count": count} for token, count in counts.items()])
+
+    def revoked_signed_tokens(self, now: Optional[datetime] = None) -> List[Tuple[str, datetime]]:
+        """Returns (token_id, expires_at) of revoked, unexpired signed tokens."""
+        with self._engine.connect() as conn:
+            rows = conn.execute(self._select_revoked_signed, {"now": now or datetime.utcnow()})
+            return [(row.token_id, row.expires_at) for row in rows]
+
+    def _tokens(self, column: str, key: Any) -> List[str]:
+        with self._engine.connect() as conn:
+            return list(conn.execute(self._select_tokens[column], {"key": key}).scalars())
+
+    def tokens_for_owner(self, user_id: Any) -> List[str]:
+        """Returns the owner's share tokens, newest first."""
+        return self._tokens("user_id", user_id)
+
+    def tokens_for_file(self, file_id: Any) -> List[str]:
+        """Returns the file's share tokens, newest first."""
+        return self._tokens("file_id", file_id)
+
+    def tokens_for_folder(self, folder_id: Any) -> List[str]:
+        """Returns the folder's share tokens, newest first."""
+        return self._tokens("folder_id", folder_id)
+
+    def records_for_owner(self, user_id: Any) -> List[Dict[str, Any]]:
+        """Returns the owner's share records, newest first, in one query."""
+        with self._engine.connect() as conn:
+            rows = conn.execute(self._select_owner_records, {"key": user_id})
+            return [dict(row._mapping) for row in rows]
+
+    def sweep(self, now: Optional[datetime] = None, max_items: Optional[int] = None) -> int:
+        """
+        Deletes shares whose expiry or revocation time has passed; revoked
+        signed tokens are kept until they expire.
+
+        Args:
+            now: The reference time; defaults to the current UTC time.
+            max_items: Upper bound on shares deleted, to keep each sweep short.
+
+        Returns:
+            The number of shares evicted.
+        """
+        now = now or datetime.utcnow()
+        statement = self._select_evictable
+        if max_items is not None:
+            statement = statement.limit(max_items)
+        with self._engine.begin() as conn:
+            ids = list(conn.execute(statement, {"now": now}).scalars())
+            if ids:
+                conn.execute(delete(shares_table).where(shares_table.c.id.in_(ids)))
+        if ids:
+            logger.info("Evicted %d expired or revoked share links", len(ids))
+        return len(ids)
@@ -1,57 +1,486 @@
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Union
+import asyncio
 import logging
+import re
 import secrets
 from datetime import datetime, timedelta
+from config import load_config
+from files import file_service
+from utils.db import get_engine
+from .share_store import ShareStore
+from .share_repository import SqlShareStore
+from .access_counter import AccessCounter
+from .rate_limiter import TokenBucketLimiter
+from .share_analytics import ShareAnalytics
+from .negative_cache import NegativeCache, SampledLogger
+from . import signed_tokens
 
 logger = logging.getLogger(__name__)
 
-# Mock database for share tokens
-share_tokens: Dict[str, Dict[str, any]] = {}
+# Load configuration
+config = load_config()
+SWEEP_INTERVAL_SECONDS = config["SHARE_SWEEP_INTERVAL_SECONDS"]
+SWEEP_BATCH_SIZE = config["SHARE_SWEEP_BATCH_SIZE"]
+# "stored" tokens are looked up in share_tokens; "signed" tokens are self-contained
+TOKEN_MODE = config["SHARE_TOKEN_MODE"]
+SIGNING_KEY = config["SHARE_SIGNING_KEY"].encode("utf-8")
+if TOKEN_MODE == "signed" and not SIGNING_KEY:
+    raise RuntimeError('SHARE_SIGNING_KEY must be set when SHARE_TOKEN_MODE is "signed"')
+MAX_EXPIRES_DAYS = config["SHARE_MAX_EXPIRES_DAYS"]
+MAX_LIFETIME = timedelta(days=MAX_EXPIRES_DAYS)
+ACCESS_FLUSH_INTERVAL_SECONDS = config["SHARE_ACCESS_FLUSH_INTERVAL_SECONDS"]
+BULK_MAX_ITEMS = config["SHARE_BULK_MAX_ITEMS"]
+
+# Recently rejected tokens, so scanning floods skip the validation path
+invalid_token_cache = NegativeCache(
+    capacity=config["SHARE_NEGATIVE_CACHE_SIZE"],
+    ttl=config["SHARE_NEGATIVE_CACHE_TTL_SECONDS"]
+)
+_rejected_token_log = SampledLogger(
+    logger,
+    "Rejected %d invalid share token lookups, by reason: %s",
+    interval=config["SHARE_MISS_LOG_INTERVAL_SECONDS"]
+)
+
+# Stored tokens are token_urlsafe output; signed tokens add a 43-character signature
+MAX_TOKEN_LENGTH = 512
+_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_-]+(?:\.[A-Za-z0-9_-]{43})?")
+
+# Share tokens indexed by owner, file and expiry: in process memory, or in the
+# DB_URI database so they survive restarts and are shared across workers
+share_tokens: Union[ShareStore, SqlShareStore]
+if config["SHARE_STORE_BACKEND"] == "database":
+    share_tokens = SqlShareStore(get_engine(), on_write=invalid_token_cache.discard)
+else:
+    share_tokens = ShareStore(on_write=invalid_token_cache.discard)
+
+# Folder ancestor sets used to resolve folder-share inheritance, tagged with the
+# hierarchy version they were computed at
+ANCESTOR_CACHE_SIZE = 100000
+_ancestor_cache: Dict[Optional[str], frozenset] = {}
+_ancestor_cache_version = -1
+
+# Revoked signed tokens, checked without touching share_tokens. Revoked signed
+# records are kept in share_tokens until expiry, so the filter is rebuilt from
+# them on startup; with the database store, each sweep reloads it so revocations
+# made by other workers are seen within SWEEP_INTERVAL_SECONDS.
+revoked_signed_tokens = signed_tokens.RevocationFilter(
+    capacity=config["SHARE_REVOCATION_FILTER_CAPACITY"]
+)
+
+def load_revoked_signed_tokens() -> int:
+    """Adds the store's revoked, unexpired signed tokens to the filter; returns how many."""
+    revoked = share_tokens.revoked_signed_tokens()
+    for token_id, expires_at in revoked:
+        revoked_signed_tokens.add(token_id, expires_at)
+    return len(revoked)
+
+load_revoked_signed_tokens()
+
+def _apply_access_counts(counts: Dict[str, int]) -> None:
+    """Adds flushed access counts to the stored share records."""
+    share_tokens.add_access_counts(counts)
+
+# Access counts are buffered so validation never writes to the share store
+access_counter = AccessCounter(
+    flush=_apply_access_counts,
+    threshold=config["SHARE_ACCESS_FLUSH_THRESHOLD"]
+)
+
+# Per-share download counts and unique visitors, fixed size per share
+share_analytics = ShareAnalytics()
 
 class SharePermission:
     READ = "read"
     WRITE = "write"
     NONE = "none"
 
+class RateLimitExceeded(Exception):
+    """Raised when a share token or client IP exceeds its access rate."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+_BURST_SECONDS = config["SHARE_RATE_LIMIT_BURST_SECONDS"]
+ip_rate_limiter = TokenBucketLimiter(
+    rate=config["SHARE_RATE_LIMIT_IP_PER_SECOND"],
+    burst=config["SHARE_RATE_LIMIT_IP_PER_SECOND"] * _BURST_SECONDS
+)
+token_rate_limiters = {
+    permission: TokenBucketLimiter(rate=rate, burst=rate * _BURST_SECONDS)
+    for permission, rate in (
+        (SharePermission.READ, config["SHARE_RATE_LIMIT_READ_PER_SECOND"]),
+        (SharePermission.WRITE, config["SHARE_RATE_LIMIT_WRITE_PER_SECOND"]),
+    )
+}
+
+def check_ip_rate_limit(client_ip: str) -> None:
+    """Rejects the request if the client IP has exceeded its share access rate."""
+    retry_after = ip_rate_limiter.acquire(client_ip)
+    if retry_after:
+        raise RateLimitExceeded("Too many share requests from this client", retry_after)
+
+def check_token_rate_limit(token: str, permission_level: str) -> None:
+    """Rejects the request if the share token has exceeded the rate for its permission level."""
+    limiter = token_rate_limiters.get(permission_level, token_rate_limiters[SharePermission.READ])
+    retry_after = limiter.acquire(token)
+    if retry_after:
+        raise RateLimitExceeded("Too many requests for this share link", retry_after)
+
+def _build_share(user_id: str, file_id: Optional[str], folder_id: Optional[str],
+                 permission_level: str, expires_in_days: int) -> Dict[str, any]:
+    """Validates the options and builds a share record with a new token."""
+    if permission_level not in (SharePermission.READ, SharePermission.WRITE):
+        raise ValueError(f"Invalid permission level: {permission_level}")
+    if expires_in_days <= 0:
+        raise ValueError("Expiration must be at least one day")
+    if expires_in_days > MAX_EXPIRES_DAYS:
+        raise ValueError(f"Expiration cannot exceed {MAX_EXPIRES_DAYS} days")
+
+    created_at = datetime.utcnow()
+    expires_at = created_at + timedelta(days=expires_in_days)
+    share_data = {
+        "user_id": user_id,
+        "file_id": file_id,
+        "permission_level": permission_level,
+        "is_valid": True,
+        "created_at": created_at,
+        "expires_at": expires_at,
+        "access_count": 0
+    }
+    if folder_id is not None:
+        share_data["folder_id"] = folder_id
+    if TOKEN_MODE == "signed":
+        share_data.update(signed_tokens.issue_token(
+            SIGNING_KEY, user_id, file_id, permission_level, expires_at, folder_id=folder_id,
+            max_lifetime=MAX_LIFETIME
+        ))
+    else:
+        share_data["token"] = secrets.token_urlsafe(32)
+    return share_data
+
+def _check_file_owned(user_id: str, file_id: str) -> None:
+    """Rejects sharing a file that does not exist or belongs to another user."""
+    metadata = file_service._file_db.get(file_id)
+    if metadata is None or metadata["user_id"] != user_id:
+        raise ValueError(f"File not found: {file_id}")
+
+def _create_share(user_id: str, file_id: Optional[str], folder_id: Optional[str],
+                  permission_level: str, expires_in_days: int) -> Dict[str, any]:
+    """Creates and stores a share record for a file or a folder."""
+    if file_id is not None:
+        _check_file_owned(user_id, file_id)
+    share_data = _build_share(user_id, file_id, folder_id, permission_level, expires_in_days)
+    # Signed tokens are still recorded so owners can list and manage them
+    share_tokens[share_data["token"]] = share_data
+    return share_data
+
 def create_share_link(user_id: str, file_id: str, permission_level: str = SharePermission.READ, 
                      expires_in_days: int = 7) -> Dict[str, any]:
     """Creates a unique share link with expiration."""
-    # TODO: Implement share link creation
-    # 1. Generate a secure random token using secrets.token_urlsafe
-    # 2. Calculate expiration date based on expires_in_days
-    # 3. Create a share record with token, user_id, file_id, permission_level, validity, timestamps, etc.
-    # 4. Store the share record in share_tokens dictionary
-    # 5. Log share link creation
-    # 6. Return the share data
-    # 7. Handle exceptions appropriately
-    pass
-
-def validate_share_token(token: str) -> Dict[str, any]:
-    """Validates token and returns associated file data."""
-    # TODO: Implement share token validation
-    # 1. Check if token exists in share_tokens
-    # 2. Verify token is still valid (not revoked)
-    # 3. Check if token has expired
-    # 4. Update access count
-    # 5. Return share data if valid
-    # 6. Handle exceptions and raise appropriate errors
-    pass
+    try:
+        share_data = _create_share(user_id, file_id, None, permission_level, expires_in_days)
+        logger.info("Created share link for file %s by user %s", file_id, user_id)
+        return share_data
+
+    except Exception as e:
+        logger.error("Failed to create share link: %s", str(e))
+        raise
+
+def create_share_links(user_id: str, file_ids: List[str],
+                       permission_level: str = SharePermission.READ,
+                       expires_in_days: int = 7) -> List[Dict[str, any]]:
+    """
+    Creates share links for several files, stored in one batch.
+
+    Raises:
+        ValueError: If the list is empty or too long, any file does not exist or
+            belongs to another user, or the options are invalid; nothing is
+            stored in that case.
+    """
+    if not file_ids:
+        raise ValueError("At least one file ID is required")
+    if len(file_ids) > BULK_MAX_ITEMS:
+        raise ValueError(f"Cannot share more than {BULK_MAX_ITEMS} files at once")
+    for file_id in file_ids:
+        _check_file_owned(user_id, file_id)
+
+    shares = [
+        _build_share(user_id, file_id, None, permission_level, expires_in_days)
+        for file_id in file_ids
+    ]
+    try:
+        share_tokens.put_many(shares)
+        logger.info("Created %d share links by user %s", len(shares), user_id)
+        return shares
+
+    except Exception as e:
+        logger.error("Failed to create share links: %s", str(e))
+        raise
+
+def create_folder_share_link(user_id: str, folder_id: str,
+                             permission_level: str = SharePermission.READ,
+                             expires_in_days: int = 7) -> Dict[str, any]:
+    """
+    Creates a single share link whose permission applies to every file below the
+    folder. Cost does not depend on the folder's size: descendants are resolved
+    lazily at access time.
+    """
+    folder = file_service._folder_db.get(folder_id)
+    if folder is None or folder["user_id"] != user_id:
+        raise ValueError(f"Folder not found: {folder_id}")
+
+    try:
+        share_data = _create_share(user_id, None, folder_id, permission_level, expires_in_days)
+        logger.info("Created share link for folder %s by user %s", folder_id, user_id)
+        return share_data
+
+    except Exception as e:
+        logger.error("Failed to create folder share link: %s", str(e))
+        raise
+
+def _folder_ancestors(folder_id: Optional[str]) -> frozenset:
+    """
+    Returns the folder and all of its ancestors, cached per folder. The cache is
+    dropped whenever the file hierarchy changes (any file or folder move).
+    """
+    global _ancestor_cache_version
+    version = file_service.hierarchy_version()
+    if version != _ancestor_cache_version or len(_ancestor_cache) >= ANCESTOR_CACHE_SIZE:
+        _ancestor_cache.clear()
+        _ancestor_cache_version = version
+    ancestors = _ancestor_cache.get(folder_id)
+    if ancestors is None:
+        ancestors = frozenset(file_service.get_folder_ancestors(folder_id))
+        _ancestor_cache[folder_id] = ancestors
+    return ancestors
+
+def resolve_share_permission(share_data: Dict[str, any], file_id: str) -> str:
+    """
+    Returns the effective permission a validated share grants on a file:
+    the share's own level for the shared file or any descendant of the shared
+    folder, and SharePermission.NONE otherwise. Either way the file must belong
+    to the share's creator.
+    """
+    metadata = file_service._file_db.get(file_id)
+    if metadata is None or metadata["user_id"] != share_data["user_id"]:
+        return SharePermission.NONE
+
+    folder_id = share_data.get("folder_id")
+    if folder_id is None:
+        return share_data["permission_level"] if share_data["file_id"] == file_id else SharePermission.NONE
+    if folder_id in _folder_ancestors(metadata.get("folder_id")):
+        return share_data["permission_level"]
+    return SharePermission.NONE
+
+def _is_signed_token(token: str) -> bool:
+    """True for signed tokens, which are only honoured in signed token mode."""
+    return TOKEN_MODE == "signed" and signed_tokens.is_signed_token(token)
+
+def _decode_signed_token(token: str) -> Dict[str, any]:
+    """Verifies a signed token, capping its expiry at the longest share lifetime."""
+    return signed_tokens.decode_token(SIGNING_KEY, token, max_lifetime=MAX_LIFETIME)
+
+def _validate_signed_token(token: str) -> Dict[str, any]:
+    """Validates a signed token from its own claims and the revocation filter."""
+    try:
+        share_data = _decode_signed_token(token)
+    except signed_tokens.InvalidShareToken:
+        raise ValueError("Share token does not exist")
+    if share_data["expires_at"] < datetime.utcnow():
+        raise ValueError("Share token has expired")
+    if share_data["token_id"] in revoked_signed_tokens:
+        raise ValueError("Share token has been revoked")
+    return share_data
+
+def _validate_stored_token(token: str) -> Dict[str, any]:
+    """Validates a token against share_tokens."""
+    share_data = share_tokens.get(token)
+    if share_data is None:
+        raise ValueError("Share token does not exist")
+    if not share_data["is_valid"]:
+        raise ValueError("Share token has been revoked")
+    if share_data["expires_at"] < datetime.utcnow():
+        raise ValueError("Share token has expired")
+    return share_data
+
+def record_share_access(token: str, share_data: Dict[str, any],
+                        visitor_id: Optional[str] = None) -> Dict[str, any]:
+    """
+    Counts an access to a validated share and returns its data.
+
+    The stored record is never written here: the access is buffered in
+    access_counter and, for stored tokens, the returned copy reports the
+    stored plus pending count. The hit is also recorded in share_analytics,
+    with visitor_id (e.g. the client IP) counted towards approximate unique
+    visitors.
+    """
+    access_counter.increment(token)
+    share_analytics.record_hit(token, visitor_id)
+    if _is_signed_token(token):
+        return share_data
+    return {
+        **share_data,
+        "access_count": share_data.get("access_count", 0) + access_counter.pending(token)
+    }
+
+def validate_share_token(token: str, visitor_id: Optional[str] = None,
+                         record_access: bool = True) -> Dict[str, any]:
+    """
+    Validates token and returns associated file data.
+
+    The access is counted with record_share_access unless record_access is
+    False, which lets callers count it only once a rate limit has passed.
+
+    Malformed tokens are rejected before any lookup, and rejections are cached
+    in invalid_token_cache and logged in sampled summaries.
+    """
+    if len(token) > MAX_TOKEN_LENGTH or not _TOKEN_PATTERN.fullmatch(token):
+        reason = "Share token does not exist"
+    else:
+        reason = invalid_token_cache.get(token)
+    if reason is not None:
+        _rejected_token_log.record(reason)
+        raise ValueError(reason)
+
+    try:
+        if _is_signed_token(token):
+            share_data = _validate_signed_token(token)
+        else:
+            share_data = _validate_stored_token(token)
+    except ValueError as e:
+        invalid_token_cache.add(token, str(e))
+        _rejected_token_log.record(str(e))
+        raise
+    if not record_access:
+        return dict(share_data)
+    return record_share_access(token, share_data, visitor_id)
 
 def revoke_share_link(token: str, user_id: str) -> None:
     """Revokes a share link."""
-    # TODO: Implement share link revocation
-    # 1. Check if token exists in share_tokens
-    # 2. Verify the user has permission to revoke (owner check)
-    # 3. Mark the share as invalid
-    # 4. Log revocation
-    # 5. Handle exceptions appropriately
-    pass
+    if _is_signed_token(token):
+        try:
+            claims = _decode_signed_token(token)
+        except signed_tokens.InvalidShareToken:
+            raise ValueError("Share token does not exist")
+        if claims["user_id"] != user_id:
+            raise ValueError("Unauthorized to revoke this share link")
+        revoked_signed_tokens.add(claims["token_id"], claims["expires_at"])
+        if token in share_tokens:
+            share_tokens.revoke(token)
+        logger.info("Revoked signed share link for file %s by user %s", claims["file_id"], user_id)
+        return
+
+    share_data = share_tokens.get(token)
+    if share_data is None:
+        raise ValueError("Share token does not exist")
+    if share_data["user_id"] != user_id:
+        raise ValueError("Unauthorized to revoke this share link")
+
+    share_tokens.revoke(token)
+    logger.info("Revoked share link for file %s by user %s", share_data["file_id"], user_id)
+
+def revoke_share_links(user_id: str, tokens: Optional[List[str]] = None,
+                       file_id: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Revokes a list of share links, or all of the user's shares on a file, in one batch.
+
+    Tokens that do not exist or belong to another user are skipped and reported.
+
+    Returns:
+        A dictionary with "revoked", "not_found" and "unauthorized" token lists.
+
+    Raises:
+        ValueError: If neither tokens nor a file ID are given, or too many tokens are.
+    """
+    if tokens is None and file_id is None:
+        raise ValueError("Either tokens or a file ID is required")
+    if tokens is not None and len(tokens) > BULK_MAX_ITEMS:
+        raise ValueError(f"Cannot revoke more than {BULK_MAX_ITEMS} share links at once")
+
+    result = {"revoked": [], "not_found": [], "unauthorized": []}
+    if file_id is not None:
+        owned = set(share_tokens.tokens_for_owner(user_id))
+        candidates = [token for token in share_tokens.tokens_for_file(file_id) if token in owned]
+    else:
+        candidates = list(dict.fromkeys(tokens))
+    records = share_tokens.get_many(candidates)
+
+    for token in candidates:
+        if _is_signed_token(token):
+            try:
+                claims = _decode_signed_token(token)
+            except signed_tokens.InvalidShareToken:
+                result["not_found"].append(token)
+                continue
+            if claims["user_id"] != user_id:
+                result["unauthorized"].append(token)
+                continue
+            revoked_signed_tokens.add(claims["token_id"], claims["expires_at"])
+            result["revoked"].append(token)
+            continue
+
+        share_data = records.get(token)
+        if share_data is None:
+            result["not_found"].append(token)
+        elif share_data["user_id"] != user_id:
+            result["unauthorized"].append(token)
+        else:
+            result["revoked"].append(token)
+
+    share_tokens.revoke_many([token for token in result["revoked"] if token in records])
+    logger.info("Revoked %d share links by user %s", len(result["revoked"]), user_id)
+    return result
+
+def get_share_stats(token: str, user_id: str) -> Dict[str, any]:
+    """Returns access analytics for a share owned by the user."""
+    share_data = share_tokens.get(token)
+    if share_data is None:
+        raise ValueError("Share token does not exist")
+    if share_data["user_id"] != user_id:
+        raise ValueError("Unauthorized to view this share link")
+    return {"token": token, **share_analytics.get_stats(token)}
 
 def list_user_shares(user_id: str) -> List[Dict[str, any]]:
-    """Lists all active shares for a user."""
-    # TODO: Implement user shares listing
-    # 1. Filter share_tokens to find shares created by the user that are still valid
-    # 2. Sort shares by creation date (newest first)
-    # 3. Return the list of shares
-    # 4. Handle exceptions appropriately
-    pass
\ No newline at end of file
+    """Lists all active shares for a user, newest first."""
+    try:
+        now = datetime.utcnow()
+        return [
+            share_data for share_data in share_tokens.records_for_owner(user_id)
+            if share_data["is_valid"] and share_data["expires_at"] > now
+        ]
+    except Exception as e:
+        logger.error("Failed to list shares for user %s: %s", user_id, str(e))
+        raise
+
+def sweep_shares(batch_size: int = SWEEP_BATCH_SIZE) -> int:
+    """
+    Evicts one bounded batch of expired and revoked shares, drops revocations of
+    signed tokens that have since expired, and drops analytics for evicted
+    shares, looking up shares with analytics in batches of batch_size. With the
+    database store, also picks up signed-token revocations by other workers.
+    """
+    evicted = share_tokens.sweep(max_items=batch_size)
+    revoked_signed_tokens.prune()
+    if isinstance(share_tokens, SqlShareStore):
+        load_revoked_signed_tokens()
+    tracked = share_analytics.tokens()
+    live: Dict[str, Dict[str, any]] = {}
+    for start in range(0, len(tracked), batch_size):
+        live.update(share_tokens.get_many(tracked[start:start + batch_size]))
+    share_analytics.retain(live)
+    return evicted
+
+async def run_share_sweeper(interval: float = SWEEP_INTERVAL_SECONDS,
+                            batch_size: int = SWEEP_BATCH_SIZE) -> None:
+    """
+    Periodically runs sweep_shares off the event loop until cancelled, since
+    with the database store each sweep issues blocking queries.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(sweep_shares, batch_size)
+        except Exception as e:
+            logger.error("Share sweep failed: %s", str(e))
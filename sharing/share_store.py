@@ -0,0 +1,185 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from collections.abc import MutableMapping
+from datetime import datetime
+import heapq
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ShareStore(MutableMapping):
+    """
+    In-memory share token store indexed by owner and by file, with an expiry
+    heap so expired and revoked shares can be evicted incrementally.
+
+    Behaves like a dict of token -> share record. Records should be changed
+    through the store (e.g. `revoke`) rather than mutated in place, so the
+    indexes stay consistent.
+
+    `on_write`, if given, is called with the token whenever a record is stored.
+    """
+
+    def __init__(self, on_write: Optional[Callable[[str], None]] = None) -> None:
+        self._on_write = on_write
+        self._records: Dict[str, Dict[str, Any]] = {}
+        # Insertion-ordered token sets, oldest first
+        self._by_owner: Dict[Any, Dict[str, None]] = {}
+        self._by_file: Dict[Any, Dict[str, None]] = {}
+        self._by_folder: Dict[Any, Dict[str, None]] = {}
+        # (evict_at, token); entries may be stale and are re-checked when popped
+        self._expiry_heap: List[Tuple[datetime, str]] = []
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _evict_at(record: Dict[str, Any]) -> Optional[datetime]:
+        """
+        Returns when a record may be evicted: its revocation or expiry time.
+        Revoked signed tokens are kept until expiry, since their signature
+        stays valid and the record is what proves the revocation.
+        """
+        if not record.get("is_valid", True) and record.get("token_id") is None:
+            return record.get("revoked_at") or datetime.min
+        return record.get("expires_at")
+
+    def _index(self, token: str, record: Dict[str, Any]) -> None:
+        self._by_owner.setdefault(record.get("user_id"), {})[token] = None
+        if record.get("folder_id") is not None:
+            self._by_folder.setdefault(record["folder_id"], {})[token] = None
+        else:
+            self._by_file.setdefault(record.get("file_id"), {})[token] = None
+        evict_at = self._evict_at(record)
+        if evict_at is not None:
+            heapq.heappush(self._expiry_heap, (evict_at, token))
+
+    def _unindex(self, token: str, record: Dict[str, Any]) -> None:
+        for index, key in ((self._by_owner, record.get("user_id")),
+                           (self._by_file, record.get("file_id")),
+                           (self._by_folder, record.get("folder_id"))):
+            tokens = index.get(key)
+            if tokens is not None:
+                tokens.pop(token, None)
+                if not tokens:
+                    del index[key]
+
+    def __getitem__(self, token: str) -> Dict[str, Any]:
+        return self._records[token]
+
+    def __setitem__(self, token: str, record: Dict[str, Any]) -> None:
+        with self._lock:
+            previous = self._records.get(token)
+            if previous is not None:
+                self._unindex(token, previous)
+            self._records[token] = record
+            self._index(token, record)
+        if self._on_write is not None:
+            self._on_write(token)
+
+    def __delitem__(self, token: str) -> None:
+        with self._lock:
+            record = self._records.pop(token)
+            self._unindex(token, record)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def revoke(self, token: str) -> Dict[str, Any]:
+        """Marks a share invalid and schedules it for eviction."""
+        with self._lock:
+            record = self._records[token]
+            record["is_valid"] = False
+            record["revoked_at"] = datetime.utcnow()
+            heapq.heappush(self._expiry_heap, (record["revoked_at"], token))
+            return record
+
+    def get_many(self, tokens: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Returns the records that exist among the given tokens."""
+        with self._lock:
+            return {token: self._records[token] for token in tokens if token in self._records}
+
+    def put_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Stores several records, keyed by their "token", as one batch."""
+        with self._lock:
+            for record in records:
+                self[record["token"]] = record
+
+    def revoke_many(self, tokens: Iterable[str]) -> int:
+        """Revokes every existing share among the tokens; returns how many."""
+        revoked = 0
+        with self._lock:
+            for token in tokens:
+                if token in self._records:
+                    self.revoke(token)
+                    revoked += 1
+        return revoked
+
+    def add_access_counts(self, counts: Dict[str, int]) -> None:
+        """Adds buffered access counts to their shares."""
+        with self._lock:
+            for token, count in counts.items():
+                record = self._records.get(token)
+                if record is not None:
+                    record["access_count"] = record.get("access_count", 0) + count
+
+    def revoked_signed_tokens(self, now: Optional[datetime] = None) -> List[Tuple[str, datetime]]:
+        """Returns (token_id, expires_at) of revoked, unexpired signed tokens."""
+        now = now or datetime.utcnow()
+        with self._lock:
+            return [(record["token_id"], record["expires_at"]) for record in self._records.values()
+                    if record.get("token_id") is not None and not record.get("is_valid", True)
+                    and record["expires_at"] > now]
+
+    def tokens_for_owner(self, user_id: Any) -> List[str]:
+        """Returns the owner's share tokens, newest first."""
+        with self._lock:
+            return list(reversed(self._by_owner.get(user_id, {})))
+
+    def tokens_for_file(self, file_id: Any) -> List[str]:
+        """Returns the file's share tokens, newest first."""
+        with self._lock:
+            return list(reversed(self._by_file.get(file_id, {})))
+
+    def tokens_for_folder(self, folder_id: Any) -> List[str]:
+        """Returns the folder's share tokens, newest first."""
+        with self._lock:
+            return list(reversed(self._by_folder.get(folder_id, {})))
+
+    def records_for_owner(self, user_id: Any) -> List[Dict[str, Any]]:
+        """Returns the owner's share records, newest first."""
+        with self._lock:
+            return [self._records[token] for token in reversed(self._by_owner.get(user_id, {}))]
+
+    def sweep(self, now: Optional[datetime] = None, max_items: Optional[int] = None) -> int:
+        """
+        Evicts shares whose expiry or revocation time has passed.
+
+        Args:
+            now: The reference time; defaults to the current UTC time.
+            max_items: Upper bound on heap entries examined, to keep each sweep short.
+
+        Returns:
+            The number of shares evicted.
+        """
+        now = now or datetime.utcnow()
+        evicted = examined = 0
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                if max_items is not None and examined >= max_items:
+                    break
+                examined += 1
+                _, token = heapq.heappop(self._expiry_heap)
+                record = self._records.get(token)
+                if record is None:
+                    continue
+                evict_at = self._evict_at(record)
+                # Skip stale heap entries for records that were replaced or extended
+                if evict_at is None or evict_at > now:
+                    continue
+                del self[token]
+                evicted += 1
+        if evicted:
+            logger.info("Evicted %d expired or revoked share links", evicted)
+        return evicted
@@ -0,0 +1,162 @@
+from typing import Any, Dict, Optional
+from datetime import datetime, timedelta, timezone
+import base64
+import hashlib
+import hmac
+import json
+import math
+import secrets
+import threading
+
+# Compact permission codes carried inside signed tokens
+_PERMISSION_CODES = {"read": "r", "write": "w"}
+_PERMISSION_NAMES = {code: name for name, code in _PERMISSION_CODES.items()}
+
+
+class InvalidShareToken(ValueError):
+    """Raised when a signed share token is malformed or its signature does not match."""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def is_signed_token(token: str) -> bool:
+    """Signed tokens contain a '.' separator; stored tokens are plain url-safe strings."""
+    return "." in token
+
+
+def _timestamp(value: datetime) -> int:
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _from_timestamp(value: int) -> datetime:
+    return datetime.fromtimestamp(value, tz=timezone.utc).replace(tzinfo=None)
+
+
+def issue_token(secret: bytes, user_id: Any, file_id: Optional[str], permission_level: str,
+                expires_at: datetime, folder_id: Optional[str] = None,
+                max_lifetime: Optional[timedelta] = None) -> Dict[str, Any]:
+    """
+    Issues a self-contained share token carrying the file (or folder), owner,
+    permission, issue time and expiry, signed with HMAC-SHA256. The expiry is
+    capped at `max_lifetime` after issue.
+
+    Returns:
+        The share data, including the token, its revocation ID and the
+        expiry actually signed.
+    """
+    token_id = _b64encode(secrets.token_bytes(12))
+    issued_at = _timestamp(datetime.utcnow())
+    expires = _timestamp(expires_at)
+    if max_lifetime is not None:
+        expires = min(expires, issued_at + int(max_lifetime.total_seconds()))
+    claims = {
+        "t": token_id,
+        "u": user_id,
+        "f": file_id,
+        "p": _PERMISSION_CODES[permission_level],
+        "i": issued_at,
+        "e": expires,
+    }
+    if folder_id is not None:
+        claims["d"] = folder_id
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    signature = _b64encode(hmac.new(secret, payload.encode("ascii"), hashlib.sha256).digest())
+    return {"token": f"{payload}.{signature}", "token_id": token_id,
+            "expires_at": _from_timestamp(expires)}
+
+
+def decode_token(secret: bytes, token: str, max_lifetime: Optional[timedelta] = None) -> Dict[str, Any]:
+    """
+    Verifies a signed token and returns its share data without any store lookup.
+    The expiry is capped at `max_lifetime` after issue; checking it, and
+    revocation, are left to the caller.
+
+    Raises:
+        InvalidShareToken: If the token is malformed or the signature does not match.
+    """
+    try:
+        payload, signature = token.split(".")
+        expected = hmac.new(secret, payload.encode("ascii"), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            raise InvalidShareToken("Share token signature is invalid")
+        claims = json.loads(_b64decode(payload))
+        expires = claims["e"]
+        if max_lifetime is not None:
+            expires = min(expires, claims["i"] + int(max_lifetime.total_seconds()))
+        return {
+            "token": token,
+            "token_id": claims["t"],
+            "user_id": claims["u"],
+            "file_id": claims["f"],
+            "folder_id": claims.get("d"),
+            "permission_level": _PERMISSION_NAMES[claims["p"]],
+            "expires_at": _from_timestamp(expires),
+            "is_valid": True,
+        }
+    except InvalidShareToken:
+        raise
+    except Exception as e:
+        raise InvalidShareToken("Share token is malformed") from e
+
+
+class RevocationFilter:
+    """
+    Compact revocation check for signed tokens: a Bloom filter answers most
+    lookups for non-revoked tokens, and an exact set confirms its positives.
+
+    Entries are kept only until the revoked token would have expired anyway.
+    """
+
+    def __init__(self, capacity: int = 100_000, false_positive_rate: float = 0.01):
+        self._num_bits = max(8, int(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self._num_hashes = max(1, round(self._num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self._num_bits + 7) // 8)
+        # token_id -> expiry of the revoked token
+        self._revoked: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    def _positions(self, token_id: str):
+        digest = hashlib.blake2b(token_id.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self._num_hashes):
+            yield (h1 + i * h2) % self._num_bits
+
+    def add(self, token_id: str, expires_at: datetime) -> None:
+        """Marks a token as revoked until its expiry."""
+        with self._lock:
+            self._revoked[token_id] = expires_at
+            for position in self._positions(token_id):
+                self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, token_id: str) -> bool:
+        for position in self._positions(token_id):
+            if not self._bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return token_id in self._revoked
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Forgets revocations of tokens that have expired and rebuilds the filter."""
+        now = now or datetime.utcnow()
+        with self._lock:
+            expired = [token_id for token_id, exp in self._revoked.items() if exp <= now]
+            if not expired:
+                return 0
+            for token_id in expired:
+                del self._revoked[token_id]
+            # Build the new bit array aside so concurrent lookups never see it half-filled
+            bits = bytearray(len(self._bits))
+            for token_id in self._revoked:
+                for position in self._positions(token_id):
+                    bits[position >> 3] |= 1 << (position & 7)
+            self._bits = bits
+            return len(expired)
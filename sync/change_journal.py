@@ -0,0 +1,178 @@
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+import itertools
+import logging
+import threading
+from config import load_config
+
+logger = logging.getLogger(__name__)
+
+# Load configuration
+config = load_config()
+TOMBSTONE_RETENTION_SECONDS = config["SYNC_TOMBSTONE_RETENTION_DAYS"] * 24 * 60 * 60
+
+
+class ChangeType:
+    CREATE = "create"
+    MODIFY = "modify"
+    DELETE = "delete"
+
+
+class FullResyncRequired(Exception):
+    """Raised when a client's last sync predates the tombstone retention horizon."""
+
+
+# Compacted journal: user_id -> file_id -> latest net change, ordered oldest to newest
+_journal: Dict[str, "OrderedDict[str, Dict[str, Any]]"] = {}
+# Tombstones in the order they were written: user_id -> deque of (updated_at, file_id, cursor)
+_tombstones: Dict[str, deque] = {}
+# Newest expired tombstone per user; clients synced before it must resync fully
+_horizon: Dict[str, float] = {}
+_horizon_cursor: Dict[str, int] = {}
+
+_cursor = itertools.count(1)
+_last_cursor = 0
+_lock = threading.Lock()
+
+
+def _now() -> float:
+    return datetime.now(timezone.utc).timestamp()
+
+
+def _net_change(previous: str, current: str) -> str:
+    """Collapses two consecutive changes to a single file into their net effect."""
+    if current == ChangeType.DELETE:
+        return ChangeType.DELETE
+    if previous == ChangeType.CREATE:
+        return ChangeType.CREATE
+    return ChangeType.MODIFY
+
+
+def _expire_tombstones(user_id: str, now: float) -> None:
+    """Drops tombstones older than the retention horizon. Caller holds the lock."""
+    tombstones = _tombstones.get(user_id)
+    if not tombstones:
+        return
+    entries = _journal.get(user_id, {})
+    cutoff = now - TOMBSTONE_RETENTION_SECONDS
+    while tombstones and tombstones[0][0] < cutoff:
+        updated_at, file_id, cursor = tombstones.popleft()
+        entry = entries.get(file_id)
+        # Skip stale references to files that were recreated after deletion
+        if entry is not None and entry["cursor"] == cursor:
+            del entries[file_id]
+            _horizon[user_id] = max(_horizon.get(user_id, 0.0), updated_at)
+            _horizon_cursor[user_id] = max(_horizon_cursor.get(user_id, 0), cursor)
+
+
+def record_change(user_id: str, file_id: str, change_type: str,
+                  metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Appends a change to the user's journal, collapsing it with earlier
+    changes to the same file so only the net effect is kept.
+    """
+    if not user_id or not file_id:
+        raise ValueError("User ID and file ID are required")
+    if change_type not in (ChangeType.CREATE, ChangeType.MODIFY, ChangeType.DELETE):
+        raise ValueError(f"Unknown change type: {change_type}")
+
+    global _last_cursor
+    with _lock:
+        now = _now()
+        _last_cursor = next(_cursor)
+        entries = _journal.setdefault(user_id, OrderedDict())
+        previous = entries.pop(file_id, None)
+        if previous is not None:
+            change_type = _net_change(previous["change_type"], change_type)
+
+        entry = {
+            "file_id": file_id,
+            "change_type": change_type,
+            "cursor": _last_cursor,
+            "updated_at": now,
+            "metadata": None if change_type == ChangeType.DELETE else metadata,
+        }
+        entries[file_id] = entry
+
+        if change_type == ChangeType.DELETE:
+            _tombstones.setdefault(user_id, deque()).append((now, file_id, entry["cursor"]))
+        _expire_tombstones(user_id, now)
+
+    logger.debug("Journaled %s of file %s for user %s", change_type, file_id, user_id)
+    return entry
+
+
+def has_history(user_id: str) -> bool:
+    """Checks whether any changes have been journaled for the user."""
+    return bool(_journal.get(user_id)) or user_id in _horizon
+
+
+def changes_since(user_id: str, last_sync_ts: float) -> List[Dict[str, Any]]:
+    """
+    Returns the net changes after a timestamp, oldest first.
+
+    Raises:
+        FullResyncRequired: If tombstones the client may need have already expired.
+    """
+    with _lock:
+        _expire_tombstones(user_id, _now())
+        if 0 < last_sync_ts < _horizon.get(user_id, 0.0):
+            raise FullResyncRequired(
+                f"Last sync predates the {config['SYNC_TOMBSTONE_RETENTION_DAYS']}-day retention horizon"
+            )
+
+        changes = []
+        # Entries are ordered by last change, so stop at the first one already seen
+        for entry in reversed(_journal.get(user_id, {}).values()):
+            if entry["updated_at"] <= last_sync_ts:
+                break
+            changes.append(entry)
+
+    changes.reverse()
+    return changes
+
+
+def current_cursor() -> int:
+    """Returns the cursor of the most recently journaled change."""
+    return _last_cursor
+
+
+def changes_after_cursor(user_id: str, cursor: int) -> List[Dict[str, Any]]:
+    """
+    Returns the net changes journaled after a cursor, oldest first.
+
+    Raises:
+        FullResyncRequired: If tombstones after the cursor have already expired.
+    """
+    with _lock:
+        _expire_tombstones(user_id, _now())
+        if 0 < cursor < _horizon_cursor.get(user_id, 0):
+            raise FullResyncRequired("Cursor predates the tombstone retention horizon")
+
+        changes = []
+        for entry in reversed(_journal.get(user_id, {}).values()):
+            if entry["cursor"] <= cursor:
+                break
+            changes.append(entry)
+
+    changes.reverse()
+    return changes
+
+
+def live_entries(user_id: str) -> Tuple[int, List[Dict[str, Any]]]:
+    """Returns the current cursor and the metadata of every live file of the user."""
+    with _lock:
+        return _last_cursor, [
+            entry["metadata"] for entry in _journal.get(user_id, {}).values()
+            if entry["change_type"] != ChangeType.DELETE
+        ]
+
+
+def latest_cursors() -> Dict[str, int]:
+    """Returns the cursor of each user's most recent journaled change."""
+    with _lock:
+        return {
+            user_id: next(reversed(entries.values()))["cursor"]
+            for user_id, entries in _journal.items() if entries
+        }
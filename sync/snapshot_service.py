@@ -0,0 +1,72 @@
+from typing import Any, Dict, List
+import asyncio
+import gzip
+import json
+import logging
+from datetime import datetime, timezone
+from config import load_config
+from . import change_journal
+from .sync_service import json_default
+
+logger = logging.getLogger(__name__)
+
+# Load configuration
+config = load_config()
+SNAPSHOT_INTERVAL_SECONDS = config["SYNC_SNAPSHOT_INTERVAL_SECONDS"]
+
+# Materialized snapshots: user_id -> {"cursor", "created_at", "file_count", "data"}
+_snapshots: Dict[str, Dict[str, Any]] = {}
+
+
+def build_snapshot(user_id: str) -> Dict[str, Any]:
+    """
+    Materializes a gzip-compressed manifest of the user's live files together
+    with the journal cursor it corresponds to.
+    """
+    if not user_id:
+        raise ValueError("User ID cannot be empty")
+
+    cursor, files = change_journal.live_entries(user_id)
+    payload = json.dumps({"cursor": cursor, "files": files},
+                         default=json_default, separators=(",", ":"))
+    snapshot = {
+        "cursor": cursor,
+        "created_at": datetime.now(timezone.utc).timestamp(),
+        "file_count": len(files),
+        "data": gzip.compress(payload.encode("utf-8"), compresslevel=6)
+    }
+    _snapshots[user_id] = snapshot
+    logger.info("Built snapshot for user %s: %d files at cursor %d",
+                user_id, len(files), cursor)
+    return snapshot
+
+
+def get_snapshot(user_id: str) -> Dict[str, Any]:
+    """Returns the user's latest snapshot, building one if none exists yet."""
+    snapshot = _snapshots.get(user_id)
+    if snapshot is None:
+        snapshot = build_snapshot(user_id)
+    return snapshot
+
+
+def refresh_snapshots() -> List[str]:
+    """Rebuilds snapshots for users whose journal advanced past their snapshot."""
+    refreshed = []
+    for user_id, cursor in change_journal.latest_cursors().items():
+        snapshot = _snapshots.get(user_id)
+        if snapshot is None or snapshot["cursor"] < cursor:
+            build_snapshot(user_id)
+            refreshed.append(user_id)
+    return refreshed
+
+
+async def run_snapshot_refresher(interval: float = SNAPSHOT_INTERVAL_SECONDS) -> None:
+    """Periodically refreshes snapshots until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            refreshed = await asyncio.to_thread(refresh_snapshots)
+            if refreshed:
+                logger.info("Refreshed %d account snapshots", len(refreshed))
+        except Exception as e:
+            logger.error("Snapshot refresh failed: %s", str(e))
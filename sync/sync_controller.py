@@ -1,25 +1,137 @@
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, Union
+import gzip
+import json
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import Response, StreamingResponse
 from auth.auth_service import get_current_user
-from . import sync_service
-from datetime import datetime
+from . import sync_service, snapshot_service, change_journal
+from .change_journal import FullResyncRequired
+from datetime import datetime, timezone
 
 router = APIRouter(prefix="/sync", tags=["Sync"])
 logger = logging.getLogger(__name__)
 
-@router.post("/init")
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Number of changed files serialized per streamed chunk
+STREAM_BATCH_SIZE = 256
+
+
+def _ndjson_lines(header: Dict[str, Any], changed_files: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """Yields a header line followed by one line per changed file, in batches."""
+    yield (json.dumps(header, default=sync_service.json_default) + "\n").encode("utf-8")
+    batch = []
+    for changed_file in changed_files:
+        batch.append(json.dumps(changed_file, default=sync_service.json_default))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield ("\n".join(batch) + "\n").encode("utf-8")
+            batch = []
+    if batch:
+        yield ("\n".join(batch) + "\n").encode("utf-8")
+
+
+@router.post("/init", response_model=None)
 async def init_sync_endpoint(
     last_sync_ts: float,
+    cursor: int | None = None,
+    accept: str | None = Header(None),
     current_user: Dict[str, Any] = Depends(get_current_user)
-) -> Dict[str, Any]:
-    """Initializes sync and returns changed files."""
-    # TODO: Implement sync initialization
-    # 1. Call sync_service.get_updated_files with user_id and last_sync_ts
-    # 2. Return changed_files with current UTC timestamp
-    # 3. Handle ValueError with 400 BAD_REQUEST
-    # 4. Handle other exceptions with 500 INTERNAL_SERVER_ERROR
-    pass
+) -> Union[Dict[str, Any], StreamingResponse]:
+    """
+    Initializes sync and returns changed files.
+
+    Clients sending `Accept: application/x-ndjson` receive a streamed response: the
+    first line holds `current_timestamp` and `full_resync_required`, and each
+    following line is one changed file. Responses are gzip-compressed when the
+    client sends `Accept-Encoding: gzip`.
+
+    A `cursor` (from `/sync/snapshot` or a previous response's `current_cursor`)
+    takes precedence over `last_sync_ts`.
+    """
+    # Taken before reading changes so edits made during the sync are not skipped
+    current_timestamp = datetime.now(timezone.utc).timestamp()
+    current_cursor = change_journal.current_cursor()
+    cursor_kwargs = {} if cursor is None else {"cursor": cursor}
+    full_resync_required = False
+    stream = accept is not None and NDJSON_MEDIA_TYPE in accept
+    try:
+        if stream:
+            try:
+                changed_files = sync_service.iter_updated_files(
+                    current_user["id"], last_sync_ts, cursor
+                )
+            except FullResyncRequired as e:
+                logger.info("Full resync required for user %s: %s", current_user["id"], str(e))
+                full_resync_required = True
+                changed_files = sync_service.iter_updated_files(current_user["id"], 0)
+            header = {
+                "current_timestamp": current_timestamp,
+                "current_cursor": current_cursor,
+                "full_resync_required": full_resync_required
+            }
+            return StreamingResponse(
+                _ndjson_lines(header, changed_files),
+                media_type=NDJSON_MEDIA_TYPE
+            )
+
+        changed_files = sync_service.get_updated_files(
+            user_id=current_user["id"],
+            last_sync_ts=last_sync_ts,
+            **cursor_kwargs
+        )
+        return {
+            "changed_files": changed_files,
+            "current_timestamp": current_timestamp,
+            "current_cursor": current_cursor
+        }
+    except FullResyncRequired as e:
+        logger.info("Full resync required for user %s: %s", current_user["id"], str(e))
+        return {
+            "changed_files": sync_service.get_updated_files(
+                user_id=current_user["id"],
+                last_sync_ts=0
+            ),
+            "full_resync_required": True,
+            "current_timestamp": current_timestamp,
+            "current_cursor": current_cursor
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error("Sync initialization failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to initialize sync: {str(e)}"
+        )
+
+@router.get("/snapshot")
+async def get_snapshot_endpoint(
+    accept_encoding: str | None = Header(None),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Response:
+    """
+    Returns the user's precomputed account snapshot for new-device bootstrap.
+
+    The body is `{"cursor": ..., "files": [...]}`; clients then call `/sync/init`
+    with that cursor to catch up on changes made since the snapshot.
+    """
+    try:
+        snapshot = snapshot_service.get_snapshot(current_user["id"])
+        headers = {"X-Sync-Cursor": str(snapshot["cursor"])}
+        if accept_encoding is not None and "gzip" in accept_encoding:
+            headers["Content-Encoding"] = "gzip"
+            content = snapshot["data"]
+        else:
+            content = gzip.decompress(snapshot["data"])
+        return Response(content=content, media_type="application/json", headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error("Snapshot retrieval failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to retrieve snapshot: {str(e)}"
+        )
 
 @router.post("/resolve")
 async def resolve_conflict_endpoint(
@@ -27,10 +139,19 @@ async def resolve_conflict_endpoint(
     remote_version: Dict[str, Any],
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> Dict[str, Any]:
-    """Resolves conflicts between file versions."""
-    # TODO: Implement conflict resolution
-    # 1. Call sync_service.detect_conflicts with local_version and remote_version
-    # 2. Return resolved_version with current UTC timestamp
-    # 3. Handle ValueError with 400 BAD_REQUEST
-    # 4. Handle other exceptions with 500 INTERNAL_SERVER_ERROR
-    pass
\ No newline at end of file
+    """Resolves conflicts between versions of the user's own files."""
+    try:
+        sync_service.check_versions_owned(current_user["id"], local_version, remote_version)
+        resolved_version = sync_service.detect_conflicts(local_version, remote_version)
+        return {
+            "resolved_version": resolved_version,
+            "timestamp": datetime.now(timezone.utc).timestamp()
+        }
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error("Conflict resolution failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to resolve conflict: {str(e)}"
+        )
@@ -1,31 +1,320 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from collections import OrderedDict
 import logging
+import difflib
 from datetime import datetime
+from config import load_config
 from files.file_service import _file_db  # Using the mock DB from file_service
+from . import change_journal
 
 logger = logging.getLogger(__name__)
 
-def get_updated_files(user_id: str, last_sync_ts: float) -> List[Dict[str, Any]]:
+config = load_config()
+VERSION_HISTORY_LIMIT = config["SYNC_VERSION_HISTORY_LIMIT"]
+VERSION_HISTORY_MAX_FILES = config["SYNC_VERSION_HISTORY_MAX_FILES"]
+
+# Extensions eligible for automatic three-way merge
+MERGEABLE_EXTENSIONS = {'.txt'}
+
+# Text versions held by the server, recorded on upload so they can serve as
+# merge ancestors: file_id -> list of {"version_vector", "content"}, oldest
+# first, with the least recently updated files dropped beyond the limit
+_version_history: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+
+
+def _to_timestamp(value: Any) -> Optional[float]:
+    """Normalizes a datetime, ISO string or epoch number to an epoch timestamp."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    raise ValueError(f"Unsupported timestamp value: {value!r}")
+
+
+def _journal_change(user_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Converts a journal entry into the file metadata returned to sync clients."""
+    metadata = entry["metadata"] or {"file_id": entry["file_id"], "user_id": user_id}
+    return {**metadata, "change_type": entry["change_type"]}
+
+
+def json_default(value: Any) -> Any:
+    """Serializes metadata values the json module does not handle natively."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def iter_updated_files(user_id: str, last_sync_ts: float,
+                       cursor: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yields files changed after a timestamp, or after a journal cursor
+    when one is given (e.g. the cursor of a downloaded account snapshot).
+
+    Arguments are validated and the journal is read before this returns, so errors
+    surface immediately; metadata for each change is only built as it is consumed.
+
+    Raises:
+        ValueError: If the user ID is invalid or if the provided timestamp is not valid.
+        FullResyncRequired: If the timestamp predates the tombstone retention horizon.
+    """
+    if not user_id:
+        raise ValueError("User ID cannot be empty")
+    if last_sync_ts is None or last_sync_ts < 0:
+        raise ValueError("Timestamp cannot be negative")
+    if cursor is not None and cursor < 0:
+        raise ValueError("Cursor cannot be negative")
+
+    if cursor is not None:
+        entries = change_journal.changes_after_cursor(user_id, cursor)
+        return (_journal_change(user_id, entry) for entry in entries)
+
+    if change_journal.has_history(user_id):
+        entries = change_journal.changes_since(user_id, last_sync_ts)
+        return (_journal_change(user_id, entry) for entry in entries)
+
+    # Files stored before journaling was enabled are found by a metadata scan
+    def _scan() -> Iterator[Dict[str, Any]]:
+        for metadata in list(_file_db.values()):
+            if metadata.get("user_id") != user_id:
+                continue
+            updated_ts = _to_timestamp(metadata.get("updated_at") or metadata.get("timestamp"))
+            if updated_ts is not None and updated_ts > last_sync_ts:
+                yield metadata
+
+    return _scan()
+
+
+def get_updated_files(user_id: str, last_sync_ts: float,
+                      cursor: Optional[int] = None) -> List[Dict[str, Any]]:
     """
     Fetches files changed after a timestamp.
 
     Args:
         user_id: The ID of the user performing the sync.
         last_sync_ts: The last known synchronization timestamp (epoch-based).
+        cursor: Optional journal cursor to catch up from; takes precedence over last_sync_ts.
 
     Returns:
-        A list of dictionaries containing file metadata for updated files.
+        A list of dictionaries containing file metadata for updated files. Changes
+        come from the compacted change journal, so each file appears at most once
+        with its net "change_type"; deleted files are returned as tombstones.
 
     Raises:
         ValueError: If the user ID is invalid or if the provided timestamp is not valid.
+        FullResyncRequired: If the timestamp predates the tombstone retention horizon.
+    """
+    try:
+        updated_files = list(iter_updated_files(user_id, last_sync_ts, cursor))
+        logger.info("Found %d updated files for user %s", len(updated_files), user_id)
+        return updated_files
+
+    except (ValueError, change_journal.FullResyncRequired):
+        raise
+    except Exception as e:
+        logger.error("Failed to fetch updated files: %s", str(e))
+        raise
+
+
+def compare_version_vectors(a: Dict[str, int], b: Dict[str, int]) -> str:
+    """
+    Compares two per-device version vectors.
+
+    Returns:
+        "equal" if both vectors match, "descendant" if `a` strictly dominates `b`,
+        "ancestor" if `b` strictly dominates `a`, or "concurrent" otherwise.
+    """
+    a_ahead = b_ahead = False
+    for device_id in set(a) | set(b):
+        a_count = a.get(device_id, 0)
+        b_count = b.get(device_id, 0)
+        if a_count > b_count:
+            a_ahead = True
+        elif b_count > a_count:
+            b_ahead = True
+
+    if a_ahead and b_ahead:
+        return "concurrent"
+    if a_ahead:
+        return "descendant"
+    if b_ahead:
+        return "ancestor"
+    return "equal"
+
+
+def merge_version_vectors(a: Dict[str, int], b: Dict[str, int]) -> Dict[str, int]:
+    """Returns the element-wise maximum of two version vectors."""
+    return {
+        device_id: max(a.get(device_id, 0), b.get(device_id, 0))
+        for device_id in set(a) | set(b)
+    }
+
+
+def record_version(file_id: str, version_vector: Dict[str, int], content: str) -> None:
+    """
+    Records a stored version of a file so it can serve as a merge ancestor later.
+    Only the newest VERSION_HISTORY_LIMIT versions of each file, and the
+    VERSION_HISTORY_MAX_FILES most recently updated files, are kept.
     """
-    # TODO: Implement sync functionality to get updated files
-    # 1. Validate user_id and last_sync_ts parameters
-    # 2. Filter _file_db to find files belonging to user_id that were updated after last_sync_ts
-    # 3. Log the number of updated files found
-    # 4. Return the list of updated files metadata
-    # 5. Handle exceptions appropriately
-    pass
+    history = _version_history.setdefault(file_id, [])
+    _version_history.move_to_end(file_id)
+    while len(_version_history) > VERSION_HISTORY_MAX_FILES:
+        _version_history.popitem(last=False)
+    for entry in history:
+        if compare_version_vectors(entry["version_vector"], version_vector) == "equal":
+            entry["content"] = content
+            return
+    history.append({"version_vector": dict(version_vector), "content": content})
+    if len(history) > VERSION_HISTORY_LIMIT:
+        del history[:len(history) - VERSION_HISTORY_LIMIT]
+
+
+def forget_versions(file_id: str) -> None:
+    """Drops the recorded versions of a deleted file."""
+    _version_history.pop(file_id, None)
+
+
+def check_versions_owned(user_id: str, *versions: Dict[str, Any]) -> None:
+    """
+    Rejects resolving versions of files that do not exist or belong to another
+    user, so a client can only merge against its own files' history.
+    """
+    for version in versions:
+        file_id = version.get("file_id")
+        if file_id is None:
+            continue
+        metadata = _file_db.get(file_id)
+        if metadata is None or metadata["user_id"] != user_id:
+            raise ValueError(f"File not found: {file_id}")
+
+
+def _find_common_ancestor(file_id: Any, local_vv: Dict[str, int],
+                          remote_vv: Dict[str, int]) -> Optional[str]:
+    """Returns the content of the newest recorded version dominated by both vectors."""
+    best_content = None
+    best_rank = -1
+    for entry in _version_history.get(file_id, []):
+        vv = entry["version_vector"]
+        if compare_version_vectors(vv, local_vv) in ("ancestor", "equal") and \
+                compare_version_vectors(vv, remote_vv) in ("ancestor", "equal"):
+            rank = sum(vv.values())
+            if rank > best_rank:
+                best_rank = rank
+                best_content = entry["content"]
+    return best_content
+
+
+def _diff_hunks(base: List[str], other: List[str]) -> List[Tuple[int, int, List[str]]]:
+    """Returns (base_start, base_end, replacement) hunks turning `base` into `other`."""
+    matcher = difflib.SequenceMatcher(None, base, other, autojunk=False)
+    return [
+        (i1, i2, other[j1:j2])
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def _apply_hunks(base: List[str], start: int, end: int,
+                 hunks: List[Tuple[int, int, List[str]]]) -> List[str]:
+    """Applies the hunks that fall inside base[start:end] and returns that region."""
+    result = []
+    cursor = start
+    for h_start, h_end, replacement in hunks:
+        result.extend(base[cursor:h_start])
+        result.extend(replacement)
+        cursor = h_end
+    result.extend(base[cursor:end])
+    return result
+
+
+def merge_text(base: str, local: str, remote: str) -> Optional[str]:
+    """
+    Performs a line-based three-way merge.
+
+    Returns:
+        The merged text, or None if both sides changed the same region differently.
+    """
+    base_lines = base.splitlines(keepends=True)
+    tagged = sorted(
+        [(h, "local") for h in _diff_hunks(base_lines, local.splitlines(keepends=True))] +
+        [(h, "remote") for h in _diff_hunks(base_lines, remote.splitlines(keepends=True))],
+        key=lambda item: (item[0][0], item[0][1])
+    )
+
+    merged: List[str] = []
+    cursor = 0
+    i = 0
+    while i < len(tagged):
+        # Group hunks whose base ranges touch or overlap into one region
+        region_start, region_end = tagged[i][0][0], tagged[i][0][1]
+        local_hunks, remote_hunks = [], []
+        while i < len(tagged) and tagged[i][0][0] <= region_end:
+            hunk, side = tagged[i]
+            region_end = max(region_end, hunk[1])
+            (local_hunks if side == "local" else remote_hunks).append(hunk)
+            i += 1
+
+        merged.extend(base_lines[cursor:region_start])
+        local_region = _apply_hunks(base_lines, region_start, region_end, local_hunks)
+        remote_region = _apply_hunks(base_lines, region_start, region_end, remote_hunks)
+        if not remote_hunks:
+            merged.extend(local_region)
+        elif not local_hunks or local_region == remote_region:
+            merged.extend(remote_region)
+        else:
+            return None
+        cursor = region_end
+
+    merged.extend(base_lines[cursor:])
+    return "".join(merged)
+
+
+def _is_mergeable(version: Dict[str, Any]) -> bool:
+    """Checks whether a version is a text file eligible for automatic merging."""
+    name = version.get("original_name") or version.get("filename") or version.get("name") or ""
+    return any(str(name).lower().endswith(ext) for ext in MERGEABLE_EXTENSIONS) and \
+        isinstance(version.get("content"), str)
+
+
+def _resolve_by_version_vector(local_version: Dict[str, Any],
+                               remote_version: Dict[str, Any]) -> Dict[str, Any]:
+    """Resolves two versions using their per-device version vectors."""
+    local_vv = local_version["version_vector"]
+    remote_vv = remote_version["version_vector"]
+    relation = compare_version_vectors(local_vv, remote_vv)
+
+    if relation == "equal":
+        return local_version
+    if relation == "descendant":
+        return {**local_version, "conflict_status": "resolved_keep_local"}
+    if relation == "ancestor":
+        return {**remote_version, "conflict_status": "resolved_keep_remote"}
+
+    # Concurrent edits: try a server-side three-way merge for text files
+    merged_vv = merge_version_vectors(local_vv, remote_vv)
+    if _is_mergeable(local_version) and _is_mergeable(remote_version):
+        base = local_version.get("base_content")
+        if base is None:
+            base = _find_common_ancestor(local_version.get("file_id"), local_vv, remote_vv)
+        if base is not None:
+            merged_content = merge_text(base, local_version["content"], remote_version["content"])
+            if merged_content is not None:
+                logger.info("Auto-merged concurrent edits for file %s", local_version.get("file_id"))
+                merged = {**remote_version, "content": merged_content,
+                          "version_vector": merged_vv, "conflict_status": "merged"}
+                merged.pop("base_content", None)
+                return merged
+
+    logger.warning("Unresolved concurrent edits for file %s", local_version.get("file_id"))
+    return {
+        **local_version,
+        "version_vector": merged_vv,
+        "conflict_status": "conflict",
+        "conflicting_version": remote_version,
+    }
 
 
 def detect_conflicts(local_version: Dict[str, Any], remote_version: Dict[str, Any]) -> Dict[str, Any]:
@@ -33,6 +322,10 @@ def detect_conflicts(local_version: Dict[str, Any], remote_version: Dict[str, An
     Determines if a conflict exists between the local and remote file versions,
     and attempts to merge or flag them.
 
+    Versions carrying a per-device "version_vector" are compared exactly; concurrent
+    edits to text files are three-way merged against their common ancestor. Versions
+    with only a scalar "version" fall back to comparing modified timestamps.
+
     Args:
         local_version: A dictionary containing metadata of the local file version.
         remote_version: A dictionary containing metadata of the remote file version.
@@ -43,11 +336,39 @@ def detect_conflicts(local_version: Dict[str, Any], remote_version: Dict[str, An
     Raises:
         KeyError: If expected fields are missing from version dictionaries.
     """
-    # TODO: Implement conflict detection and resolution
-    # 1. Validate that both versions have "version" keys
-    # 2. Compare version numbers to determine if there's a conflict
-    # 3. If versions match, return local_version (no conflict)
-    # 4. If versions differ, compare modified timestamps
-    # 5. Return the more recent version with conflict_status
-    # 6. Handle exceptions appropriately
-    pass
\ No newline at end of file
+    if local_version is None or remote_version is None:
+        raise TypeError("Version data cannot be None")
+
+    if "version_vector" in local_version and "version_vector" in remote_version:
+        return _resolve_by_version_vector(local_version, remote_version)
+
+    if "version" not in local_version or "version" not in remote_version:
+        raise KeyError("Missing 'version' key in version data")
+
+    try:
+        if local_version["version"] == remote_version["version"]:
+            return local_version
+
+        local_ts = _to_timestamp(local_version.get("modified_at")) or 0.0
+        remote_ts = _to_timestamp(remote_version.get("modified_at")) or 0.0
+
+        if local_ts >= remote_ts:
+            logger.info("Conflict resolved in favor of local version for file %s",
+                        local_version.get("file_id"))
+            return {
+                **local_version,
+                "conflict_status": "resolved_keep_local",
+                "conflicting_version": remote_version["version"],
+            }
+
+        logger.info("Conflict resolved in favor of remote version for file %s",
+                    remote_version.get("file_id"))
+        return {
+            **remote_version,
+            "conflict_status": "resolved_keep_remote",
+            "conflicting_version": local_version["version"],
+        }
+
+    except Exception as e:
+        logger.error("Failed to detect conflicts: %s", str(e))
+        raise
@@ -65,4 +65,17 @@ def test_run_app_raises_exception_on_error():
         with pytest.raises(Exception) as exc_info:
             run_app()
         assert "Server Error" in str(exc_info.value), "Expected 'Server Error' exception not raised."
-        mock_run.assert_called_once()
\ No newline at end of file
+        mock_run.assert_called_once()
+def test_shutdown_flushes_continue_after_a_failure():
+    """
+    Test that a failing access-count flush on shutdown does not skip the device token flush.
+    """
+    from auth import auth_service
+    from sharing import share_service
+
+    with patch.object(share_service.access_counter, "flush", side_effect=RuntimeError("db down")), \
+            patch.object(auth_service.device_tokens, "flush_last_used") as mock_flush_last_used:
+        with TestClient(create_app()):
+            pass
+
+    mock_flush_last_used.assert_called_once()
@@ -129,4 +129,92 @@ class TestLogoutEndpoint:
         """
         response = client.post("/auth/logout")  # No headers provided
         assert response.status_code == 401
-        assert "detail" in response.json()
\ No newline at end of file
+        assert "detail" in response.json()
+
+
+def test_login_throttled_before_password_check(client):
+    """
+    Test that repeated failures lock a username out without calling verify_user.
+    """
+    from auth import auth_service
+
+    auth_service.username_throttle.reset("stuffed_user")
+    with patch("auth.auth_controller.verify_user", return_value=None) as mock_verify_user:
+        payload = {"username": "stuffed_user", "password": "guess"}
+        statuses = [client.post("/auth/login", json=payload).status_code for _ in range(8)]
+
+    limit = auth_service.config["AUTH_LOGIN_MAX_FAILURES_PER_USER"]
+    assert statuses[:limit + 1] == [401] * (limit + 1)
+    assert set(statuses[limit + 1:]) == {429}
+    assert mock_verify_user.call_count == limit + 1
+    auth_service.username_throttle.reset("stuffed_user")
+    auth_service.ip_throttle.reset("testclient")
+
+
+def test_device_token_authenticates_requests(client):
+    """
+    Test that a device token works as a bearer token until it is revoked.
+    """
+    from auth.auth_service import create_access_token
+
+    jwt_headers = {"Authorization": f"Bearer {create_access_token({'sub': 'suhaas'})}"}
+    response = client.post("/auth/device-tokens", json={"device_name": "desktop"}, headers=jwt_headers)
+    assert response.status_code == 201
+    device = response.json()
+
+    device_headers = {"Authorization": f"Bearer {device['token']}"}
+    assert client.get("/auth/device-tokens", headers=device_headers).status_code == 200
+
+    response = client.delete(f"/auth/device-tokens/{device['token_id']}", headers=jwt_headers)
+    assert response.status_code == 200
+    assert client.get("/auth/device-tokens", headers=device_headers).status_code == 401
+
+
+def test_refresh_rotates_and_detects_reuse(client):
+    """
+    Test that /auth/refresh issues new tokens once per refresh token.
+    """
+    with patch("auth.auth_controller.verify_user", return_value={"id": "1", "username": "suhaas"}):
+        login_response = client.post("/auth/login", json={"username": "suhaas", "password": "123"})
+    refresh_token = login_response.json()["refresh_token"]
+
+    response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != refresh_token
+    headers = {"Authorization": f"Bearer {rotated['access_token']}"}
+    assert client.get("/auth/device-tokens", headers=headers).status_code == 200
+
+    assert client.post("/auth/refresh", json={"refresh_token": refresh_token}).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": rotated["refresh_token"]}).status_code == 401
+
+
+def test_refresh_fails_after_logout(client):
+    """
+    Test that logging out ends the login's refresh-token family too.
+    """
+    with patch("auth.auth_controller.verify_user", return_value={"id": "1", "username": "suhaas"}):
+        tokens = client.post("/auth/login", json={"username": "suhaas", "password": "123"}).json()
+
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+
+    response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+
+def test_login_does_not_reveal_unknown_usernames(client):
+    """
+    Test that an unknown username and a wrong password get the same 401 detail.
+    """
+    from auth import auth_service
+
+    details = []
+    for username, password in (("suhaas", "wrong"), ("nobody_here", "wrong")):
+        response = client.post("/auth/login", json={"username": username, "password": password})
+        assert response.status_code == 401
+        details.append(response.json()["detail"])
+        auth_service.username_throttle.reset(username)
+    auth_service.ip_throttle.reset("testclient")
+
+    assert details == ["Invalid username or password"] * 2
@@ -26,8 +26,8 @@ def test_create_user_success(mock_db_session, username, password):
     and saves it to the database.
     """
     # Mock bcrypt instead of a helper function
-    with patch("auth.auth_service.bcrypt.hashpw", return_value=b"mocked_hashed_pwd") as mock_hash:
-        with patch("auth.auth_service.bcrypt.gensalt", return_value=b"mock_salt"):
+    with patch("utils.auth_helpers.bcrypt.hashpw", return_value=b"mocked_hashed_pwd") as mock_hash:
+        with patch("utils.auth_helpers.bcrypt.gensalt", return_value=b"mock_salt"):
             # Call the function under test
             created_user = create_user(username, password)
         
@@ -117,4 +117,99 @@ def test_verify_user_nonexistent(mock_db_session):
             verify_user(test_username, test_password)
         # Check that the exception has the expected status code and detail
         assert exc_info.value.status_code == 401
-        assert "User not found" in str(exc_info.value.detail)
\ No newline at end of file
+        assert "User not found" in str(exc_info.value.detail)
+
+
+def test_verify_token_served_from_cache_until_logout():
+    """
+    Test that a verified token skips JWT decoding on repeat use and is dropped on logout.
+    """
+    from auth.auth_service import create_access_token, verify_token, invalidate_token
+
+    token = create_access_token({"sub": "suhaas"})
+    assert verify_token(token)["username"] == "suhaas"
+
+    with patch("auth.auth_service.pyjwt.decode") as mock_decode:
+        assert verify_token(token)["id"] == "1"
+        mock_decode.assert_not_called()
+
+    invalidate_token(token)
+    with patch("auth.auth_service.pyjwt.decode", side_effect=Exception("decoded")):
+        with pytest.raises(Exception, match="decoded"):
+            verify_token(token)
+
+
+def test_revoked_token_is_rejected():
+    """
+    Test that a token revoked on logout fails verification even if decodable.
+    """
+    from auth.auth_service import create_access_token, verify_token, revoke_token
+
+    token = create_access_token({"sub": "suhaas"})
+    verify_token(token)
+    revoke_token(token)
+
+    with pytest.raises(HTTPException) as exc_info:
+        verify_token(token)
+    assert "revoked" in exc_info.value.detail
+
+
+def test_cached_token_rechecks_revocation():
+    """
+    Test that a cached token is rejected once revoked elsewhere, without its cache entry being dropped.
+    """
+    from auth.auth_service import create_access_token, verify_token, revoked_tokens, token_engine
+
+    token = create_access_token({"sub": "suhaas"})
+    verify_token(token)
+    payload = token_engine.decode(token)
+    revoked_tokens.add(payload["jti"], payload["exp"])  # As another worker's logout would
+
+    with pytest.raises(HTTPException) as exc_info:
+        verify_token(token)
+    assert "revoked" in exc_info.value.detail
+
+
+def test_refresh_token_reuse_revokes_family_access_tokens():
+    """
+    Test that replaying a rotated-out refresh token also ends the family's access tokens.
+    """
+    from auth.auth_service import create_login_tokens, refresh_access_token, verify_token
+
+    tokens = create_login_tokens({"id": "1", "username": "suhaas"})
+    rotated = refresh_access_token(tokens["refresh_token"])
+    assert verify_token(rotated["access_token"])["username"] == "suhaas"
+
+    with pytest.raises(HTTPException):
+        refresh_access_token(tokens["refresh_token"])
+    with pytest.raises(HTTPException) as exc_info:
+        verify_token(rotated["access_token"])
+    assert "revoked" in exc_info.value.detail
+
+
+def test_verify_user_unknown_username_checks_dummy_hash():
+    """
+    Test that unknown usernames still pay for one bcrypt check, like known ones.
+    """
+    with patch("auth.auth_service.MOCK_USERS", {}):
+        with patch("auth.auth_service.verify_password", return_value=False) as mock_verify:
+            with pytest.raises(HTTPException):
+                verify_user("ghost", "guess")
+    mock_verify.assert_called_once()
+
+
+def test_verify_user_upgrades_outdated_hash():
+    """
+    Test that a successful login re-hashes a password stored below BCRYPT_ROUNDS.
+    """
+    import bcrypt
+    from utils.auth_helpers import BCRYPT_ROUNDS, verify_password as check
+
+    old_hash = bcrypt.hashpw(b"oldpass", bcrypt.gensalt(rounds=4)).decode("utf-8")
+    users = {"legacy": {"id": "7", "username": "legacy", "password": old_hash}}
+    with patch("auth.auth_service.MOCK_USERS", users):
+        assert verify_user("legacy", "oldpass")["id"] == "7"
+
+    new_hash = users["legacy"]["password"]
+    assert new_hash.startswith(f"$2b${BCRYPT_ROUNDS:02d}$")
+    assert check("oldpass", new_hash)
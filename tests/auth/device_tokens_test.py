@@ -0,0 +1,49 @@
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from auth.device_tokens import DeviceTokenRegistry, is_device_token
+
+USER = {"id": "1", "username": "suhaas"}
+
+
+def test_token_is_stored_only_as_hash():
+    """
+    Test that an issued token authenticates while only its digest is kept.
+    """
+    registry = DeviceTokenRegistry()
+    token, record = registry.issue(USER, "laptop")
+
+    assert is_device_token(token)
+    assert "token_hash" not in record
+    assert all(token not in str(entry) for entry in registry._records.items())
+    assert registry.authenticate(token)["user_id"] == "1"
+    assert registry.authenticate(token + "x") is None
+
+
+def test_revoked_token_is_rejected():
+    """
+    Test that only the owner can revoke a device token, and it stops working.
+    """
+    registry = DeviceTokenRegistry()
+    token, record = registry.issue(USER, "phone")
+
+    assert registry.revoke("someone_else", record["token_id"]) is False
+    assert registry.revoke("1", record["token_id"]) is True
+    assert registry.authenticate(token) is None
+
+
+def test_last_used_is_written_back_in_batches():
+    """
+    Test that last-used times are buffered until flushed, then persisted.
+    """
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    registry = DeviceTokenRegistry(engine)
+    tokens = [registry.issue(USER, f"device-{i}")[0] for i in range(3)]
+    for token in tokens + tokens:
+        registry.authenticate(token)
+
+    assert registry.flush_last_used() == 3
+    restarted = DeviceTokenRegistry(engine)
+    assert all(entry["last_used_at"] is not None for entry in restarted.list_for_user("1"))
+    assert restarted.authenticate(tokens[0])["device_name"] == "device-0"
@@ -0,0 +1,40 @@
+from auth.login_throttle import FailureThrottle
+
+
+def test_lockout_after_limit_and_doubles():
+    """
+    Test that a key is locked out past the limit and each lockout doubles.
+    """
+    throttle = FailureThrottle(limit=3, window=60, base_lockout=10, max_lockout=100)
+    for _ in range(3):
+        throttle.record_failure("alice", now=1)
+    assert throttle.retry_after("alice", now=1) == 0.0
+
+    throttle.record_failure("alice", now=1)
+    assert throttle.retry_after("alice", now=1) == 10
+
+    throttle.record_failure("alice", now=12)
+    assert throttle.retry_after("alice", now=12) == 20
+
+
+def test_failures_slide_out_of_the_window():
+    """
+    Test that old failures stop counting as the window slides.
+    """
+    throttle = FailureThrottle(limit=3, window=60, base_lockout=10, max_lockout=100)
+    for _ in range(3):
+        throttle.record_failure("bob", now=0)
+
+    throttle.record_failure("bob", now=150)
+    assert throttle.retry_after("bob", now=150) == 0.0
+
+
+def test_memory_is_bounded():
+    """
+    Test that only the most recently seen keys are tracked.
+    """
+    throttle = FailureThrottle(limit=3, window=60, base_lockout=10, max_lockout=100, max_keys=10)
+    for i in range(100):
+        throttle.record_failure(f"10.0.0.{i}", now=0)
+
+    assert len(throttle) == 10
@@ -0,0 +1,99 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from auth.refresh_tokens import RefreshTokenFamilies, RefreshTokenReused
+
+USER = {"id": "1", "username": "suhaas"}
+
+
+@pytest.fixture(params=["memory", "database"])
+def families(request):
+    """Provides refresh-token families in memory and on a private database."""
+    if request.param == "memory":
+        return RefreshTokenFamilies(ttl=3600)
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    return RefreshTokenFamilies(ttl=3600, engine=engine)
+
+
+def test_rotation_issues_a_new_token(families):
+    """
+    Test that a refresh token is exchanged for a different, working one.
+    """
+    first = families.issue(USER)
+    second, user = families.rotate(first)
+
+    assert second != first
+    assert user == USER
+    third, _ = families.rotate(second)
+    assert third not in (first, second)
+
+
+def test_reuse_revokes_the_family(families):
+    """
+    Test that replaying a rotated-out token revokes the tokens issued after it.
+    """
+    first = families.issue(USER)
+    second, _ = families.rotate(first)
+
+    with pytest.raises(RefreshTokenReused):
+        families.rotate(first)
+    with pytest.raises(ValueError, match="Invalid refresh token"):
+        families.rotate(second)
+
+
+def test_families_expire(families):
+    """
+    Test that a family stops working once its lifetime has passed.
+    """
+    token = families.issue(USER, now=1000.0)
+
+    with pytest.raises(ValueError, match="Invalid refresh token"):
+        families.rotate(token, now=1000.0 + 3600)
+    families.issue(USER, now=1000.0 + 3600)
+    if families._engine is None:
+        assert len(families) == 1
+
+
+def test_malformed_tokens_are_rejected(families):
+    """
+    Test that tokens that could not have been issued are rejected without lookup.
+    """
+    for token in ("", "rt_zz.secret", "rt_" + "ab" * 16, "not-a-refresh-token"):
+        with pytest.raises(ValueError, match="Invalid refresh token"):
+            families.rotate(token)
+
+
+def test_revoked_family_cannot_refresh(families):
+    """
+    Test that revoking a family, as logout does, stops its current token.
+    """
+    token = families.issue(USER)
+
+    assert families.revoke(families.handle(token)) is True
+    with pytest.raises(ValueError, match="Invalid refresh token"):
+        families.rotate(token)
+    assert families.revoke(families.handle(token)) is False
+
+
+def test_unknown_secret_does_not_revoke_the_family(families):
+    """
+    Test that a forged secret for a live family is rejected without logging its owner out.
+    """
+    token = families.issue(USER)
+    family_hex = token[len("rt_"):].partition(".")[0]
+
+    with pytest.raises(ValueError, match="Invalid refresh token"):
+        families.rotate(f"rt_{family_hex}.garbage")
+    rotated, user = families.rotate(token)
+    assert user == USER
+
+
+def test_handle_does_not_reveal_the_token_prefix(families):
+    """
+    Test that the handle carried in access tokens differs from the family id in refresh tokens.
+    """
+    token = families.issue(USER)
+
+    assert families.handle(token) not in token
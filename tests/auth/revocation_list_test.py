@@ -0,0 +1,44 @@
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from auth.revocation_list import RevocationList
+
+
+def test_entries_are_pruned_after_token_exp():
+    """
+    Test that revoked IDs are forgotten once their tokens have expired.
+    """
+    now = time.time()
+    revoked = RevocationList()
+    revoked.add("a" * 32, expires_at=now + 100)
+    revoked.add("b" * 32, expires_at=now + 200)
+
+    assert "a" * 32 in revoked
+    assert revoked.prune(now=now + 150) == 1
+    assert "a" * 32 not in revoked
+    assert "b" * 32 in revoked
+
+
+def test_revocations_survive_restart_with_engine():
+    """
+    Test that persisted revocations are reloaded by a new list.
+    """
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    RevocationList(engine).add("c" * 32, expires_at=time.time() + 3600)
+
+    assert "c" * 32 in RevocationList(engine)
+
+
+def test_revocations_by_other_workers_are_reloaded():
+    """
+    Test that a list picks up revocations written by another list on the same database.
+    """
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    worker_a = RevocationList(engine, reload_interval=0)
+    worker_b = RevocationList(engine, reload_interval=0)
+    worker_b.add("d" * 32, expires_at=time.time() + 3600)
+
+    assert "d" * 32 in worker_a
@@ -0,0 +1,36 @@
+import pytest
+
+from auth.token_cache import VerifiedTokenCache
+
+
+def _user(username="alice"):
+    """Builds a verified user like verify_token returns."""
+    return {"id": "1", "username": username}
+
+
+def test_entries_expire_at_token_exp():
+    """
+    Test that cached tokens stop being served once their exp has passed.
+    """
+    cache = VerifiedTokenCache(capacity=10)
+    cache.put("token", _user(), expires_at=100)
+
+    assert cache.get("token", now=99) == _user()
+    assert cache.get("token", now=100) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_capacity_and_hit_rate():
+    """
+    Test that the least recently used token is evicted and hits are counted.
+    """
+    cache = VerifiedTokenCache(capacity=2)
+    cache.put("a", _user("a"), expires_at=100)
+    cache.put("b", _user("b"), expires_at=100)
+    assert cache.get("a", now=0) is not None
+    cache.put("c", _user("c"), expires_at=100)
+
+    assert cache.get("b", now=0) is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hit_rate"] == pytest.approx(0.5)
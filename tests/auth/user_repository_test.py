@@ -0,0 +1,55 @@
+import pytest
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from auth.user_repository import SqlUserStore
+
+
+@pytest.fixture
+def store():
+    """Provides a user store on a private in-memory database."""
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    return SqlUserStore(engine, capacity=2, ttl=60)
+
+
+def test_username_is_unique(store):
+    """
+    Test that storing a second user under a taken username raises ValueError.
+    """
+    store["alice"] = {"id": "a1", "username": "alice", "password": "hash-1"}
+
+    with pytest.raises(ValueError, match="already exists"):
+        store["alice"] = {"id": "a2", "username": "alice", "password": "hash-2"}
+    assert store["alice"]["id"] == "a1"
+
+
+def test_same_user_updates_password(store):
+    """
+    Test that storing a record with the existing id replaces the password.
+    """
+    store["alice"] = {"id": "a1", "username": "alice", "password": "hash-1"}
+    store["alice"] = {"id": "a1", "username": "alice", "password": "hash-2"}
+
+    store.invalidate("alice")
+    assert store["alice"]["password"] == "hash-2"
+    assert len(store) == 1
+
+
+def test_lookups_are_served_from_cache(store):
+    """
+    Test that a hot user is read from the database once, and the cache stays bounded.
+    """
+    store["alice"] = {"id": "a1", "username": "alice", "password": "hash-1"}
+    store.invalidate("alice")
+    assert store["alice"]["id"] == "a1"
+
+    with patch.object(store._engine, "connect", side_effect=AssertionError("queried")):
+        assert store["alice"]["id"] == "a1"
+        assert "alice" in store
+
+    store["bob"] = {"id": "b1", "username": "bob", "password": None}
+    store["carol"] = {"id": "c1", "username": "carol", "password": None}
+    assert len(store._cache) == 2
+    assert "missing" not in store
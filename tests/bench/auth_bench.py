@@ -0,0 +1,226 @@
+"""
+Auth microbenchmarks.
+
+Times the pieces of authentication that every request or login pays for:
+JWT creation and verification (cold and from the verified-token cache),
+bcrypt hashing and checking at several cost factors, session validation
+with growing numbers of active sessions, and end-to-end /auth/login and
+authenticated /files/list requests through an in-process ASGI client.
+
+Usage:
+    python tests/bench/auth_bench.py --iterations 2000 --costs 4,8,10,12 \
+        --sessions 1000,10000,100000,1000000 --output auth_bench.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+from unittest.mock import patch
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx
+
+from app import create_app
+from auth import auth_service
+from utils import auth_helpers
+from utils.session_store import SessionStore
+from tests.bench.sync_sim import percentile
+
+
+def _measure(func: Callable[[int], Any], iterations: int) -> Dict[str, Any]:
+    """Calls func(i) for each iteration and summarizes the per-call latencies."""
+    samples: List[float] = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        call_start = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+    return {
+        "iterations": iterations,
+        "ops_per_s": iterations / elapsed if elapsed else 0.0,
+        "mean_us": elapsed / iterations * 1e6 if iterations else 0.0,
+        "p50_us": percentile(samples, 50) * 1e6,
+        "p99_us": percentile(samples, 99) * 1e6,
+    }
+
+
+def bench_tokens(iterations: int) -> Dict[str, Any]:
+    """Times create_access_token and verify_token with and without the cache."""
+    tokens = [auth_service.create_access_token({"sub": "suhaas"}) for _ in range(iterations)]
+
+    def verify_cold(i: int) -> None:
+        auth_service.invalidate_token(tokens[i])
+        auth_service.verify_token(tokens[i])
+
+    results = {
+        "create_access_token": _measure(
+            lambda i: auth_service.create_access_token({"sub": "suhaas"}), iterations),
+        "verify_token_cold": _measure(verify_cold, iterations),
+        "verify_token_cached": _measure(lambda i: auth_service.verify_token(tokens[i]), iterations),
+    }
+    for token in tokens:
+        auth_service.invalidate_token(token)
+    return results
+
+
+def bench_bcrypt(costs: Sequence[int], iterations: int) -> Dict[str, Any]:
+    """Times hash_password and verify_password at each bcrypt cost factor."""
+    results = {}
+    for cost in costs:
+        with patch("utils.auth_helpers.BCRYPT_ROUNDS", cost):
+            hashed = auth_helpers.hash_password("bench-password")
+            results[str(cost)] = {
+                "hash_password": _measure(
+                    lambda i: auth_helpers.hash_password("bench-password"), iterations),
+                "verify_password": _measure(
+                    lambda i: auth_helpers.verify_password("bench-password", hashed), iterations),
+            }
+    return results
+
+
+def bench_sessions(sizes: Sequence[int], iterations: int, seed: int = 0) -> Dict[str, Any]:
+    """Times check_session_valid against stores holding each number of sessions."""
+    rng = random.Random(seed)
+    results = {}
+    for size in sizes:
+        store = SessionStore(ttl=auth_helpers.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+                             shards=auth_helpers.config["SESSION_STORE_SHARDS"])
+        build_start = time.perf_counter()
+        for n in range(size):
+            store.create(f"user-{n}")
+        build_s = time.perf_counter() - build_start
+        user_ids = [f"user-{rng.randrange(size)}" for _ in range(iterations)]
+        with patch("utils.auth_helpers.active_sessions", store):
+            timing = _measure(lambda i: auth_helpers.check_session_valid(user_ids[i]), iterations)
+        results[str(size)] = {"sessions": size, "build_s": build_s, **timing}
+    return results
+
+
+async def _http(requests: int, cost: int) -> Dict[str, Any]:
+    """Sends sequential logins and authenticated file listings to a fresh app."""
+    transport = httpx.ASGITransport(app=create_app())
+    latencies: Dict[str, List[float]] = {"login": [], "files_list": []}
+    statuses: Dict[str, Dict[str, int]] = {"login": {}, "files_list": {}}
+    credentials = {"username": "bench_user", "password": "bench-password"}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def timed(name: str, send: Callable[[], Any]) -> httpx.Response:
+            start = time.perf_counter()
+            response = await send()
+            latencies[name].append(time.perf_counter() - start)
+            code = str(response.status_code)
+            statuses[name][code] = statuses[name].get(code, 0) + 1
+            return response
+
+        token = None
+        for _ in range(requests):
+            response = await timed("login", lambda: client.post("/auth/login", json=credentials))
+            token = response.json().get("access_token", token)
+        headers = {"Authorization": f"Bearer {token}"}
+        for _ in range(requests):
+            await timed("files_list", lambda: client.get("/files/list", headers=headers))
+
+    report: Dict[str, Any] = {"bcrypt_rounds": cost}
+    for name, samples in latencies.items():
+        report[name] = {
+            "requests": len(samples),
+            "mean_ms": sum(samples) / len(samples) * 1000 if samples else 0.0,
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+            "statuses": statuses[name],
+        }
+    return report
+
+
+def bench_http(requests: int, cost: int) -> Dict[str, Any]:
+    """Times /auth/login and authenticated /files/list end to end."""
+    users = {"bench_user": {"id": "bench", "username": "bench_user", "password": None}}
+    with patch("utils.auth_helpers.BCRYPT_ROUNDS", cost), \
+            patch.object(auth_service, "MOCK_USERS", users):
+        users["bench_user"]["password"] = auth_helpers.hash_password("bench-password")
+        return asyncio.run(_http(requests, cost))
+
+
+def run_auth_bench(iterations: int = 1000, costs: Sequence[int] = (4, 8, 10, 12),
+                   bcrypt_iterations: int = 5, session_sizes: Sequence[int] = (10**3, 10**4, 10**5, 10**6),
+                   http_requests: int = 50, http_cost: int = 10) -> Dict[str, Any]:
+    """Runs every benchmark and returns one JSON-serializable report."""
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "jwt_algorithm": auth_helpers.config["JWT_ALGORITHM"],
+        },
+        "tokens": bench_tokens(iterations),
+        "bcrypt": bench_bcrypt(costs, bcrypt_iterations),
+        "sessions": bench_sessions(session_sizes, iterations),
+        "http": bench_http(http_requests, http_cost),
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Formats a benchmark report as plain-text tables."""
+    lines = [f"{'benchmark':<36}{'ops/s':>12}{'p50 us':>12}{'p99 us':>12}"]
+
+    def row(name: str, result: Dict[str, Any]) -> None:
+        lines.append(f"{name:<36}{result['ops_per_s']:>12.1f}"
+                     f"{result['p50_us']:>12.1f}{result['p99_us']:>12.1f}")
+
+    for name, result in report["tokens"].items():
+        row(name, result)
+    for cost, results in report["bcrypt"].items():
+        for name, result in results.items():
+            row(f"{name} (cost {cost})", result)
+    for size, result in report["sessions"].items():
+        row(f"check_session_valid ({size} sessions)", result)
+    lines.append("")
+    lines.append(f"{'endpoint':<36}{'requests':>12}{'p50 ms':>12}{'p99 ms':>12}")
+    for name in ("login", "files_list"):
+        result = report["http"][name]
+        lines.append(f"{name:<36}{result['requests']:>12}"
+                     f"{result['p50_ms']:>12.2f}{result['p99_ms']:>12.2f}")
+    return "\n".join(lines)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Auth microbenchmarks")
+    parser.add_argument("--iterations", type=int, default=1000,
+                        help="Calls per token and session benchmark")
+    parser.add_argument("--costs", type=_int_list, default=[4, 8, 10, 12],
+                        help="Comma-separated bcrypt cost factors")
+    parser.add_argument("--bcrypt-iterations", type=int, default=5,
+                        help="Calls per bcrypt benchmark")
+    parser.add_argument("--sessions", type=_int_list, default=[10**3, 10**4, 10**5, 10**6],
+                        help="Comma-separated active session counts")
+    parser.add_argument("--http-requests", type=int, default=50,
+                        help="Requests per end-to-end endpoint")
+    parser.add_argument("--http-cost", type=int, default=10,
+                        help="bcrypt cost factor for end-to-end logins")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run_auth_bench(args.iterations, args.costs, args.bcrypt_iterations,
+                            args.sessions, args.http_requests, args.http_cost)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
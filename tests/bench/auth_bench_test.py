@@ -0,0 +1,18 @@
+import json
+
+from tests.bench.auth_bench import run_auth_bench
+
+
+def test_run_auth_bench_smoke():
+    """
+    Test that a small run covers every benchmark and serializes to JSON.
+    """
+    report = run_auth_bench(iterations=20, costs=(4,), bcrypt_iterations=2,
+                            session_sizes=(10, 100), http_requests=3, http_cost=4)
+
+    assert set(report["tokens"]) == {"create_access_token", "verify_token_cold", "verify_token_cached"}
+    assert report["bcrypt"]["4"]["verify_password"]["iterations"] == 2
+    assert report["sessions"]["100"]["sessions"] == 100
+    assert report["http"]["login"]["statuses"] == {"200": 3}
+    assert report["http"]["files_list"]["statuses"] == {"200": 3}
+    assert json.loads(json.dumps(report)) == report
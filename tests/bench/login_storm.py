@@ -0,0 +1,138 @@
+"""
+Login storm benchmark.
+
+Floods /auth/login with concurrent logins for a bcrypt-hashed user while a
+probe keeps requesting an unrelated endpoint, all on one event loop of an
+in-process app. Reports login throughput and the probe's p50/p95/p99 latency,
+once with bcrypt on the hashing pool and once inline on the event loop.
+
+Usage:
+    python tests/bench/login_storm.py --logins 200 --concurrency 32 --rounds 10 --json
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+from unittest.mock import patch
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx
+
+from app import create_app
+from auth import auth_service
+from tests.bench.sync_sim import percentile
+
+PROBE_URL = "/openapi.json"
+
+
+async def _run_inline(func: Callable[..., Any], *args: Any) -> Any:
+    """Stand-in for run_password_work that hashes on the event loop, as before pooling."""
+    return func(*args)
+
+
+def _summarize(samples: List[float], elapsed: float) -> Dict[str, Any]:
+    return {
+        "requests": len(samples),
+        "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+async def _storm(logins: int, concurrency: int, password: str) -> Dict[str, Any]:
+    """Runs the login storm and the probe concurrently against a fresh app."""
+    transport = httpx.ASGITransport(app=create_app())
+    login_latencies: List[float] = []
+    probe_latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    remaining = logins
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get(PROBE_URL)  # Build the OpenAPI schema before measuring
+
+        async def login_worker() -> None:
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                response = await client.post(
+                    "/auth/login", json={"username": "bench_user", "password": password}
+                )
+                login_latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        async def probe() -> None:
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get(PROBE_URL)
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.005)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+
+    return {
+        "elapsed_s": elapsed,
+        "login": {**_summarize(login_latencies, elapsed),
+                  "statuses": {str(code): count for code, count in sorted(statuses.items())}},
+        "probe": _summarize(probe_latencies, elapsed),
+    }
+
+
+def run_login_storm(logins: int = 100, concurrency: int = 16, rounds: int = 10) -> Dict[str, Any]:
+    """Runs the storm with pooled and with inline hashing and reports both."""
+    password = "bench-password"
+    users = {"bench_user": {"id": "bench", "username": "bench_user", "password": None}}
+    with patch("utils.auth_helpers.BCRYPT_ROUNDS", rounds), \
+            patch.object(auth_service, "MOCK_USERS", users):
+        users["bench_user"]["password"] = auth_service.hash_password(password)
+        report = {"rounds": rounds, "logins": logins, "concurrency": concurrency}
+        report["pool"] = asyncio.run(_storm(logins, concurrency, password))
+        with patch("auth.auth_controller.run_password_work", _run_inline):
+            report["inline"] = asyncio.run(_storm(logins, concurrency, password))
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Formats a storm report as a plain-text table."""
+    lines = [
+        f"bcrypt rounds={report['rounds']} logins={report['logins']} "
+        f"concurrency={report['concurrency']}",
+        f"{'mode':<8}{'logins/s':>10}{'login p99':>11}{'probes':>8}{'probe p50':>11}"
+        f"{'probe p95':>11}{'probe p99':>11}",
+    ]
+    for mode in ("pool", "inline"):
+        login, probe = report[mode]["login"], report[mode]["probe"]
+        lines.append(
+            f"{mode:<8}{login['throughput_rps']:>10.1f}{login['p99_ms']:>11.2f}"
+            f"{probe['requests']:>8}{probe['p50_ms']:>11.2f}{probe['p95_ms']:>11.2f}{probe['p99_ms']:>11.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Login storm benchmark")
+    parser.add_argument("--logins", type=int, default=100, help="Total login attempts")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent login clients")
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost factor")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run_login_storm(args.logins, args.concurrency, args.rounds)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+from tests.bench.login_storm import run_login_storm
+
+
+def test_run_login_storm_smoke():
+    """
+    Test that a small storm logs in successfully in both hashing modes.
+    """
+    report = run_login_storm(logins=8, concurrency=4, rounds=4)
+
+    for mode in ("pool", "inline"):
+        assert report[mode]["login"]["statuses"] == {"200": 8}
+        assert report[mode]["probe"]["requests"] > 0
@@ -0,0 +1,281 @@
+"""
+Multi-device sync load simulator.
+
+Drives simulated devices across several users through the real /files/upload,
+/sync/init and /sync/resolve endpoints of an in-process app and reports
+throughput and p50/p95/p99 latency per endpoint.
+
+Usage:
+    python tests/bench/sync_sim.py --users 10 --devices 40 --operations 50 \
+        --churn 0.3 --conflict-rate 0.1 --json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app import create_app
+from auth.auth_service import get_current_user, oauth2_scheme
+
+
+class Device:
+    """State a single simulated sync client keeps between requests."""
+
+    def __init__(self, device_id: str, user_id: str):
+        self.device_id = device_id
+        self.user_id = user_id
+        self.cursor = 0
+        # file_id -> {"version_vector": ..., "content": ...}; the vector is the one the
+        # server last returned, and content is only known for versions the device saw
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Returns the nearest-rank percentile of the samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class SyncSimulation:
+    """Runs the simulated workload and records per-endpoint latencies."""
+
+    def __init__(self, client: TestClient, users: int, devices: int,
+                 churn: float, conflict_rate: float, seed: int):
+        self.client = client
+        self.churn = churn
+        self.conflict_rate = conflict_rate
+        self.random = random.Random(seed)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.resolve_outcomes: Dict[str, int] = defaultdict(int)
+        self.resolves_without_base = 0
+        self.devices = [
+            Device(f"device-{i}", f"sim-user-{i % users}") for i in range(devices)
+        ]
+
+    def _request(self, endpoint: str, device: Device, method: str, url: str, **kwargs) -> Any:
+        headers = {"Authorization": f"Bearer {device.user_id}"}
+        start = time.perf_counter()
+        response = self.client.request(method, url, headers=headers, **kwargs)
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[endpoint] += 1
+            return None
+        return response.json()
+
+    def upload(self, device: Device) -> None:
+        """Creates a new file or edits one the device already knows about."""
+        data = {"device_id": device.device_id}
+        known = list(device.files)
+        if known and self.random.random() < 0.5:
+            file_id = self.random.choice(known)
+            data["file_id"] = file_id
+        content = "".join(
+            f"{device.device_id} line {i} {self.random.random()}\n"
+            for i in range(self.random.randint(2, 20))
+        )
+        result = self._request(
+            "/files/upload", device, "POST", "/files/upload",
+            files={"upload_file": ("notes.txt", content.encode("utf-8"), "text/plain")},
+            data=data
+        )
+        if result:
+            device.files[result["file_id"]] = {
+                "version_vector": result["version_vector"],
+                "content": content
+            }
+
+    def sync(self, device: Device) -> None:
+        """Catches the device up from its last cursor."""
+        result = self._request(
+            "/sync/init", device, "POST",
+            f"/sync/init?last_sync_ts=0&cursor={device.cursor}"
+        )
+        if result:
+            device.cursor = result["current_cursor"]
+            for changed in result["changed_files"]:
+                if changed.get("change_type") == "delete":
+                    device.files.pop(changed["file_id"], None)
+                    continue
+                state = device.files.get(changed["file_id"])
+                vector = changed.get("version_vector") or {}
+                if state is None or state["version_vector"] != vector:
+                    # Only metadata arrives here, so the new content is not known locally
+                    device.files[changed["file_id"]] = {
+                        "version_vector": vector,
+                        "content": None
+                    }
+
+    def resolve(self, device: Device) -> None:
+        """
+        Submits a local edit and a concurrent remote edit of a known file for
+        server-side resolution, starting from the vector the server last returned.
+
+        The base content is only sent when the device holds the content for that
+        vector; otherwise the server has to find the common ancestor itself.
+        """
+        if not device.files:
+            return
+        file_id = self.random.choice(list(device.files))
+        state = device.files[file_id]
+        vector = state["version_vector"]
+        base = state.get("content")
+        if base is not None:
+            lines = base.splitlines(keepends=True)
+            local_content = "".join([f"{device.device_id} edited\n"] + lines[1:])
+            remote_content = "".join(lines[:-1] + ["remote edited\n"])
+        else:
+            local_content = f"{device.device_id} rewrite {self.random.random()}\n"
+            remote_content = f"remote rewrite {self.random.random()}\n"
+        local_version = {
+            "file_id": file_id,
+            "original_name": "notes.txt",
+            "version_vector": {**vector, device.device_id: vector.get(device.device_id, 0) + 1},
+            "content": local_content
+        }
+        if base is not None:
+            local_version["base_content"] = base
+        else:
+            self.resolves_without_base += 1
+        remote_version = {
+            "file_id": file_id,
+            "original_name": "notes.txt",
+            "version_vector": {**vector, "remote": vector.get("remote", 0) + 1},
+            "content": remote_content
+        }
+        result = self._request(
+            "/sync/resolve", device, "POST", "/sync/resolve",
+            json={"local_version": local_version, "remote_version": remote_version}
+        )
+        if result:
+            resolved = result["resolved_version"]
+            outcome = resolved.get("conflict_status", "equal")
+            self.resolve_outcomes[outcome] += 1
+            # An unresolved conflict leaves the device without agreed content
+            device.files[file_id] = {
+                "version_vector": resolved["version_vector"],
+                "content": None if outcome == "conflict" else resolved.get("content")
+            }
+
+    def run(self, operations: int) -> Dict[str, Any]:
+        """Runs the given number of operations per device, interleaved randomly."""
+        schedule = [device for device in self.devices for _ in range(operations)]
+        self.random.shuffle(schedule)
+
+        start = time.perf_counter()
+        for device in schedule:
+            if self.random.random() < self.churn:
+                self.upload(device)
+                if self.random.random() < self.conflict_rate:
+                    self.resolve(device)
+            else:
+                self.sync(device)
+        elapsed = time.perf_counter() - start
+
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        """Summarizes throughput and latency percentiles per endpoint."""
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors[endpoint],
+                "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+            }
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {
+            "elapsed_s": elapsed,
+            "total_requests": total,
+            "throughput_rps": total / elapsed if elapsed else 0.0,
+            "endpoints": endpoints,
+            "resolve_outcomes": dict(sorted(self.resolve_outcomes.items())),
+            "resolves_without_base": self.resolves_without_base,
+        }
+
+
+def run_simulation(users: int = 5, devices: int = 10, operations: int = 20,
+                   churn: float = 0.3, conflict_rate: float = 0.1,
+                   seed: int = 0) -> Dict[str, Any]:
+    """Runs the simulation against a fresh in-process app with temporary storage."""
+    app = create_app()
+
+    # Bearer tokens are the simulated user IDs, so auth cost stays out of the numbers
+    def sim_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+        return {"id": token, "username": token}
+
+    app.dependency_overrides[get_current_user] = sim_current_user
+
+    with tempfile.TemporaryDirectory() as storage_dir, \
+            patch.dict(os.environ, {"DROPBOX_LITE_STORAGE_PATH": storage_dir}), \
+            patch("files.file_service.UPLOAD_DIR", Path(storage_dir)):
+        with TestClient(app) as client:
+            simulation = SyncSimulation(client, users, devices, churn, conflict_rate, seed)
+            return simulation.run(operations)
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Formats a simulation report as a plain-text table."""
+    lines = [
+        f"{'endpoint':<16}{'requests':>10}{'errors':>8}{'req/s':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    ]
+    for endpoint, stats in report["endpoints"].items():
+        lines.append(
+            f"{endpoint:<16}{stats['requests']:>10}{stats['errors']:>8}"
+            f"{stats['throughput_rps']:>10.1f}{stats['p50_ms']:>10.2f}"
+            f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+        )
+    outcomes = ", ".join(f"{name}={count}" for name, count in report["resolve_outcomes"].items())
+    lines.append(
+        f"resolve outcomes: {outcomes or 'none'} "
+        f"({report['resolves_without_base']} without base)"
+    )
+    lines.append(
+        f"total: {report['total_requests']} requests in {report['elapsed_s']:.2f}s "
+        f"({report['throughput_rps']:.1f} req/s)"
+    )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Multi-device sync load simulator")
+    parser.add_argument("--users", type=int, default=5, help="Number of simulated users")
+    parser.add_argument("--devices", type=int, default=10, help="Total simulated devices")
+    parser.add_argument("--operations", type=int, default=20, help="Operations per device")
+    parser.add_argument("--churn", type=float, default=0.3,
+                        help="Probability an operation uploads instead of syncing")
+    parser.add_argument("--conflict-rate", type=float, default=0.1,
+                        help="Probability an upload is followed by a conflicting edit")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run_simulation(args.users, args.devices, args.operations,
+                            args.churn, args.conflict_rate, args.seed)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import pytest
+
+from files import file_service
+from sync import change_journal, snapshot_service, sync_service
+from tests.bench.sync_sim import percentile, run_simulation
+
+
+@pytest.fixture
+def isolated_sync_state():
+    """
+    Fixture that restores the module-level file and sync state the simulation fills.
+    """
+    stores = [
+        file_service._file_db,
+        file_service._folder_db,
+        sync_service._version_history,
+        change_journal._journal,
+        change_journal._tombstones,
+        change_journal._horizon,
+        change_journal._horizon_cursor,
+        snapshot_service._snapshots,
+    ]
+    originals = [store.copy() for store in stores]
+
+    yield
+
+    for store, original in zip(stores, originals):
+        store.clear()
+        store.update(original)
+
+
+def test_percentile_nearest_rank():
+    """Test that percentiles use the nearest-rank method."""
+    samples = [float(i) for i in range(1, 101)]
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 99) == 99.0
+    assert percentile([], 95) == 0.0
+
+
+def test_run_simulation_smoke(isolated_sync_state):
+    """
+    Test that a small simulation exercises every endpoint without errors, and
+    resolves both with a client-sent base and via the server's ancestor lookup.
+    """
+    report = run_simulation(users=2, devices=4, operations=10, churn=0.5,
+                            conflict_rate=1.0, seed=1)
+
+    assert set(report["endpoints"]) == {"/files/upload", "/sync/init", "/sync/resolve"}
+    for stats in report["endpoints"].values():
+        assert stats["errors"] == 0
+        assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+    assert report["resolve_outcomes"]["merged"] > 0
+    assert report["resolves_without_base"] > 0
+
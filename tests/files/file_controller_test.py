@@ -140,6 +140,25 @@ class TestFileController:
         except Exception as e:
             pytest.skip(f"Download test skipped, fix in progress: {str(e)}")
     
+    @patch("files.file_service.fetch_file")
+    def test_download_file_endpoint_non_latin_name(self, mock_fetch_file, client):
+        """
+        Test that a file name outside latin-1 is sent as an RFC 5987 filename*.
+        """
+        mock_fetch_file.return_value = {
+            "metadata": {"file_id": "123", "user_id": "test_user_id",
+                         "original_name": '\u6587\u4ef6 "1".txt', "type": "text/plain"},
+            "file_bytes": b"Hello World"
+        }
+
+        response = client.get("/files/download/123")
+
+        assert response.status_code == 200
+        assert response.headers["content-disposition"] == (
+            'attachment; filename="?? _1_.txt"; '
+            "filename*=UTF-8''%E6%96%87%E4%BB%B6%20%221%22.txt"
+        )
+
     @patch("files.file_service.fetch_file")
     def test_download_file_endpoint_not_found(self, mock_fetch_file, client):
         """
@@ -204,4 +204,51 @@ def test_list_user_files_invalid_user():
     # The function should return an empty list, not raise an error
     result = list_user_files(user_id, folder_id)
     assert isinstance(result, list)
-    assert len(result) == 0
\ No newline at end of file
+    assert len(result) == 0
+
+# ---------------------------------
+# Tests for folder hierarchy
+# ---------------------------------
+def test_move_folder_rejects_cycles():
+    """Test that a folder cannot be moved below one of its own subfolders."""
+    from files.file_service import create_folder, move_folder, hierarchy_version, _folder_db
+
+    parent = create_folder("123", "parent")
+    child = create_folder("123", "child", parent_id=parent["folder_id"])
+    try:
+        with pytest.raises(ValueError):
+            move_folder(parent["folder_id"], "123", child["folder_id"])
+
+        version = hierarchy_version()
+        move_folder(child["folder_id"], "123", None)
+        assert hierarchy_version() == version + 1
+        assert _folder_db[child["folder_id"]]["parent_id"] is None
+    finally:
+        _folder_db.pop(parent["folder_id"], None)
+        _folder_db.pop(child["folder_id"], None)
+
+
+@pytest.mark.asyncio
+async def test_replacing_file_keeps_its_folder(tmp_path):
+    """Test that re-uploading a file without a folder_id leaves it in its folder."""
+    from files.file_service import create_folder, delete_file, _folder_db
+
+    class _Upload:
+        filename = "notes.txt"
+        content_type = "text/plain"
+
+        def __init__(self, content):
+            self._content = content
+
+        async def read(self):
+            return self._content
+
+    folder = create_folder("123", "docs")
+    with patch("files.file_service.UPLOAD_DIR", tmp_path):
+        stored = await store_file("123", _Upload(b"v1"), folder["folder_id"])
+        try:
+            replaced = await store_file("123", _Upload(b"v2"), file_id=stored["file_id"])
+            assert replaced["folder_id"] == folder["folder_id"]
+        finally:
+            delete_file(stored["file_id"], "123")
+            _folder_db.pop(folder["folder_id"], None)
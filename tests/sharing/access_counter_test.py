@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+
+from sharing.access_counter import AccessCounter
+
+
+def test_flush_coalesces_increments_per_token():
+    """
+    Test that repeated hits on a token are flushed as a single count.
+    """
+    flushed = []
+    counter = AccessCounter(flush=flushed.append, threshold=100)
+    for _ in range(3):
+        counter.increment("a")
+    counter.increment("b")
+
+    assert counter.pending("a") == 3
+    assert counter.flush() == 2
+    assert flushed == [{"a": 3, "b": 1}]
+    assert counter.pending("a") == 0
+    assert counter.flush() == 0
+
+
+def test_increment_flushes_when_threshold_reached():
+    """
+    Test that the buffer is flushed once enough distinct tokens are pending.
+    """
+    flushed = []
+    counter = AccessCounter(flush=flushed.append, threshold=2)
+    counter.increment("a")
+    assert flushed == []
+    counter.increment("b")
+    assert flushed == [{"a": 1, "b": 1}]
+
+
+def test_failed_flush_keeps_counts_for_retry():
+    """
+    Test that counts survive a failed flush.
+    """
+    def failing_flush(counts):
+        raise RuntimeError("database unavailable")
+
+    counter = AccessCounter(flush=failing_flush, threshold=100)
+    counter.increment("a")
+    with pytest.raises(RuntimeError):
+        counter.flush()
+    assert counter.pending("a") == 1
+
+
+def test_failed_inline_flush_does_not_raise():
+    """
+    Test that a failed threshold flush keeps the counts without failing the increment.
+    """
+    def failing_flush(counts):
+        raise RuntimeError("database unavailable")
+
+    counter = AccessCounter(flush=failing_flush, threshold=2)
+    counter.increment("a")
+    counter.increment("b")
+    assert counter.pending("a") == 1
+    assert counter.pending("b") == 1
+
+
+@pytest.mark.asyncio
+async def test_flusher_keeps_running_after_a_failed_flush():
+    """
+    Test that the background flusher retries after a failure instead of stopping.
+    """
+    calls = []
+
+    def flaky_flush(counts):
+        calls.append(dict(counts))
+        if len(calls) == 1:
+            raise RuntimeError("database unavailable")
+
+    counter = AccessCounter(flush=flaky_flush, threshold=100)
+    counter.increment("a")
+    task = asyncio.create_task(counter.run_flusher(0))
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if len(calls) >= 2:
+            break
+    task.cancel()
+
+    assert calls == [{"a": 1}, {"a": 1}]
+    assert counter.pending("a") == 0
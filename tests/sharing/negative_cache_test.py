@@ -0,0 +1,45 @@
+import logging
+from unittest.mock import MagicMock
+
+from sharing.negative_cache import NegativeCache, SampledLogger
+
+
+def test_negative_cache_expires_entries():
+    """
+    Test that cached rejections are forgotten after the TTL.
+    """
+    cache = NegativeCache(capacity=10, ttl=60)
+    cache.add("token", "Share token has expired", now=0)
+
+    assert cache.get("token", now=59) == "Share token has expired"
+    assert cache.get("token", now=60) is None
+    assert len(cache) == 0
+
+
+def test_negative_cache_is_bounded():
+    """
+    Test that the oldest entries are evicted once capacity is reached.
+    """
+    cache = NegativeCache(capacity=3, ttl=60)
+    for i in range(5):
+        cache.add(f"token-{i}", "Share token does not exist", now=0)
+
+    assert len(cache) == 3
+    assert cache.get("token-0", now=0) is None
+    assert cache.get("token-4", now=0) == "Share token does not exist"
+
+
+def test_sampled_logger_writes_one_line_per_interval():
+    """
+    Test that repeated events are summarized instead of logged individually.
+    """
+    mock_logger = MagicMock(spec=logging.Logger)
+    sampled = SampledLogger(mock_logger, "Rejected %d lookups: %s", interval=60)
+
+    assert sampled.record("missing", now=0) is True
+    for i in range(100):
+        assert sampled.record("missing", now=1 + i * 0.1) is False
+    assert sampled.record("expired", now=61) is True
+
+    assert mock_logger.warning.call_count == 2
+    mock_logger.warning.assert_called_with("Rejected %d lookups: %s", 101, {"missing": 100, "expired": 1})
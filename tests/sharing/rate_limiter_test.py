@@ -0,0 +1,46 @@
+import pytest
+
+from sharing.rate_limiter import TokenBucketLimiter
+
+
+def test_allows_burst_then_rejects_with_retry_after():
+    """
+    Test that a key can spend its burst and is then told when to retry.
+    """
+    limiter = TokenBucketLimiter(rate=2, burst=3)
+    assert [limiter.acquire("k", now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+
+    retry_after = limiter.acquire("k", now=0.0)
+    assert retry_after == pytest.approx(0.5)
+
+
+def test_refills_at_configured_rate():
+    """
+    Test that tokens are replenished over time, up to the burst size.
+    """
+    limiter = TokenBucketLimiter(rate=2, burst=3)
+    for _ in range(3):
+        limiter.acquire("k", now=0.0)
+
+    assert limiter.acquire("k", now=0.5) == 0.0
+    assert limiter.acquire("k", now=0.5) > 0
+
+
+def test_keys_are_limited_independently():
+    """
+    Test that exhausting one key does not affect another.
+    """
+    limiter = TokenBucketLimiter(rate=1, burst=1)
+    assert limiter.acquire("a", now=0.0) == 0.0
+    assert limiter.acquire("a", now=0.0) > 0
+    assert limiter.acquire("b", now=0.0) == 0.0
+
+
+def test_shard_size_is_bounded():
+    """
+    Test that idle buckets are evicted once a shard is full.
+    """
+    limiter = TokenBucketLimiter(rate=1, burst=1, shards=1, max_keys_per_shard=10)
+    for i in range(100):
+        limiter.acquire(f"key-{i}", now=0.0)
+    assert len(limiter._shards[0]) == 10
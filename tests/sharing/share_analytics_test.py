@@ -0,0 +1,50 @@
+import pytest
+
+from sharing.share_analytics import HyperLogLog, ShareAnalytics
+
+
+def test_hyperloglog_estimate_is_close():
+    """
+    Test that the unique-visitor estimate stays within a few percent.
+    """
+    hll = HyperLogLog()
+    for i in range(20000):
+        hll.add(f"visitor-{i}")
+        hll.add(f"visitor-{i}")  # Repeat visits must not be double counted
+
+    assert hll.count() == pytest.approx(20000, rel=0.1)
+
+
+def test_hourly_and_daily_buckets():
+    """
+    Test that hits land in the right buckets and old buckets fall out of the window.
+    """
+    analytics = ShareAnalytics()
+    hour = 3600
+    start = 1_700_000_000 - 1_700_000_000 % (24 * hour)
+    analytics.record_hit("t", "a", now=start)
+    analytics.record_hit("t", "b", now=start + 10)
+    analytics.record_hit("t", "a", now=start + hour)
+
+    stats = analytics.get_stats("t", now=start + hour)
+    assert stats["total_accesses"] == 3
+    assert stats["unique_visitors"] == 2
+    assert [bucket["count"] for bucket in stats["hourly"][-2:]] == [2, 1]
+    assert stats["daily"][-1]["count"] == 3
+
+    later = analytics.get_stats("t", now=start + 49 * hour)
+    assert sum(bucket["count"] for bucket in later["hourly"]) == 0
+    assert later["total_accesses"] == 3
+
+
+def test_retain_drops_stats_for_removed_shares():
+    """
+    Test that statistics for evicted shares are released.
+    """
+    analytics = ShareAnalytics()
+    analytics.record_hit("kept")
+    analytics.record_hit("evicted")
+
+    assert analytics.retain({"kept"}) == 1
+    assert analytics.get_stats("evicted")["total_accesses"] == 0
+    assert analytics.get_stats("kept")["total_accesses"] == 1
@@ -0,0 +1,123 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from sharing.share_repository import SqlShareStore
+
+
+def _record(token, user_id="123", file_id="456", expires_in=timedelta(days=7)):
+    """Builds a share record like create_share_link does."""
+    now = datetime.utcnow()
+    return {
+        "token": token,
+        "user_id": user_id,
+        "file_id": file_id,
+        "permission_level": "read",
+        "is_valid": True,
+        "created_at": now,
+        "expires_at": now + expires_in,
+        "access_count": 0
+    }
+
+
+@pytest.fixture
+def engine():
+    """Fixture providing a private in-memory database."""
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def store(engine):
+    """Fixture providing an empty database-backed share store."""
+    return SqlShareStore(engine)
+
+
+def test_round_trip_and_indexes_newest_first(store):
+    """
+    Test that records are stored and listed per owner and per file in creation order.
+    """
+    store["t1"] = _record("t1")
+    store["t2"] = _record("t2", file_id="789")
+    store["t3"] = _record("t3", user_id="other")
+
+    assert store["t1"]["file_id"] == "456"
+    assert store.get("missing") is None
+    assert store.tokens_for_owner("123") == ["t2", "t1"]
+    assert store.tokens_for_file("456") == ["t3", "t1"]
+    assert [r["token"] for r in store.records_for_owner("123")] == ["t2", "t1"]
+
+    del store["t1"]
+    assert store.tokens_for_owner("123") == ["t2"]
+    assert len(store) == 2
+
+
+def test_token_lookup_uses_index(store, engine):
+    """
+    Test that validating a token is a point lookup on the token index.
+    """
+    with engine.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM shares WHERE token = 'abc'"
+        )).fetchall()
+
+    assert any("ix_shares_token" in row[-1] for row in plan)
+
+
+def test_revoke_access_counts_and_sweep(store):
+    """
+    Test that revocation, batched access counts and sweeping go through the database.
+    """
+    store["live"] = _record("live")
+    store["expired"] = _record("expired", expires_in=timedelta(days=-1))
+    store["revoked"] = _record("revoked")
+
+    store.revoke("revoked")
+    store.add_access_counts({"live": 3, "unknown": 1})
+    store.add_access_counts({"live": 2})
+
+    assert store["revoked"]["is_valid"] is False
+    assert store["live"]["access_count"] == 5
+    assert store.sweep(now=datetime.utcnow() + timedelta(seconds=1)) == 2
+    assert list(store) == ["live"]
+
+
+def test_on_write_called_with_token(engine):
+    """
+    Test that the write hook fires when a record is stored.
+    """
+    written = []
+    store = SqlShareStore(engine, on_write=written.append)
+    store["t1"] = _record("t1")
+
+    assert written == ["t1"]
+
+
+def test_bulk_put_get_and_revoke(store):
+    """
+    Test that batch operations store, fetch and revoke several shares at once.
+    """
+    store.put_many([_record("b1"), _record("b2"), _record("b3")])
+
+    assert sorted(store.get_many(["b1", "b3", "missing"])) == ["b1", "b3"]
+    assert store.revoke_many(["b1", "b2", "missing"]) == 2
+    assert [store[t]["is_valid"] for t in ("b1", "b2", "b3")] == [False, False, True]
+
+
+def test_revoked_signed_tokens_kept_until_expiry(store):
+    """
+    Test that revoked signed-token records survive sweeps until they expire.
+    """
+    signed = {**_record("signed.token"), "token_id": "tid-1"}
+    store["signed.token"] = signed
+    store["plain"] = _record("plain")
+    store.revoke("signed.token")
+    store.revoke("plain")
+
+    assert store.sweep(now=datetime.utcnow() + timedelta(seconds=1)) == 1
+    assert [token_id for token_id, _ in store.revoked_signed_tokens()] == ["tid-1"]
+    assert store.sweep(now=datetime.utcnow() + timedelta(days=8)) == 1
+    assert store.revoked_signed_tokens() == []
@@ -9,9 +9,13 @@ def mock_user_id():
     return "123"
 
 @pytest.fixture
-def mock_file_id():
-    """Fixture for a valid file ID."""
-    return "456"
+def mock_file_id(mock_user_id):
+    """Fixture for a valid file ID, owned by the mock user."""
+    from files import file_service
+
+    file_service._file_db["456"] = {"file_id": "456", "user_id": mock_user_id, "storage_path": "unused"}
+    yield "456"
+    file_service._file_db.pop("456", None)
 
 @pytest.fixture
 def mock_permission_level():
@@ -72,25 +76,21 @@ def test_create_share_link_valid(mock_user_id, mock_file_id, mock_permission_lev
         assert result["permission_level"] == mock_permission_level
 
 
-def test_create_share_link_invalid_user():
+def test_create_share_link_invalid_user(mock_file_id):
     """
     Test creating a share link with null user ID.
-    Verifies that the function still works but records the null user.
+    Verifies that a file cannot be shared by anyone but its owner.
     """
-    invalid_user_id = None  # Simulate missing user
-    mock_file_id = "456"
-    
-    # No exception is raised, just check the result
-    result = create_share_link(
-        user_id=invalid_user_id, 
-        file_id=mock_file_id, 
-        permission_level="read"
-    )
-    
-    # Verify the result contains the null user_id
-    assert result is not None
-    assert result["user_id"] is None
-    assert result["file_id"] == mock_file_id
+    with pytest.raises(ValueError, match="File not found"):
+        create_share_link(user_id=None, file_id=mock_file_id, permission_level="read")
+
+
+def test_create_share_link_unknown_file(mock_user_id):
+    """
+    Test that a share link cannot be created for a file that does not exist.
+    """
+    with pytest.raises(ValueError, match="File not found"):
+        create_share_link(user_id=mock_user_id, file_id="no-such-file")
 
 
 # --------------------------------------------------------
@@ -173,4 +173,328 @@ def test_revoke_share_link_unauthorized(mock_token, setup_mock_share_token):
     wrong_user_id = "wrong_user"
     
     with pytest.raises(ValueError, match="Unauthorized to revoke this share link"):
-        revoke_share_link(mock_token, wrong_user_id)
\ No newline at end of file
+        revoke_share_link(mock_token, wrong_user_id)
+
+# --------------------------------------------------------
+# Tests for signed share tokens
+# --------------------------------------------------------
+
+@pytest.fixture
+def signed_mode():
+    """Switch share_service to self-contained signed tokens for one test."""
+    with patch("sharing.share_service.TOKEN_MODE", "signed"), \
+            patch("sharing.share_service.SIGNING_KEY", b"test-share-signing-key"):
+        yield
+
+
+def test_signed_token_validates_without_store_lookup(signed_mode, mock_user_id, mock_file_id):
+    """
+    Test that a signed token validates from its own claims alone.
+    """
+    share_data = create_share_link(user_id=mock_user_id, file_id=mock_file_id)
+    token = share_data["token"]
+    del share_tokens[token]
+
+    result = validate_share_token(token)
+    assert result["file_id"] == mock_file_id
+    assert result["user_id"] == mock_user_id
+    assert result["permission_level"] == "read"
+
+
+def test_signed_token_rejects_tampering(signed_mode, mock_user_id, mock_file_id):
+    """
+    Test that altering a signed token invalidates it.
+    """
+    token = create_share_link(user_id=mock_user_id, file_id=mock_file_id)["token"]
+    payload, signature = token.split(".")
+    try:
+        with pytest.raises(ValueError, match="Share token does not exist"):
+            validate_share_token(f"{payload}x.{signature}")
+    finally:
+        del share_tokens[token]
+
+
+def test_signed_token_rejected_in_stored_mode(mock_user_id, mock_file_id):
+    """
+    Test that a correctly signed token is not honoured unless signed mode is on.
+    """
+    from sharing import signed_tokens
+
+    token = signed_tokens.issue_token(b"test-share-signing-key", mock_user_id, mock_file_id, "write",
+                                      datetime.utcnow() + timedelta(days=1))["token"]
+    with patch("sharing.share_service.SIGNING_KEY", b"test-share-signing-key"):
+        with pytest.raises(ValueError, match="Share token does not exist"):
+            validate_share_token(token)
+
+
+def test_signed_token_expiry_capped_at_max_lifetime(signed_mode, mock_user_id, mock_file_id):
+    """
+    Test that a signed token claiming a far-off expiry is cut to the longest share lifetime.
+    """
+    from sharing import share_service, signed_tokens
+
+    token = signed_tokens.issue_token(share_service.SIGNING_KEY, mock_user_id, mock_file_id, "read",
+                                      datetime(2036, 1, 1))["token"]
+    result = validate_share_token(token)
+    assert result["expires_at"] <= datetime.utcnow() + share_service.MAX_LIFETIME
+
+    with pytest.raises(ValueError, match="Expiration cannot exceed"):
+        create_share_link(mock_user_id, mock_file_id, expires_in_days=share_service.MAX_EXPIRES_DAYS + 1)
+
+
+def test_revoked_signed_token_is_rejected(signed_mode, mock_user_id, mock_file_id):
+    """
+    Test that revoking a signed token is enforced through the revocation filter.
+    """
+    token = create_share_link(user_id=mock_user_id, file_id=mock_file_id)["token"]
+    try:
+        with pytest.raises(ValueError, match="Unauthorized to revoke this share link"):
+            revoke_share_link(token, "wrong_user")
+
+        revoke_share_link(token, mock_user_id)
+        with pytest.raises(ValueError, match="Share token has been revoked"):
+            validate_share_token(token)
+    finally:
+        del share_tokens[token]
+
+
+def test_validate_share_token_does_not_write_record(mock_token, setup_mock_share_token):
+    """
+    Test that validation buffers the access instead of writing the stored record.
+    """
+    from sharing.share_service import access_counter
+
+    access_counter.flush()
+    stored_count = share_tokens[mock_token]["access_count"]
+
+    validate_share_token(mock_token)
+    result = validate_share_token(mock_token)
+    assert result["access_count"] == stored_count + 2
+    assert share_tokens[mock_token]["access_count"] == stored_count
+
+    access_counter.flush()
+    assert share_tokens[mock_token]["access_count"] == stored_count + 2
+
+
+# --------------------------------------------------------
+# Tests for folder shares
+# --------------------------------------------------------
+
+@pytest.fixture
+def folder_tree(mock_user_id):
+    """Fixture with nested folders and a file in the innermost one."""
+    from files import file_service
+
+    root = file_service.create_folder(mock_user_id, "projects")
+    child = file_service.create_folder(mock_user_id, "report", parent_id=root["folder_id"])
+    other = file_service.create_folder(mock_user_id, "private")
+    file_service._file_db["nested-file"] = {
+        "file_id": "nested-file",
+        "user_id": mock_user_id,
+        "folder_id": child["folder_id"],
+        "storage_path": "unused"
+    }
+    yield {"root": root["folder_id"], "child": child["folder_id"], "other": other["folder_id"]}
+    file_service._file_db.pop("nested-file", None)
+    for folder_id in (root["folder_id"], child["folder_id"], other["folder_id"]):
+        file_service._folder_db.pop(folder_id, None)
+
+
+def test_folder_share_grants_descendants(mock_user_id, folder_tree):
+    """
+    Test that a folder share applies to files nested below the folder only.
+    """
+    from sharing.share_service import create_folder_share_link, resolve_share_permission
+
+    share_data = create_folder_share_link(mock_user_id, folder_tree["root"], "write")
+    try:
+        assert resolve_share_permission(share_data, "nested-file") == "write"
+        assert resolve_share_permission(share_data, "unknown-file") == "none"
+    finally:
+        del share_tokens[share_data["token"]]
+
+
+def test_folder_share_follows_moves(mock_user_id, folder_tree):
+    """
+    Test that cached inheritance is invalidated when a folder is moved out.
+    """
+    from files import file_service
+    from sharing.share_service import create_folder_share_link, resolve_share_permission
+
+    share_data = create_folder_share_link(mock_user_id, folder_tree["root"])
+    try:
+        assert resolve_share_permission(share_data, "nested-file") == "read"
+        file_service.move_folder(folder_tree["child"], mock_user_id, folder_tree["other"])
+        assert resolve_share_permission(share_data, "nested-file") == "none"
+    finally:
+        del share_tokens[share_data["token"]]
+
+
+def test_folder_share_requires_owned_folder(mock_user_id, folder_tree):
+    """
+    Test that users cannot share folders they do not own.
+    """
+    from sharing.share_service import create_folder_share_link
+
+    with pytest.raises(ValueError, match="Folder not found"):
+        create_folder_share_link("wrong_user", folder_tree["root"])
+
+
+def test_invalid_token_lookups_are_cached():
+    """
+    Test that a rejected token is answered from the negative cache on repeat lookups.
+    """
+    token = "scanned_token_xyz"
+
+    with pytest.raises(ValueError, match="Share token does not exist"):
+        validate_share_token(token)
+    with patch.object(share_tokens, "get") as mock_get:
+        with pytest.raises(ValueError, match="Share token does not exist"):
+            validate_share_token(token)
+        mock_get.assert_not_called()
+
+
+def test_malformed_token_rejected_before_lookup():
+    """
+    Test that tokens that cannot have been issued never reach the store.
+    """
+    with patch.object(share_tokens, "get") as mock_get:
+        for token in ("../../etc/passwd", "a" * 1000, "a.b.c"):
+            with pytest.raises(ValueError, match="Share token does not exist"):
+                validate_share_token(token)
+        mock_get.assert_not_called()
+
+
+def test_storing_token_clears_negative_cache(mock_token, mock_share_data):
+    """
+    Test that a token cached as missing validates once a share is stored under it.
+    """
+    with pytest.raises(ValueError):
+        validate_share_token(mock_token)
+
+    share_tokens[mock_token] = mock_share_data
+    try:
+        assert validate_share_token(mock_token)["file_id"] == "456"
+    finally:
+        del share_tokens[mock_token]
+
+
+@pytest.fixture
+def bulk_files(mock_user_id):
+    """Fixture with files owned by the mock user and one owned by someone else."""
+    from files import file_service
+
+    owners = {"bulk-file": mock_user_id, "other-file": mock_user_id, "foreign-file": "someone_else"}
+    for file_id, owner in owners.items():
+        file_service._file_db[file_id] = {"file_id": file_id, "user_id": owner, "storage_path": "unused"}
+    yield owners
+    for file_id in owners:
+        file_service._file_db.pop(file_id, None)
+
+
+def test_revoke_share_links_for_file_only_affects_owner(mock_user_id, bulk_files):
+    """
+    Test that revoking by file revokes the user's shares on it and nobody else's.
+    """
+    from sharing.share_service import create_share_links, revoke_share_links
+
+    own = create_share_links(mock_user_id, ["bulk-file", "bulk-file", "other-file"])
+    foreign = create_share_links("someone_else", ["foreign-file"])
+    try:
+        result = revoke_share_links(mock_user_id, file_id="bulk-file")
+
+        assert sorted(result["revoked"]) == sorted(s["token"] for s in own[:2])
+        assert share_tokens[own[2]["token"]]["is_valid"] is True
+        assert share_tokens[foreign[0]["token"]]["is_valid"] is True
+        assert revoke_share_links(mock_user_id, file_id="foreign-file")["revoked"] == []
+    finally:
+        for share_data in own + foreign:
+            del share_tokens[share_data["token"]]
+
+
+def test_create_share_links_validates_before_storing(mock_user_id, bulk_files):
+    """
+    Test that an invalid bulk request stores nothing.
+    """
+    from sharing.share_service import create_share_links
+
+    before = len(share_tokens)
+    with pytest.raises(ValueError, match="Invalid permission level"):
+        create_share_links(mock_user_id, ["bulk-file", "other-file"], permission_level="admin")
+    assert len(share_tokens) == before
+
+
+def test_create_share_links_rejects_unowned_files(mock_user_id, bulk_files):
+    """
+    Test that one missing or foreign file rejects the whole batch.
+    """
+    from sharing.share_service import create_share_links
+
+    before = len(share_tokens)
+    for file_ids in (["bulk-file", "foreign-file"], ["bulk-file", "no-such-file"]):
+        with pytest.raises(ValueError, match="File not found"):
+            create_share_links(mock_user_id, file_ids)
+    assert len(share_tokens) == before
+
+
+def test_signed_revocations_reload_from_store(signed_mode, mock_user_id, mock_file_id):
+    """
+    Test that a fresh filter, as after a restart, is rebuilt from stored revocations.
+    """
+    from sharing import share_service, signed_tokens
+
+    token = create_share_link(user_id=mock_user_id, file_id=mock_file_id)["token"]
+    revoke_share_link(token, mock_user_id)
+    fresh = signed_tokens.RevocationFilter(capacity=100)
+    try:
+        with patch("sharing.share_service.revoked_signed_tokens", fresh):
+            assert share_service.load_revoked_signed_tokens() >= 1
+            share_service.invalid_token_cache.discard(token)
+            with pytest.raises(ValueError, match="Share token has been revoked"):
+                validate_share_token(token)
+    finally:
+        del share_tokens[token]
+
+
+def test_signed_revocation_by_other_worker_is_seen(signed_mode, mock_user_id, mock_file_id):
+    """
+    Test that, with the database store, another worker's revocation is seen after a sweep
+    and that validation itself does not query the store.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+    from sharing import share_service
+    from sharing.share_repository import SqlShareStore
+
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    store = SqlShareStore(engine)
+    with patch("sharing.share_service.share_tokens", store):
+        token = create_share_link(user_id=mock_user_id, file_id=mock_file_id)["token"]
+        assert validate_share_token(token)["file_id"] == mock_file_id
+        store.revoke(token)  # As another worker would
+        with patch.object(store, "get", side_effect=AssertionError("store lookup")):
+            assert validate_share_token(token)["file_id"] == mock_file_id
+
+        share_service.sweep_shares()
+        with pytest.raises(ValueError, match="Share token has been revoked"):
+            validate_share_token(token)
+    engine.dispose()
+
+
+def test_sweep_shares_batches_analytics_lookup(mock_token, setup_mock_share_token):
+    """
+    Test that the sweep checks tracked analytics tokens in bounded batches, not one lookup each.
+    """
+    from sharing.share_service import share_analytics, sweep_shares
+
+    validate_share_token(mock_token)
+    share_analytics.record_hit("evicted_share_token")
+    tracked = len(share_analytics.tokens())
+    with patch.object(share_tokens, "get_many", wraps=share_tokens.get_many) as mock_get_many:
+        sweep_shares(batch_size=1)
+
+    assert mock_get_many.call_count == tracked
+    assert all(len(call.args[0]) == 1 for call in mock_get_many.call_args_list)
+    assert mock_token in share_analytics.tokens()
+    assert "evicted_share_token" not in share_analytics.tokens()
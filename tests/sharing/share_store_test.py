@@ -0,0 +1,79 @@
+import pytest
+from datetime import datetime, timedelta
+
+from sharing.share_store import ShareStore
+
+
+def _record(token, user_id="123", file_id="456", expires_in=timedelta(days=7)):
+    """Builds a share record like create_share_link does."""
+    now = datetime.utcnow()
+    return {
+        "token": token,
+        "user_id": user_id,
+        "file_id": file_id,
+        "permission_level": "read",
+        "is_valid": True,
+        "created_at": now,
+        "expires_at": now + expires_in,
+        "access_count": 0
+    }
+
+
+@pytest.fixture
+def store():
+    """Fixture providing an empty share store."""
+    return ShareStore()
+
+
+def test_indexes_by_owner_and_file_newest_first(store):
+    """
+    Test that tokens are indexed per owner and per file in creation order.
+    """
+    store["t1"] = _record("t1")
+    store["t2"] = _record("t2", file_id="789")
+    store["t3"] = _record("t3", user_id="other")
+
+    assert store.tokens_for_owner("123") == ["t2", "t1"]
+    assert store.tokens_for_file("456") == ["t3", "t1"]
+
+    del store["t1"]
+    assert store.tokens_for_owner("123") == ["t2"]
+    assert store.tokens_for_file("456") == ["t3"]
+
+
+def test_sweep_evicts_expired_and_revoked_shares(store):
+    """
+    Test that the sweeper evicts expired and revoked shares but keeps live ones.
+    """
+    store["expired"] = _record("expired", expires_in=timedelta(seconds=-1))
+    store["revoked"] = _record("revoked")
+    store["live"] = _record("live")
+    store.revoke("revoked")
+
+    assert store.sweep() == 2
+    assert list(store) == ["live"]
+    assert store.tokens_for_owner("123") == ["live"]
+
+
+def test_sweep_is_bounded_per_call(store):
+    """
+    Test that a single sweep examines at most max_items heap entries.
+    """
+    for i in range(5):
+        store[f"t{i}"] = _record(f"t{i}", expires_in=timedelta(seconds=-1))
+
+    assert store.sweep(max_items=2) == 2
+    assert len(store) == 3
+    assert store.sweep() == 3
+
+
+def test_revoked_signed_tokens_kept_until_expiry(store):
+    """
+    Test that revoked signed-token records survive sweeps until they expire.
+    """
+    store["signed.token"] = {**_record("signed.token"), "token_id": "tid-1"}
+    store.revoke("signed.token")
+
+    assert store.sweep(now=datetime.utcnow() + timedelta(seconds=1)) == 0
+    assert [token_id for token_id, _ in store.revoked_signed_tokens()] == ["tid-1"]
+    assert store.sweep(now=datetime.utcnow() + timedelta(days=8)) == 1
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+from sharing.signed_tokens import RevocationFilter
+
+
+def test_revocation_filter_membership():
+    """
+    Test that revoked IDs are found and unrevoked IDs are not.
+    """
+    revocations = RevocationFilter(capacity=1000)
+    expires_at = datetime.utcnow() + timedelta(days=1)
+    for i in range(100):
+        revocations.add(f"revoked-{i}", expires_at)
+
+    assert all(f"revoked-{i}" in revocations for i in range(100))
+    assert not any(f"live-{i}" in revocations for i in range(1000))
+
+
+def test_revocation_filter_prunes_expired_entries():
+    """
+    Test that revocations are forgotten once the revoked token has expired.
+    """
+    revocations = RevocationFilter(capacity=1000)
+    revocations.add("old", datetime.utcnow() - timedelta(seconds=1))
+    revocations.add("recent", datetime.utcnow() + timedelta(days=1))
+
+    assert revocations.prune() == 1
+    assert "old" not in revocations
+    assert "recent" in revocations
+    assert len(revocations) == 1
@@ -0,0 +1,56 @@
+import gzip
+import json
+import pytest
+
+from sync import change_journal, snapshot_service
+from sync.sync_service import get_updated_files
+
+
+@pytest.fixture
+def user_id():
+    """Fixture providing a user with an isolated journal and snapshot."""
+    user_id = "snapshot_user"
+    yield user_id
+    change_journal._journal.pop(user_id, None)
+    snapshot_service._snapshots.pop(user_id, None)
+
+
+def test_build_snapshot_contains_live_files_and_cursor(user_id):
+    """
+    Test that a snapshot lists live files only, compressed, at the current cursor.
+    """
+    change_journal.record_change(user_id, "a", "create", {"file_id": "a"})
+    change_journal.record_change(user_id, "b", "create", {"file_id": "b"})
+    change_journal.record_change(user_id, "b", "delete")
+
+    snapshot = snapshot_service.build_snapshot(user_id)
+    manifest = json.loads(gzip.decompress(snapshot["data"]))
+
+    assert manifest["files"] == [{"file_id": "a"}]
+    assert manifest["cursor"] == snapshot["cursor"] == change_journal.current_cursor()
+    assert snapshot["file_count"] == 1
+
+
+def test_catch_up_from_snapshot_cursor(user_id):
+    """
+    Test that a new device only receives changes made after its snapshot.
+    """
+    change_journal.record_change(user_id, "a", "create", {"file_id": "a"})
+    snapshot = snapshot_service.get_snapshot(user_id)
+    change_journal.record_change(user_id, "c", "create", {"file_id": "c"})
+
+    changes = get_updated_files(user_id, 0, cursor=snapshot["cursor"])
+
+    assert [change["file_id"] for change in changes] == ["c"]
+
+
+def test_refresh_snapshots_only_rebuilds_stale_users(user_id):
+    """
+    Test that refreshing skips users whose snapshot is already current.
+    """
+    change_journal.record_change(user_id, "a", "create", {"file_id": "a"})
+    snapshot_service.build_snapshot(user_id)
+    assert user_id not in snapshot_service.refresh_snapshots()
+
+    change_journal.record_change(user_id, "a", "modify", {"file_id": "a"})
+    assert user_id in snapshot_service.refresh_snapshots()
@@ -1,3 +1,5 @@
+import gzip
+import json
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
@@ -80,7 +82,21 @@ class TestInitSyncEndpoint:
         assert response.status_code == 422, "Expected 422 Unprocessable Entity when parameter is missing"
 
 
+@pytest.fixture
+def owned_files():
+    """
+    Fixture registering files "abc" and "def" as owned by the test user.
+    """
+    from files.file_service import _file_db
+
+    for file_id in ("abc", "def"):
+        _file_db[file_id] = {"file_id": file_id, "user_id": "test_user_id"}
+    yield
+    for file_id in ("abc", "def"):
+        _file_db.pop(file_id, None)
+
 @pytest.mark.describe("resolve_conflict_endpoint() Tests")
+@pytest.mark.usefixtures("owned_files")
 class TestResolveConflictEndpoint:
 
     @pytest.mark.it("Successfully resolves a conflict when provided with valid data")
@@ -136,4 +152,94 @@ class TestResolveConflictEndpoint:
         assert response.status_code == 400, "Expected 400 Bad Request when error occurs"
         data = response.json()
         assert "detail" in data, "Expected 'detail' field in the error response"
-        assert "Invalid file versions" in data["detail"], "Error message should be returned"
\ No newline at end of file
+        assert "Invalid file versions" in data["detail"], "Error message should be returned"
+
+    @pytest.mark.it("Refuses to resolve versions of another user's file")
+    def test_resolve_conflict_endpoint_foreign_file(self, client):
+        """
+        Test that versions naming someone else's file are rejected and not recorded.
+        """
+        from files.file_service import _file_db
+        from sync.sync_service import _version_history
+
+        _file_db["someone-elses"] = {"file_id": "someone-elses", "user_id": "other_user"}
+        request_body = {
+            "local_version": {"file_id": "someone-elses", "original_name": "a.txt",
+                              "version_vector": {"x": 5}, "content": "evil"},
+            "remote_version": {"file_id": "someone-elses", "original_name": "a.txt",
+                               "version_vector": {"y": 5}, "content": "evil"}
+        }
+        try:
+            response = client.post("/sync/resolve", json=request_body)
+        finally:
+            _file_db.pop("someone-elses", None)
+
+        assert response.status_code == 400
+        assert "someone-elses" not in _version_history
+
+@pytest.mark.describe("init_sync_endpoint() streaming Tests")
+class TestInitSyncEndpointStreaming:
+
+    @pytest.mark.it("Streams changed files as NDJSON when requested via Accept")
+    @patch("sync.sync_service.iter_updated_files")
+    def test_init_sync_endpoint_ndjson(self, mock_iter_updated_files, client):
+        """
+        Test that an NDJSON request gets a header line followed by one line per file.
+        """
+        mock_iter_updated_files.return_value = iter(
+            [{"file_id": f"file{i}"} for i in range(3)]
+        )
+
+        response = client.post(
+            "/sync/init?last_sync_ts=0",
+            headers={"Accept": "application/x-ndjson"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert "current_timestamp" in lines[0]
+        assert lines[0]["full_resync_required"] is False
+        assert [line["file_id"] for line in lines[1:]] == ["file0", "file1", "file2"]
+
+    @pytest.mark.it("Compresses large change sets when the client accepts gzip")
+    @patch("sync.sync_service.get_updated_files")
+    def test_init_sync_endpoint_gzip(self, mock_get_updated_files, client):
+        """
+        Test that large responses are gzip-encoded when negotiated.
+        """
+        mock_get_updated_files.return_value = [
+            {"file_id": f"file{i}", "original_name": "report.txt"} for i in range(200)
+        ]
+
+        response = client.post(
+            "/sync/init?last_sync_ts=0",
+            headers={"Accept-Encoding": "gzip"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()["changed_files"]) == 200
+
+
+@pytest.mark.describe("get_snapshot_endpoint() Tests")
+class TestGetSnapshotEndpoint:
+
+    @pytest.mark.it("Returns the snapshot manifest with its journal cursor")
+    @patch("sync.snapshot_service.get_snapshot")
+    def test_get_snapshot_endpoint_success(self, mock_get_snapshot, client):
+        """
+        Test that the snapshot is returned as JSON with the cursor header.
+        """
+        manifest = {"cursor": 42, "files": [{"file_id": "file123"}]}
+        mock_get_snapshot.return_value = {
+            "cursor": 42,
+            "data": gzip.compress(json.dumps(manifest).encode("utf-8"))
+        }
+
+        response = client.get("/sync/snapshot")
+
+        assert response.status_code == 200
+        assert response.headers["x-sync-cursor"] == "42"
+        assert response.json() == manifest
+        mock_get_snapshot.assert_called_once_with("test_user_id")
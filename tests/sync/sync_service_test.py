@@ -3,8 +3,15 @@ from unittest.mock import MagicMock, patch
 from datetime import datetime, timezone, timedelta
 
 # Import from the project root
-from sync.sync_service import get_updated_files, detect_conflicts
+from sync.sync_service import (
+    get_updated_files,
+    detect_conflicts,
+    compare_version_vectors,
+    record_version,
+    _version_history,
+)
 from files.file_service import _file_db  # This is what sync_service actually uses
+from sync import change_journal
 
 
 @pytest.fixture
@@ -14,15 +21,19 @@ def mock_file_db():
     """
     # Save original 
     original_db = _file_db.copy()
+    original_journal = change_journal._journal.copy()
     
     # Clear for testing
     _file_db.clear()
+    change_journal._journal.clear()
     
     yield _file_db
     
     # Restore original
     _file_db.clear()
     _file_db.update(original_db)
+    change_journal._journal.clear()
+    change_journal._journal.update(original_journal)
 
 
 @pytest.fixture
@@ -175,4 +186,183 @@ def test_detect_conflicts_none_value():
     remote_version = None
 
     with pytest.raises(TypeError):
-        detect_conflicts(local_version, remote_version)
\ No newline at end of file
+        detect_conflicts(local_version, remote_version)
+
+def test_compare_version_vectors():
+    """
+    Test that version vectors are ordered exactly, including concurrent edits.
+    """
+    assert compare_version_vectors({"a": 1, "b": 2}, {"a": 1, "b": 2}) == "equal"
+    assert compare_version_vectors({"a": 2, "b": 2}, {"a": 1, "b": 2}) == "descendant"
+    assert compare_version_vectors({"a": 1}, {"a": 1, "b": 1}) == "ancestor"
+    assert compare_version_vectors({"a": 2, "b": 1}, {"a": 1, "b": 2}) == "concurrent"
+
+
+def test_detect_conflicts_version_vector_fast_forward():
+    """
+    Test that a dominating version vector wins without consulting timestamps.
+    """
+    local_version = {
+        "file_id": 1,
+        "version_vector": {"laptop": 3, "phone": 1},
+        "modified_at": datetime.now() - timedelta(hours=1)
+    }
+    remote_version = {
+        "file_id": 1,
+        "version_vector": {"laptop": 2, "phone": 1},
+        "modified_at": datetime.now()
+    }
+
+    result = detect_conflicts(local_version, remote_version)
+    assert result["conflict_status"] == "resolved_keep_local"
+    assert result["version_vector"] == {"laptop": 3, "phone": 1}
+
+
+def test_detect_conflicts_merges_concurrent_text_edits():
+    """
+    Test that concurrent edits to a .txt file are three-way merged against the common ancestor.
+    """
+    record_version("notes", {"laptop": 1}, "one\ntwo\nthree\n")
+    try:
+        local_version = {
+            "file_id": "notes",
+            "original_name": "notes.txt",
+            "version_vector": {"laptop": 2},
+            "content": "ONE\ntwo\nthree\n"
+        }
+        remote_version = {
+            "file_id": "notes",
+            "original_name": "notes.txt",
+            "version_vector": {"laptop": 1, "phone": 1},
+            "content": "one\ntwo\nthree\nfour\n"
+        }
+
+        result = detect_conflicts(local_version, remote_version)
+        assert result["conflict_status"] == "merged"
+        assert result["content"] == "ONE\ntwo\nthree\nfour\n"
+        assert result["version_vector"] == {"laptop": 2, "phone": 1}
+    finally:
+        _version_history.pop("notes", None)
+
+
+def test_detect_conflicts_flags_overlapping_text_edits():
+    """
+    Test that concurrent edits to the same lines are flagged instead of merged.
+    """
+    local_version = {
+        "file_id": "notes",
+        "original_name": "notes.txt",
+        "version_vector": {"laptop": 2},
+        "content": "local\n",
+        "base_content": "base\n"
+    }
+    remote_version = {
+        "file_id": "notes",
+        "original_name": "notes.txt",
+        "version_vector": {"laptop": 1, "phone": 1},
+        "content": "remote\n"
+    }
+
+    result = detect_conflicts(local_version, remote_version)
+    assert result["conflict_status"] == "conflict"
+    assert result["conflicting_version"]["content"] == "remote\n"
+
+
+def test_get_updated_files_returns_net_journal_changes(mock_file_db, mock_user_id):
+    """
+    Test that runs of changes to one file collapse to their net effect.
+    """
+    change_journal.record_change(mock_user_id, "kept", "create", {"file_id": "kept", "name": "v1"})
+    change_journal.record_change(mock_user_id, "kept", "modify", {"file_id": "kept", "name": "v2"})
+    change_journal.record_change(mock_user_id, "gone", "create", {"file_id": "gone"})
+    change_journal.record_change(mock_user_id, "gone", "delete")
+
+    result = get_updated_files(mock_user_id, 0.0)
+
+    assert [(f["file_id"], f["change_type"]) for f in result] == [("kept", "create"), ("gone", "delete")]
+    assert result[0]["name"] == "v2"
+
+
+def test_get_updated_files_requires_full_resync_past_horizon(mock_file_db, mock_user_id):
+    """
+    Test that expired tombstones force clients synced before them to resync fully.
+    """
+    change_journal.record_change(mock_user_id, "gone", "delete")
+    deleted_at = change_journal._journal[mock_user_id]["gone"]["updated_at"]
+    try:
+        with patch("sync.change_journal.TOMBSTONE_RETENTION_SECONDS", -1):
+            with pytest.raises(change_journal.FullResyncRequired):
+                get_updated_files(mock_user_id, deleted_at - 60)
+        assert "gone" not in change_journal._journal[mock_user_id]
+    finally:
+        change_journal._tombstones.pop(mock_user_id, None)
+        change_journal._horizon.pop(mock_user_id, None)
+
+
+@pytest.mark.asyncio
+async def test_uploads_record_merge_ancestors(tmp_path):
+    """
+    Test that uploads bump per-device version vectors and are merged without a client-sent base.
+    """
+    from files import file_service
+
+    class _Upload:
+        def __init__(self, content):
+            self.filename = "shared.txt"
+            self.content_type = "text/plain"
+            self._content = content
+
+        async def read(self):
+            return self._content
+
+    with patch("files.file_service.UPLOAD_DIR", tmp_path):
+        stored = await file_service.store_file("u1", _Upload(b"one\ntwo\nthree\n"), device_id="laptop")
+        file_id = stored["file_id"]
+        try:
+            assert stored["version_vector"] == {"laptop": 1}
+            updated = await file_service.store_file("u1", _Upload(b"one\ntwo\nthree\nfour\n"),
+                                                    file_id=file_id, device_id="phone")
+            assert updated["version_vector"] == {"laptop": 1, "phone": 1}
+
+            result = detect_conflicts(
+                {"file_id": file_id, "original_name": "shared.txt",
+                 "version_vector": {"laptop": 2}, "content": "ONE\ntwo\nthree\n"},
+                {**updated, "content": "one\ntwo\nthree\nfour\n"}
+            )
+            assert result["conflict_status"] == "merged"
+            assert result["content"] == "ONE\ntwo\nthree\nfour\n"
+        finally:
+            file_service.delete_file(file_id, "u1")
+    assert file_id not in _version_history
+
+
+def test_version_history_is_capped():
+    """
+    Test that only the newest versions of a file are kept as merge ancestors.
+    """
+    from sync.sync_service import VERSION_HISTORY_LIMIT
+
+    try:
+        for n in range(VERSION_HISTORY_LIMIT + 5):
+            record_version("busy", {"laptop": n + 1}, f"v{n}")
+        history = _version_history["busy"]
+        assert len(history) == VERSION_HISTORY_LIMIT
+        assert history[-1]["content"] == f"v{VERSION_HISTORY_LIMIT + 4}"
+    finally:
+        _version_history.pop("busy", None)
+
+
+def test_version_history_tracks_bounded_files():
+    """
+    Test that the least recently updated files are dropped once too many have history.
+    """
+    file_ids = [f"bounded-{n}" for n in range(3)]
+    try:
+        with patch("sync.sync_service.VERSION_HISTORY_MAX_FILES", 2):
+            for file_id in file_ids:
+                record_version(file_id, {"laptop": 1}, "v1")
+        assert file_ids[0] not in _version_history
+        assert all(file_id in _version_history for file_id in file_ids[1:])
+    finally:
+        for file_id in file_ids:
+            _version_history.pop(file_id, None)
@@ -0,0 +1,41 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch
+
+from utils import auth_helpers
+from utils.auth_helpers import HashingPoolBusy, hash_password, run_password_work, verify_password
+
+
+def test_hash_password_uses_configured_rounds():
+    """
+    Test that hashes carry the configured bcrypt cost factor.
+    """
+    with patch("utils.auth_helpers.BCRYPT_ROUNDS", 5):
+        hashed = hash_password("secret")
+
+    assert hashed.startswith("$2b$05$")
+    assert verify_password("secret", hashed)
+
+
+def test_run_password_work_runs_off_the_event_loop():
+    """
+    Test that password work runs on a pool thread and returns its result.
+    """
+    def work(value):
+        return value, threading.current_thread().name
+
+    result, thread_name = asyncio.run(run_password_work(work, 42))
+
+    assert result == 42
+    assert thread_name.startswith("bcrypt")
+
+
+def test_run_password_work_rejects_when_queue_full():
+    """
+    Test that calls beyond the pool and queue limit are refused instead of queued.
+    """
+    with patch.object(auth_helpers, "_hash_slots", threading.BoundedSemaphore(1)) as slots:
+        slots.acquire()
+        with pytest.raises(HashingPoolBusy):
+            asyncio.run(run_password_work(lambda: None))
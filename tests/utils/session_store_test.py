@@ -0,0 +1,91 @@
+import random
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from utils.session_store import SessionStore, SqlSessionBackend, TimingWheel
+
+
+def test_timing_wheel_fires_every_key_on_its_tick():
+    """
+    Test that keys fire exactly at their tick across all wheel levels.
+    """
+    rng = random.Random(7)
+    wheel = TimingWheel(slots=8, levels=3)
+    due = {f"k{i}": rng.randint(1, 2000) for i in range(300)}
+    for key, tick in due.items():
+        wheel.schedule(key, tick)
+
+    fired = {}
+    for tick in range(1, 2001):
+        for key in wheel.advance(tick):
+            fired[key] = tick
+
+    assert fired == due
+    assert len(wheel) == 0
+
+
+def test_abandoned_sessions_expire_without_being_checked():
+    """
+    Test that sessions nobody checks again are dropped as the wheel advances.
+    """
+    store = SessionStore(ttl=60, shards=4, clock=lambda: 0)
+    for i in range(100):
+        store.create(f"user-{i}", now=0)
+
+    assert store.touch("user-0", now=30) is True
+    assert store.expire(now=61) == 99
+    assert len(store) == 1
+    assert store.touch("user-0", now=89) is True
+    assert store.touch("user-0", now=150) is False
+    assert len(store) == 0
+
+
+def test_sessions_survive_restart_with_backend():
+    """
+    Test that a persistent backend restores live sessions and forgets ended ones.
+    """
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    store = SessionStore(ttl=60, backend=SqlSessionBackend(engine), clock=lambda: 0)
+    store.create("alice", now=0)
+    store.create("bob", now=0)
+    store.invalidate("bob")
+
+    restarted = SessionStore(ttl=60, backend=SqlSessionBackend(engine), clock=lambda: 10)
+    assert restarted.touch("alice", now=10) is True
+    assert restarted.touch("bob", now=10) is False
+
+
+def test_recreated_session_keeps_one_wheel_entry():
+    """
+    Test that invalidating and recreating a session does not leave duplicate wheel entries.
+    """
+    store = SessionStore(ttl=10, shards=1, clock=lambda: 0)
+    wheel = store._shards[0].wheel
+    for now in range(5):
+        store.create("alice", now=now)
+        store.invalidate("alice")
+    store.create("alice", now=5)
+    assert len(wheel) == 1
+
+    assert store.expire(now=11) == 0
+    assert len(wheel) == 1
+    assert store.expire(now=15) == 1
+    assert len(wheel) == 0
+
+
+def test_timing_wheel_skips_idle_ticks():
+    """
+    Test that advancing across a long idle gap jumps between non-empty slots.
+    """
+    from unittest.mock import patch
+
+    wheel = TimingWheel(slots=64, levels=4)
+    wheel.schedule("soon", 5)
+    wheel.schedule("late", 10**6)
+    with patch.object(wheel, "_next_event", wraps=wheel._next_event) as mock_next_event:
+        assert wheel.advance(10**6 - 1) == ["soon"]
+        assert wheel.advance(10**6) == ["late"]
+
+    assert mock_next_event.call_count < 4 * 64
+    assert len(wheel) == 0
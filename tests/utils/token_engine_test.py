@@ -0,0 +1,51 @@
+import jwt as pyjwt
+import pytest
+
+from config import load_config
+from utils.token_engine import TokenEngine
+
+
+def _engine(**overrides):
+    """Builds an engine from the default config with some settings replaced."""
+    config = load_config()
+    config.update(overrides)
+    return TokenEngine.from_config(config)
+
+
+def test_round_trip_adds_exp_jti_and_kid():
+    """
+    Test that tokens carry exp, a jti and the signing key's kid.
+    """
+    engine = _engine(JWT_KEY_ID="k1")
+    token = engine.encode({"sub": "alice"})
+
+    claims = engine.decode(token)
+    assert claims["sub"] == "alice"
+    assert "exp" in claims and len(claims["jti"]) == 32
+    assert pyjwt.get_unverified_header(token)["kid"] == "k1"
+
+
+def test_rotation_keeps_previous_keys_verifiable():
+    """
+    Test that tokens signed before a key rotation still verify, and unknown kids do not.
+    """
+    old = _engine(JWT_KEY_ID="k1", JWT_SECRET_KEY="old-secret")
+    token = old.encode({"sub": "alice"})
+
+    rotated = _engine(JWT_KEY_ID="k2", JWT_SECRET_KEY="new-secret",
+                      JWT_PREVIOUS_KEYS=["k1=old-secret"])
+    assert rotated.decode(token)["sub"] == "alice"
+
+    with pytest.raises(pyjwt.PyJWTError):
+        _engine(JWT_KEY_ID="k3", JWT_SECRET_KEY="other").decode(token)
+
+
+def test_ed25519_tokens():
+    """
+    Test that the EdDSA option signs and verifies with an Ed25519 key.
+    """
+    engine = _engine(JWT_ALGORITHM="EdDSA", JWT_KEY_ID="ed1")
+    token = engine.encode({"sub": "alice"})
+
+    assert pyjwt.get_unverified_header(token)["alg"] == "EdDSA"
+    assert engine.decode(token)["sub"] == "alice"
@@ -1,28 +1,46 @@
+import asyncio
 import bcrypt
 import jwt as pyjwt
 import logging
-from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
 from config import load_config
+from .db import get_engine
+from .session_store import SessionStore, SqlSessionBackend
+from .token_engine import token_engine
 
 logger = logging.getLogger(__name__)
 
 # Load configuration
 config = load_config()
-SECRET_KEY = config["JWT_SECRET_KEY"]
-ALGORITHM = config["JWT_ALGORITHM"]
 ACCESS_TOKEN_EXPIRE_MINUTES = config["JWT_EXPIRE_MINUTES"]
+BCRYPT_ROUNDS = config["BCRYPT_ROUNDS"]
+HASH_POOL_SIZE = config["BCRYPT_POOL_SIZE"]
+HASH_QUEUE_LIMIT = config["BCRYPT_QUEUE_LIMIT"]
 
-# Mock session storage (replace with Redis/database in production)
-active_sessions: Dict[str, datetime] = {}
+# bcrypt releases the GIL while hashing, so worker threads hash in parallel
+# without blocking the event loop; slots bound running plus queued calls
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_POOL_SIZE, thread_name_prefix="bcrypt")
+_hash_slots = threading.BoundedSemaphore(HASH_POOL_SIZE + HASH_QUEUE_LIMIT)
+
+T = TypeVar("T")
+
+# Sliding sessions expired by a timing wheel; optionally persisted in DB_URI
+if config["SESSION_STORE_BACKEND"] == "database":
+    _session_backend = SqlSessionBackend(get_engine())
+else:
+    _session_backend = None
+active_sessions = SessionStore(
+    ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    shards=config["SESSION_STORE_SHARDS"],
+    backend=_session_backend
+)
 
 def create_access_token(data: Dict[str, Any]) -> str:
     """Creates a new JWT token with expiration."""
     try:
-        to_encode = data.copy()
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        to_encode.update({"exp": expire})
-        encoded_jwt = pyjwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        encoded_jwt = token_engine.encode(data)
         logger.info("Created access token for user: %s", data.get("user_id"))
         return encoded_jwt
     except Exception as e:
@@ -32,7 +50,7 @@ def create_access_token(data: Dict[str, Any]) -> str:
 def extract_user_id(token: str) -> Optional[str]:
     """Extracts the user ID from a JWT token."""
     try:
-        decoded_payload = pyjwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        decoded_payload = token_engine.decode(token)
         user_id = decoded_payload.get("user_id")
         if user_id is not None:
             logger.debug("Extracted user_id from token: %s", user_id)
@@ -43,10 +61,33 @@ def extract_user_id(token: str) -> Optional[str]:
         logger.error("Failed to decode token: %s", str(e))
         return None
 
+class HashingPoolBusy(Exception):
+    """Raised when the password hashing queue is full."""
+
+async def run_password_work(func: Callable[..., T], *args: Any) -> T:
+    """
+    Runs a call that hashes or checks passwords on the bounded bcrypt pool,
+    so slow bcrypt work never runs on the event loop.
+
+    Raises:
+        HashingPoolBusy: If BCRYPT_POOL_SIZE calls are running and
+            BCRYPT_QUEUE_LIMIT more are already waiting.
+    """
+    if not _hash_slots.acquire(blocking=False):
+        raise HashingPoolBusy("Too many password checks in progress")
+    try:
+        future = _hash_executor.submit(func, *args)
+    except Exception:
+        _hash_slots.release()
+        raise
+    # Released when the work finishes, even if the awaiting request is cancelled
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return await asyncio.wrap_future(future)
+
 def hash_password(password: str) -> str:
-    """Hashes a password using bcrypt."""
+    """Hashes a password using bcrypt with the configured cost factor."""
     try:
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
         hashed = bcrypt.hashpw(password.encode("utf-8"), salt)
         return hashed.decode("utf-8")
     except Exception as e:
@@ -65,24 +106,10 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 def check_session_valid(user_id: str) -> bool:
-    """Checks if user's session is valid."""
+    """Checks if user's session is valid, renewing it if so."""
     try:
-        if user_id not in active_sessions:
-            return False
-            
-        session_time = active_sessions[user_id]
-        current_time = datetime.utcnow()
-        
-        # Check if session has expired
-        if current_time - session_time > timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES):
-            del active_sessions[user_id]
-            logger.info("Session expired for user: %s", user_id)
-            return False
-            
-        # Update session timestamp
-        active_sessions[user_id] = current_time
-        return True
-        
+        return active_sessions.touch(user_id)
+
     except Exception as e:
         logger.error("Session validation failed: %s", str(e))
         return False
@@ -90,7 +117,7 @@ def check_session_valid(user_id: str) -> bool:
 def create_session(user_id: str) -> None:
     """Creates a new session for a user."""
     try:
-        active_sessions[user_id] = datetime.utcnow()
+        active_sessions.create(user_id)
         logger.info("Created new session for user: %s", user_id)
     except Exception as e:
         logger.error("Failed to create session: %s", str(e))
@@ -99,7 +126,7 @@ def create_session(user_id: str) -> None:
 def invalidate_session(user_id: str) -> None:
     """Invalidates a user's session."""
     try:
-        active_sessions.pop(user_id, None)
+        active_sessions.invalidate(user_id)
         logger.info("Invalidated session for user: %s", user_id)
     except Exception as e:
         logger.error("Failed to invalidate session: %s", str(e))
@@ -0,0 +1,36 @@
+import logging
+import threading
+from typing import Dict, Optional
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+from config import load_config, get_db_uri
+
+logger = logging.getLogger(__name__)
+
+# Load configuration
+config = load_config()
+
+# One pooled engine per database URI, shared by every repository in the process
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+def get_engine(uri: Optional[str] = None) -> Engine:
+    """Returns the shared, pooled engine for a database URI (defaults to DB_URI)."""
+    uri = uri or get_db_uri(config)
+    with _engines_lock:
+        engine = _engines.get(uri)
+        if engine is None:
+            if uri.startswith("sqlite") and ":memory:" in uri:
+                # An in-memory database only exists on its single connection
+                engine = create_engine(uri, poolclass=StaticPool,
+                                       connect_args={"check_same_thread": False})
+            elif uri.startswith("sqlite"):
+                engine = create_engine(uri, connect_args={"check_same_thread": False})
+            else:
+                engine = create_engine(uri, pool_size=config["DB_POOL_SIZE"],
+                                       max_overflow=config["DB_MAX_OVERFLOW"],
+                                       pool_pre_ping=True)
+            _engines[uri] = engine
+            logger.info("Created database engine for %s", engine.url.render_as_string(hide_password=True))
+        return engine
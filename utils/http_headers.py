@@ -0,0 +1,15 @@
+import re
+from urllib.parse import quote
+
+_UNSAFE_FILENAME_CHARS = re.compile(r'[\x00-\x1f\x7f"\\]')
+
+
+def content_disposition(filename: str) -> str:
+    """
+    Builds an attachment Content-Disposition header for any file name.
+
+    Sends an ASCII-only `filename` fallback with quotes, backslashes and
+    control characters replaced, plus the exact name as RFC 5987 `filename*`.
+    """
+    fallback = _UNSAFE_FILENAME_CHARS.sub("_", filename.encode("ascii", "replace").decode("ascii"))
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
@@ -0,0 +1,296 @@
+import logging
+import threading
+from abc import ABC, abstractmethod
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from sqlalchemy import Column, Float, Index, MetaData, String, Table, bindparam, delete, insert, select, update
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel mapping keys to integer expiry ticks.
+
+    Level 0 has one slot per tick; each higher level has slots as wide as the
+    whole level below. Entries cascade down a level as their slot comes up, so
+    scheduling is O(1) and each entry is moved at most once per level.
+    """
+
+    def __init__(self, slots: int = 64, levels: int = 4, current_tick: int = 0):
+        self._slots = slots
+        self._levels = levels
+        self._wheels: List[List[List[Tuple[Hashable, int]]]] = [
+            [[] for _ in range(slots)] for _ in range(levels)
+        ]
+        self._current = current_tick
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _place(self, key: Hashable, tick: int) -> None:
+        tick = max(tick, self._current)
+        delta = tick - self._current
+        span = 1
+        for level in range(self._levels):
+            if delta < span * self._slots or level == self._levels - 1:
+                # Ticks beyond the top level's range wait in its last slot and cascade again
+                slot = (min(tick, self._current + span * self._slots - 1) // span) % self._slots
+                self._wheels[level][slot].append((key, tick))
+                return
+            span *= self._slots
+
+    def schedule(self, key: Hashable, tick: int) -> None:
+        """Schedules a key to fire at a tick (no earlier than the next one)."""
+        self._place(key, max(tick, self._current + 1))
+        self._count += 1
+
+    def _next_event(self) -> Optional[int]:
+        """Returns the next tick whose level-0 slot, or a cascading higher slot, is non-empty."""
+        nearest = None
+        for offset in range(1, self._slots + 1):
+            if self._wheels[0][(self._current + offset) % self._slots]:
+                nearest = self._current + offset
+                break
+        span = self._slots
+        for level in range(1, self._levels):
+            boundary = (self._current // span + 1) * span
+            for _ in range(self._slots):
+                if nearest is not None and boundary >= nearest:
+                    break
+                if self._wheels[level][(boundary // span) % self._slots]:
+                    nearest = boundary
+                    break
+                boundary += span
+            span *= self._slots
+        return nearest
+
+    def advance(self, tick: int) -> List[Hashable]:
+        """
+        Moves the wheel forward to `tick` and returns the keys that fired.
+
+        Runs of ticks with nothing to fire or cascade are skipped in one step,
+        so an idle gap costs O(slots * levels) rather than O(gap).
+        """
+        fired: List[Hashable] = []
+        while self._current < tick and self._count:
+            next_tick = self._next_event()
+            if next_tick is None or next_tick > tick:
+                break
+            self._current = next_tick
+            span = self._slots
+            for level in range(1, self._levels):
+                if self._current % span:
+                    break
+                slot = (self._current // span) % self._slots
+                entries, self._wheels[level][slot] = self._wheels[level][slot], []
+                for key, due in entries:
+                    self._place(key, due)
+                span *= self._slots
+            slot = self._current % self._slots
+            entries, self._wheels[0][slot] = self._wheels[0][slot], []
+            for key, due in entries:
+                if due <= self._current:
+                    fired.append(key)
+                    self._count -= 1
+                else:
+                    self._place(key, due)
+        self._current = max(self._current, tick)
+        return fired
+
+
+class SessionBackend(ABC):
+    """Persistence interface for SessionStore; deadlines are epoch seconds."""
+
+    @abstractmethod
+    def load(self, now: float) -> Dict[str, float]:
+        """Drops sessions past `now` and returns the rest by user ID."""
+
+    @abstractmethod
+    def save(self, user_id: str, deadline: float) -> None:
+        """Creates or updates a session's deadline."""
+
+    @abstractmethod
+    def delete(self, user_id: str) -> None:
+        """Removes a session."""
+
+
+_metadata = MetaData()
+
+sessions_table = Table(
+    "sessions", _metadata,
+    Column("user_id", String(64), primary_key=True),
+    Column("expires_at", Float, nullable=False),
+    Index("ix_sessions_expires_at", "expires_at"),
+)
+
+
+class SqlSessionBackend(SessionBackend):
+    """Stores session deadlines in the DB_URI database so they survive restarts."""
+
+    def __init__(self, engine: Engine):
+        self._engine = engine
+        _metadata.create_all(engine)
+        t = sessions_table
+        self._update = update(t).where(t.c.user_id == bindparam("b_user_id")) \
+            .values(expires_at=bindparam("b_expires_at"))
+        self._insert = insert(t)
+        self._delete = delete(t).where(t.c.user_id == bindparam("b_user_id"))
+
+    def load(self, now: float) -> Dict[str, float]:
+        with self._engine.begin() as conn:
+            conn.execute(delete(sessions_table).where(sessions_table.c.expires_at <= now))
+            rows = conn.execute(select(sessions_table.c.user_id, sessions_table.c.expires_at))
+            return {row.user_id: row.expires_at for row in rows}
+
+    def save(self, user_id: str, deadline: float) -> None:
+        with self._engine.begin() as conn:
+            updated = conn.execute(self._update, {"b_user_id": user_id, "b_expires_at": deadline})
+            if updated.rowcount == 0:
+                conn.execute(self._insert, {"user_id": user_id, "expires_at": deadline})
+
+    def delete(self, user_id: str) -> None:
+        with self._engine.begin() as conn:
+            conn.execute(self._delete, {"b_user_id": user_id})
+
+
+class _Shard:
+    __slots__ = ("lock", "deadlines", "persisted", "scheduled", "wheel")
+
+    def __init__(self, current_tick: int):
+        self.lock = threading.Lock()
+        self.deadlines: Dict[str, float] = {}
+        # Deadlines last written to the backend, to bound write-back on renewal
+        self.persisted: Dict[str, float] = {}
+        # Tick of each user's single wheel entry, kept until it fires
+        self.scheduled: Dict[str, int] = {}
+        self.wheel = TimingWheel(current_tick=current_tick)
+
+    def schedule(self, user_id: str, tick: int) -> None:
+        self.scheduled[user_id] = tick
+        self.wheel.schedule(user_id, tick)
+
+
+class SessionStore:
+    """
+    Sliding-expiry session store sharded by user ID.
+
+    Each shard has its own lock and timing wheel. Renewing a session only
+    updates its deadline; the wheel entry is rescheduled lazily when it fires,
+    so expiry costs O(1) amortized and abandoned sessions are dropped without
+    their owner checking again. With a backend, creation and removal are
+    written through and renewals are written back once a deadline has moved
+    by a quarter of the TTL.
+    """
+
+    def __init__(self, ttl: float, shards: int = 16, tick: float = 1.0,
+                 backend: Optional[SessionBackend] = None,
+                 clock: Callable[[], float] = time.time):
+        self._ttl = ttl
+        self._tick = tick
+        self._backend = backend
+        self._clock = clock
+        now = clock()
+        self._last_tick = self._to_tick(now)
+        self._shards = [_Shard(self._last_tick) for _ in range(shards)]
+        if backend is not None:
+            for user_id, deadline in backend.load(now).items():
+                shard = self._shard(user_id)
+                shard.deadlines[user_id] = shard.persisted[user_id] = deadline
+                shard.schedule(user_id, self._to_tick(deadline))
+
+    def _to_tick(self, timestamp: float) -> int:
+        return int(timestamp // self._tick)
+
+    def _shard(self, user_id: Any) -> _Shard:
+        return self._shards[hash(user_id) % len(self._shards)]
+
+    def _maybe_expire(self, now: float) -> None:
+        if self._to_tick(now) > self._last_tick:
+            self.expire(now)
+
+    def create(self, user_id: str, now: Optional[float] = None) -> None:
+        """Starts (or restarts) a session lasting the TTL."""
+        now = self._clock() if now is None else now
+        self._maybe_expire(now)
+        deadline = now + self._ttl
+        shard = self._shard(user_id)
+        with shard.lock:
+            # An entry left by an invalidated session is rescheduled when it fires
+            if user_id not in shard.scheduled:
+                shard.schedule(user_id, self._to_tick(deadline))
+            shard.deadlines[user_id] = deadline
+            if self._backend is not None:
+                shard.persisted[user_id] = deadline
+        if self._backend is not None:
+            self._backend.save(user_id, deadline)
+
+    def touch(self, user_id: str, now: Optional[float] = None) -> bool:
+        """Renews a live session and returns True, or returns False if there is none."""
+        now = self._clock() if now is None else now
+        self._maybe_expire(now)
+        shard = self._shard(user_id)
+        write_back = None
+        with shard.lock:
+            deadline = shard.deadlines.get(user_id)
+            if deadline is None:
+                return False
+            if deadline <= now:
+                expired = True
+            else:
+                expired = False
+                deadline = shard.deadlines[user_id] = now + self._ttl
+                if self._backend is not None and \
+                        deadline - shard.persisted.get(user_id, 0) >= self._ttl / 4:
+                    shard.persisted[user_id] = write_back = deadline
+        if expired:
+            self.invalidate(user_id)
+            return False
+        if write_back is not None:
+            self._backend.save(user_id, write_back)
+        return True
+
+    def invalidate(self, user_id: str) -> None:
+        """Ends a session; its wheel entry is discarded when it fires."""
+        shard = self._shard(user_id)
+        with shard.lock:
+            existed = shard.deadlines.pop(user_id, None) is not None
+            shard.persisted.pop(user_id, None)
+        if existed and self._backend is not None:
+            self._backend.delete(user_id)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Advances every shard's wheel and drops sessions past their deadline."""
+        now = self._clock() if now is None else now
+        tick = self._to_tick(now)
+        self._last_tick = tick
+        expired: List[str] = []
+        for shard in self._shards:
+            with shard.lock:
+                for user_id in shard.wheel.advance(tick):
+                    del shard.scheduled[user_id]
+                    deadline = shard.deadlines.get(user_id)
+                    if deadline is None:
+                        continue
+                    if deadline <= now:
+                        del shard.deadlines[user_id]
+                        shard.persisted.pop(user_id, None)
+                        expired.append(user_id)
+                    else:
+                        # Renewed or recreated since it was scheduled
+                        shard.schedule(user_id, self._to_tick(deadline))
+        if self._backend is not None:
+            for user_id in expired:
+                self._backend.delete(user_id)
+        if expired:
+            logger.info("Expired %d sessions", len(expired))
+        return len(expired)
+
+    def __contains__(self, user_id: str) -> bool:
+        deadline = self._shard(user_id).deadlines.get(user_id)
+        return deadline is not None and deadline > self._clock()
+
+    def __len__(self) -> int:
+        return sum(len(shard.deadlines) for shard in self._shards)
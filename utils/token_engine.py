@@ -0,0 +1,85 @@
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+import jwt as pyjwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from config import load_config
+
+logger = logging.getLogger(__name__)
+
+
+class TokenEngine:
+    """
+    Issues and verifies access tokens for both auth_service and auth_helpers.
+
+    Signing and verification keys are built once, when the engine is created.
+    Every token carries the signing key's `kid` in its header, and
+    verification looks the key up by `kid`. Rotating a key therefore means
+    issuing with a new current key while older keys stay verify-only.
+    Supports HS256 with shared secrets and EdDSA with Ed25519 keys.
+    """
+
+    def __init__(self, algorithm: str, key_id: str, signing_key: Any,
+                 verifying_keys: Dict[str, Any], expire_minutes: int):
+        self.algorithm = algorithm
+        self.key_id = key_id
+        self.expire_minutes = expire_minutes
+        self._signing_key = signing_key
+        self._verifying_keys = verifying_keys
+        self._headers = {"kid": key_id}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "TokenEngine":
+        """Builds an engine from the JWT_* settings of load_config()."""
+        algorithm = config["JWT_ALGORITHM"]
+        key_id = config["JWT_KEY_ID"]
+        previous = [entry.split("=", 1) for entry in config["JWT_PREVIOUS_KEYS"] if entry]
+
+        if algorithm == "EdDSA":
+            if config["JWT_PRIVATE_KEY_PATH"]:
+                with open(config["JWT_PRIVATE_KEY_PATH"], "rb") as f:
+                    signing_key = serialization.load_pem_private_key(f.read(), password=None)
+            else:
+                logger.warning("JWT_PRIVATE_KEY_PATH not set; signing with an ephemeral Ed25519 key")
+                signing_key = Ed25519PrivateKey.generate()
+            verifying_keys = {key_id: signing_key.public_key()}
+            for kid, public_key_path in previous:
+                with open(public_key_path, "rb") as f:
+                    verifying_keys[kid] = serialization.load_pem_public_key(f.read())
+        else:
+            signing_key = config["JWT_SECRET_KEY"].encode("utf-8")
+            verifying_keys = {key_id: signing_key}
+            for kid, secret in previous:
+                verifying_keys[kid] = secret.encode("utf-8")
+
+        return cls(algorithm, key_id, signing_key, verifying_keys, config["JWT_EXPIRE_MINUTES"])
+
+    def encode(self, claims: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
+        """Signs claims with the current key, adding `exp` and a unique `jti`."""
+        to_encode = claims.copy()
+        expires_delta = expires_delta or timedelta(minutes=self.expire_minutes)
+        to_encode.update({
+            "exp": datetime.now(timezone.utc) + expires_delta,
+            "jti": uuid.uuid4().hex,
+        })
+        return pyjwt.encode(to_encode, self._signing_key, algorithm=self.algorithm,
+                            headers=self._headers)
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """
+        Verifies a token with the key named by its `kid` and returns its claims.
+
+        Raises:
+            jwt.PyJWTError: If the token is malformed, expired, signed with an
+                unknown key or has an invalid signature.
+        """
+        kid = pyjwt.get_unverified_header(token).get("kid", self.key_id)
+        key = self._verifying_keys.get(kid)
+        if key is None:
+            raise pyjwt.InvalidKeyError(f"Unknown signing key: {kid}")
+        return pyjwt.decode(token, key, algorithms=[self.algorithm])
+
+
+token_engine = TokenEngine.from_config(load_config())